@@ -20,6 +20,54 @@ class SyncStatus(str, Enum):
 
 DEFAULT_TIMEOUT = 10
 DEFAULT_RETRIES = 3
+# 重试退避：base * 2^n 秒（带抖动），单次最长 max 秒
+DEFAULT_RETRY_BACKOFF_BASE = 0.5
+DEFAULT_RETRY_BACKOFF_MAX = 8.0
+# 熔断：同一接口连续失败 threshold 次后暂停 cooldown 秒
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
+DEFAULT_CIRCUIT_BREAKER_COOLDOWN = 30.0
+# 钉钉旧版接口的限流/系统繁忙错误码，可重试
+THROTTLE_ERRCODES = frozenset({-1, 90002, 90018})
+# 批量写入时每批次的记录数
+DEFAULT_BULK_BATCH_SIZE = 500
+# 并发拉取钉钉接口时的线程数上限（仍受速率限制约束）
+DEFAULT_MAX_WORKERS = 4
+# 每个配置共享会话的连接池大小（应不小于并发线程数）
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+# 异步客户端同时在途的请求数上限
+DEFAULT_ASYNC_CONCURRENCY = 16
+# 增量考勤同步从水位线回退的分钟数，覆盖迟到上报/补卡的打卡记录
+DEFAULT_ATTENDANCE_OVERLAP_MINUTES = 30
+# 考勤同步每组拉取的用户数；增量模式在每个写入批次提交时记录续跑位置，精确到单次请求的用户批
+DEFAULT_ATTENDANCE_USER_GROUP = 500
+# 考勤打卡记录接口单次请求的用户数上限
+ATTENDANCE_USERS_PER_REQUEST = 50
+
+# 令牌在剩余有效期进入 2 分钟安全边界之前多少秒开始后台刷新
+DEFAULT_TOKEN_REFRESH_AHEAD = 300
+# 进程内令牌缓存每隔多少秒回查一次共享缓存，保证重置令牌能传播到其他 worker
+DEFAULT_TOKEN_LOCAL_TTL = 60
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+DEFAULT_EVENT_BATCH_SIZE = 100
+DEFAULT_EVENT_MAX_ATTEMPTS = 5
+DEFAULT_JOB_CONCURRENCY_PER_CONFIG = 1
+DEFAULT_JOB_MAX_ATTEMPTS = 3
+# 内置调度器：轮询间隔、按配置分散触发的抖动上限、租约时长（秒）、补跑判定的宽限时间（秒）与并发数
+DEFAULT_SCHEDULER_INTERVAL = 30
+DEFAULT_SCHEDULER_JITTER = 60
+DEFAULT_SCHEDULER_LEASE = 7200
+DEFAULT_SCHEDULER_CATCH_UP_GRACE = 300
+DEFAULT_SCHEDULER_WORKERS = 4
+# 多配置并行同步：并行的配置数与全局同时写库的 worker 数
+DEFAULT_ORCHESTRATOR_WORKERS = 4
+DEFAULT_DB_WRITE_CONCURRENCY = 2
+# 流水线全量同步：拉取线程与写库线程之间的队列容量（批次数）
+DEFAULT_FULL_SYNC_QUEUE_SIZE = 8
+# 考勤热表保留的自然月数（更早的记录归档到冷表）与 MySQL 按月分区提前创建的月数
+DEFAULT_ATTENDANCE_HOT_MONTHS = 12
+DEFAULT_ATTENDANCE_PARTITION_MONTHS_AHEAD = 3
+
 BASE_URL = "https://oapi.dingtalk.com"
 OPEN_API_BASE_URL = "https://api.dingtalk.com"
 
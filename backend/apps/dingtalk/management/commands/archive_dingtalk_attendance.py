@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.attendance_archive import archive_attendance, ensure_attendance_partitions
+
+
+class Command(BaseCommand):
+    help = "将超过保留月数的钉钉考勤记录分批归档到冷表；开启 ATTENDANCE_PARTITIONING 时同时为已分区的 MySQL 热表预建分区"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--config", dest="config_id", default=None, help="仅归档指定配置，默认全部")
+        parser.add_argument("--months", type=int, default=None, help="热表保留的自然月数，默认读取 DINGTALK.ATTENDANCE_HOT_MONTHS")
+        parser.add_argument("--batch-size", type=int, default=None, help="每批归档的记录数")
+
+    def handle(self, *args, **options):
+        config = DingTalkConfig.load(options["config_id"]) if options["config_id"] else None
+        result = archive_attendance(config, months=options["months"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"归档完成: {result}"))
+        statements = ensure_attendance_partitions()
+        if statements:
+            self.stdout.write(self.style.SUCCESS(f"分区已更新: 执行 {len(statements)} 条语句"))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from apps.dingtalk.services.attendance_archive import (
+    convert_attendance_partitioning,
+    ensure_attendance_partitions,
+    revert_attendance_partitioning,
+)
+from apps.dingtalk.services.exceptions import DingTalkConfigurationError
+
+
+class Command(BaseCommand):
+    help = (
+        "管理 MySQL 钉钉考勤热表的按月分区：--convert 将热表改为分区表，--revert 还原为迁移定义的表结构，"
+        "默认仅为已分区的热表预建后续月份的分区；转换或还原后需重启同步 worker"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument("--convert", action="store_true", help="将热表改为按月分区（删除外键，主键改为 record_id + 打卡时间）")
+        action.add_argument("--revert", action="store_true", help="取消分区并恢复 record_id 主键与外键")
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=None,
+            help="提前创建的月份数，默认读取 DINGTALK.ATTENDANCE_PARTITION_MONTHS_AHEAD",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["convert"]:
+                statements = convert_attendance_partitioning(months_ahead=options["months_ahead"])
+            elif options["revert"]:
+                statements = revert_attendance_partitioning()
+            else:
+                statements = ensure_attendance_partitions(months_ahead=options["months_ahead"])
+        except DingTalkConfigurationError as exc:
+            raise CommandError(str(exc)) from exc
+        for statement in statements:
+            self.stdout.write(statement)
+        self.stdout.write(self.style.SUCCESS(f"分区处理完成: 执行 {len(statements)} 条语句"))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.events import process_events
+
+
+class Command(BaseCommand):
+    help = "处理钉钉回调事件队列，对事件涉及的用户/部门/考勤做定向同步"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--config", dest="config_id", default=None, help="仅处理指定配置的事件，默认全部")
+        parser.add_argument("--limit", type=int, default=None, help="每轮领取的事件数")
+        parser.add_argument("--loop", action="store_true", help="常驻运行，持续轮询事件队列")
+        parser.add_argument("--interval", type=float, default=2.0, help="队列为空时的轮询间隔（秒）")
+
+    def handle(self, *args, **options):
+        config = DingTalkConfig.load(options["config_id"]) if options["config_id"] else None
+        while True:
+            close_old_connections()
+            result = process_events(config, limit=options["limit"])
+            handled = result["processed"] + result["retried"] + result["failed"]
+            if handled or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"处理完成: {result}"))
+            if not options["loop"]:
+                break
+            if not handled:
+                time.sleep(options["interval"])
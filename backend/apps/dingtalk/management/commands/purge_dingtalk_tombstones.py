@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.tombstone import get_retention_days, purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "分批物理删除超过保留期的钉钉部门/用户墓碑记录"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--config", dest="config_id", default=None, help="仅清理指定配置，默认全部")
+        parser.add_argument("--days", type=int, default=None, help="墓碑保留天数，默认读取 DINGTALK.TOMBSTONE_RETENTION_DAYS")
+        parser.add_argument("--batch-size", type=int, default=None, help="每批删除的记录数")
+
+    def handle(self, *args, **options):
+        config = DingTalkConfig.load(options["config_id"]) if options["config_id"] else None
+        days = options["days"] if options["days"] is not None else get_retention_days()
+        result = purge_tombstones(config, older_than=timedelta(days=days), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"清理完成: {result}"))
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.exceptions import DingTalkConfigurationError
+from apps.dingtalk.services.source_storage import SOURCE_INFO_MODELS, rewrite_source_info
+
+
+class Command(BaseCommand):
+    help = "按 DINGTALK.SOURCE_INFO_POLICY 分批重写已有钉钉快照的原始数据（source_info）存储方式"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--model",
+            dest="models",
+            action="append",
+            choices=sorted(SOURCE_INFO_MODELS),
+            help="仅处理指定模型，可重复传入，默认全部",
+        )
+        parser.add_argument("--config", dest="config_id", default=None, help="仅处理指定配置，默认全部")
+        parser.add_argument("--batch-size", type=int, default=None, help="每批重写的记录数")
+
+    def handle(self, *args, **options):
+        config = DingTalkConfig.load(options["config_id"]) if options["config_id"] else None
+        try:
+            result = rewrite_source_info(options["models"], config=config, batch_size=options["batch_size"])
+        except DingTalkConfigurationError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f"重写完成: {result}"))
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections, connection
+
+from apps.dingtalk.services.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "执行钉钉后台同步任务队列"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--loop", action="store_true", help="常驻运行，持续轮询任务队列")
+        parser.add_argument("--interval", type=float, default=2.0, help="队列为空时的轮询间隔（秒）")
+        parser.add_argument("--workers", type=int, default=1, help="并发执行任务的线程数（同一配置仍受并发上限约束）")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        if workers == 1:
+            self._work(options)
+            return
+        threads = [
+            threading.Thread(target=self._work_in_thread, args=(options,), name=f"dingtalk-job-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _work_in_thread(self, options) -> None:
+        try:
+            self._work(options)
+        finally:
+            connection.close()
+
+    def _work(self, options) -> None:
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if not options["loop"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == "success" else self.style.ERROR
+            self.stdout.write(style(f"任务 {job.pk} {job.operation} {job.status}: {job.result or job.error}"))
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections
+
+from apps.dingtalk.constants import DEFAULT_SCHEDULER_INTERVAL
+from apps.dingtalk.services.scheduler import run_due_schedules
+
+
+class Command(BaseCommand):
+    help = "运行钉钉内置调度器，按各配置的 cron 计划执行同步"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--once", action="store_true", help="只检查并执行一次到期的计划后退出")
+        parser.add_argument("--interval", type=float, default=None, help="轮询间隔（秒），默认读取 DINGTALK.SCHEDULER_INTERVAL")
+        parser.add_argument("--workers", type=int, default=None, help="并行执行不同配置计划的线程数")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or getattr(settings, "DINGTALK", {}).get("SCHEDULER_INTERVAL", DEFAULT_SCHEDULER_INTERVAL)
+        while True:
+            close_old_connections()
+            result = run_due_schedules(max_workers=options["workers"])
+            if result["due"] or options["once"]:
+                self.stdout.write(self.style.SUCCESS(f"调度完成: {result}"))
+            if options["once"]:
+                break
+            time.sleep(float(interval))
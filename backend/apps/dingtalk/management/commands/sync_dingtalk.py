@@ -8,6 +8,7 @@ from django.utils import timezone
 from apps.dingtalk.constants import SyncOperation
 from apps.dingtalk.models import DingTalkConfig
 from apps.dingtalk.services import SyncService
+from apps.dingtalk.services.backfill import GRANULARITIES, plan_backfill, run_backfill
 
 
 class Command(BaseCommand):
@@ -19,6 +20,9 @@ class Command(BaseCommand):
         parser.add_argument("--mode", dest="mode", choices=["full", "incremental"], default="full")
         parser.add_argument("--start")
         parser.add_argument("--end")
+        parser.add_argument("--backfill", action="store_true", help="按日期分片 × 用户批次回溯考勤，可中断后续跑")
+        parser.add_argument("--granularity", choices=sorted(GRANULARITIES), default="day", help="回溯的日期分片粒度")
+        parser.add_argument("--workers", type=int, default=None, help="回溯并发线程数")
 
     def handle(self, *args, **options):
         operation = SyncOperation(options["operation"])
@@ -43,9 +47,14 @@ class Command(BaseCommand):
             result = service.sync_departments(mode=mode)
         elif operation == SyncOperation.SYNC_USERS:
             result = service.sync_users(mode=mode)
-        elif operation == SyncOperation.SYNC_ATTENDANCE:
+        elif operation == SyncOperation.SYNC_ATTENDANCE and options["backfill"]:
             if not start or not end:
-                raise ValueError("SYNC_ATTENDANCE 需要提供 --start 与 --end 参数")
+                raise ValueError("考勤回溯需要提供 --start 与 --end 参数")
+            backfill_id = plan_backfill(config, start, end, granularity=options["granularity"])
+            result = run_backfill(config, backfill_id, max_workers=options["workers"])
+        elif operation == SyncOperation.SYNC_ATTENDANCE:
+            if mode != "incremental" and (not start or not end):
+                raise ValueError("SYNC_ATTENDANCE 需要提供 --start 与 --end 参数（增量模式可省略）")
             result = service.sync_attendance(start, end, mode=mode)
         elif operation == SyncOperation.FULL_SYNC:
             result = service.full_sync()
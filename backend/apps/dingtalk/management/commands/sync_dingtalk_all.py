@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.dingtalk.services.orchestrator import EXECUTORS, STAGES, sync_all_configs
+
+
+class Command(BaseCommand):
+    help = "并行同步所有启用的钉钉配置（部门 → 用户 → 离职人员 → 考勤）"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--config", dest="config_ids", action="append", help="仅同步指定配置，可重复传入")
+        parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="需要执行的同步阶段")
+        parser.add_argument("--workers", type=int, default=None, help="并行同步的配置数")
+        parser.add_argument("--executor", choices=EXECUTORS, default=None, help="并行方式，默认读取 DINGTALK.ORCHESTRATOR_EXECUTOR")
+        parser.add_argument("--write-concurrency", type=int, default=None, help="全局同时写库的 worker 数")
+
+    def handle(self, *args, **options):
+        summary = sync_all_configs(
+            options["config_ids"],
+            stages=options["stages"],
+            max_workers=options["workers"],
+            executor=options["executor"],
+            write_concurrency=options["write_concurrency"],
+        )
+        for report in summary["reports"]:
+            stages = ", ".join(f"{name}={outcome['status']}({outcome['duration']}s)" for name, outcome in report["stages"].items())
+            style = self.style.SUCCESS if report["status"] == "success" else self.style.ERROR
+            self.stdout.write(style(f"[{report['config_id']}] {report['status']} {stages}"))
+        self.stdout.write(
+            f"同步完成: 配置 {summary['configs']} 个，成功 {summary['succeeded']} 个，失败 {summary['failed']}，"
+            f"耗时 {summary['duration']}s，汇总 {summary['totals']}"
+        )
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0003_add_dimission_sync_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dingtalkattendancerecord",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64, verbose_name="内容摘要"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkdepartment",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64, verbose_name="内容摘要"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkuser",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64, verbose_name="内容摘要"),
+        ),
+    ]
@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0004_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceBackfillShard",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                ("backfill_id", models.CharField(db_index=True, max_length=64, verbose_name="回溯任务")),
+                ("shard_start", models.DateTimeField(verbose_name="分片开始时间")),
+                ("shard_end", models.DateTimeField(verbose_name="分片结束时间")),
+                ("user_offset", models.PositiveIntegerField(default=0, verbose_name="用户批次偏移")),
+                ("userids", models.JSONField(blank=True, default=list, verbose_name="用户列表")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "待执行"), ("running", "执行中"), ("success", "已完成"), ("failed", "失败")],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="状态",
+                    ),
+                ),
+                ("record_count", models.PositiveIntegerField(default=0, verbose_name="记录数")),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="执行次数")),
+                ("error", models.TextField(blank=True, default="", verbose_name="错误信息")),
+                (
+                    "config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="backfill_shards",
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "dingtalk_attendance_backfill_shard",
+                "ordering": ("shard_start", "user_offset"),
+                "unique_together": {("config", "backfill_id", "shard_start", "user_offset")},
+                "verbose_name": "钉钉考勤回溯分片",
+                "verbose_name_plural": "钉钉考勤回溯分片",
+            },
+        ),
+    ]
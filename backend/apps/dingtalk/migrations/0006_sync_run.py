@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0005_attendancebackfillshard"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dingtalkdepartment",
+            name="sync_run",
+            field=models.PositiveBigIntegerField(default=0, verbose_name="同步批次"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkuser",
+            name="sync_run",
+            field=models.PositiveBigIntegerField(default=0, verbose_name="同步批次"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkdimissionuser",
+            name="sync_run",
+            field=models.PositiveBigIntegerField(default=0, verbose_name="同步批次"),
+        ),
+        migrations.AddIndex(
+            model_name="dingtalkdepartment",
+            index=models.Index(fields=["config", "sync_run"], name="dingtalk_dept_cfg_run_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dingtalkuser",
+            index=models.Index(fields=["config", "sync_run"], name="dingtalk_user_cfg_run_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dingtalkdimissionuser",
+            index=models.Index(fields=["config", "sync_run"], name="dingtalk_dim_cfg_run_idx"),
+        ),
+    ]
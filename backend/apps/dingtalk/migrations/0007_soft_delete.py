@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0006_sync_run"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dingtalkdepartment",
+            name="is_deleted",
+            field=models.BooleanField(default=False, verbose_name="是否已删除"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkdepartment",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name="删除时间"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkuser",
+            name="is_deleted",
+            field=models.BooleanField(default=False, verbose_name="是否已删除"),
+        ),
+        migrations.AddField(
+            model_name="dingtalkuser",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name="删除时间"),
+        ),
+    ]
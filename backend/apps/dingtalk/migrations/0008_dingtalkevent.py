@@ -0,0 +1,52 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0007_soft_delete"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DingTalkEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                ("event_type", models.CharField(max_length=64, verbose_name="事件类型")),
+                ("dedupe_key", models.CharField(max_length=64, unique=True, verbose_name="去重摘要")),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="事件内容")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "待处理"), ("processing", "处理中"), ("done", "已处理"), ("failed", "失败")],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="状态",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="处理次数")),
+                ("available_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="可处理时间")),
+                ("processed_at", models.DateTimeField(blank=True, null=True, verbose_name="处理完成时间")),
+                ("error", models.TextField(blank=True, default="", verbose_name="错误信息")),
+                (
+                    "config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "dingtalk_event",
+                "ordering": ("available_at", "create_time"),
+                "verbose_name": "钉钉回调事件",
+                "verbose_name_plural": "钉钉回调事件",
+                "indexes": [models.Index(fields=["status", "available_at"], name="dingtalk_event_queue_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0008_dingtalkevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncJob",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, verbose_name="ID")),
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[
+                            ("test_connection", "TEST_CONNECTION"),
+                            ("sync_departments", "SYNC_DEPARTMENTS"),
+                            ("sync_users", "SYNC_USERS"),
+                            ("sync_dimission_users", "SYNC_DIMISSION_USERS"),
+                            ("sync_attendance", "SYNC_ATTENDANCE"),
+                            ("full_sync", "FULL_SYNC"),
+                        ],
+                        max_length=32,
+                        verbose_name="操作类型",
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict, verbose_name="任务参数")),
+                ("dedupe_key", models.CharField(db_index=True, max_length=64, verbose_name="去重摘要")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "排队中"), ("running", "执行中"), ("success", "已完成"), ("failed", "失败")],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="状态",
+                    ),
+                ),
+                ("progress", models.JSONField(blank=True, default=dict, verbose_name="执行进度")),
+                ("result", models.JSONField(blank=True, default=dict, verbose_name="执行结果")),
+                ("error", models.TextField(blank=True, default="", verbose_name="错误信息")),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="执行次数")),
+                ("started_at", models.DateTimeField(blank=True, null=True, verbose_name="开始时间")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="结束时间")),
+                ("created_by", models.CharField(blank=True, default="", max_length=128, verbose_name="创建人")),
+                (
+                    "config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sync_jobs",
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "dingtalk_sync_job",
+                "ordering": ("-create_time",),
+                "verbose_name": "钉钉同步任务",
+                "verbose_name_plural": "钉钉同步任务",
+                "indexes": [models.Index(fields=["status", "create_time"], name="dingtalk_job_queue_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0009_syncjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleState",
+            fields=[
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                (
+                    "config",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="schedule_state",
+                        serialize=False,
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+                ("cron", models.CharField(blank=True, default="", max_length=128, verbose_name="cron 表达式")),
+                ("next_run_at", models.DateTimeField(blank=True, null=True, verbose_name="下次执行时间")),
+                ("last_run_at", models.DateTimeField(blank=True, null=True, verbose_name="最近执行时间")),
+                ("last_status", models.CharField(blank=True, default="", max_length=16, verbose_name="最近执行状态")),
+                ("last_error", models.TextField(blank=True, default="", verbose_name="最近错误信息")),
+                ("lease_owner", models.CharField(blank=True, default="", max_length=128, verbose_name="租约持有者")),
+                ("lease_until", models.DateTimeField(blank=True, null=True, verbose_name="租约到期时间")),
+            ],
+            options={
+                "db_table": "dingtalk_schedule_state",
+                "verbose_name": "钉钉计划任务状态",
+                "verbose_name_plural": "钉钉计划任务状态",
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+SOURCE_STORAGE_CHOICES = [
+    ("full", "完整保存"),
+    ("allowlist", "字段白名单"),
+    ("compressed", "压缩保存"),
+    ("external", "独立表保存"),
+]
+
+
+def _storage_fields(model_name):
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name="source_storage",
+            field=models.CharField(
+                choices=SOURCE_STORAGE_CHOICES, default="full", max_length=16, verbose_name="原始数据存储方式"
+            ),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="source_blob",
+            field=models.BinaryField(blank=True, editable=False, null=True, verbose_name="压缩原始数据"),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0010_schedulestate"),
+    ]
+
+    operations = [
+        *_storage_fields("dingtalkdepartment"),
+        *_storage_fields("dingtalkuser"),
+        *_storage_fields("dingtalkattendancerecord"),
+        *_storage_fields("dingtalkdimissionuser"),
+        migrations.CreateModel(
+            name="DingTalkSourcePayload",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                ("source_model", models.CharField(max_length=64, verbose_name="快照模型")),
+                ("object_key", models.CharField(max_length=128, verbose_name="业务主键")),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="原始数据")),
+                (
+                    "config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="source_payloads",
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "dingtalk_source_payload",
+                "verbose_name": "钉钉原始数据",
+                "verbose_name_plural": "钉钉原始数据",
+                "unique_together": {("source_model", "config", "object_key")},
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+SOURCE_STORAGE_CHOICES = [
+    ("full", "完整保存"),
+    ("allowlist", "字段白名单"),
+    ("compressed", "压缩保存"),
+    ("external", "独立表保存"),
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dingtalk", "0011_source_info_storage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dingtalkattendancerecord",
+            index=models.Index(fields=["config", "userid", "work_date"], name="dingtalk_att_cfg_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dingtalkattendancerecord",
+            index=models.Index(fields=["config", "user_check_time"], name="dingtalk_att_cfg_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dingtalkattendancerecord",
+            index=models.Index(fields=["user_check_time"], name="dingtalk_att_time_idx"),
+        ),
+        migrations.CreateModel(
+            name="DingTalkAttendanceArchive",
+            fields=[
+                ("create_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+                (
+                    "source_storage",
+                    models.CharField(
+                        choices=SOURCE_STORAGE_CHOICES, default="full", max_length=16, verbose_name="原始数据存储方式"
+                    ),
+                ),
+                ("source_blob", models.BinaryField(blank=True, editable=False, null=True, verbose_name="压缩原始数据")),
+                ("record_id", models.CharField(max_length=128, primary_key=True, serialize=False, verbose_name="记录ID")),
+                ("userid", models.CharField(max_length=128, verbose_name="用户ID")),
+                ("check_type", models.CharField(blank=True, default="", max_length=32, verbose_name="打卡类型")),
+                ("time_result", models.CharField(blank=True, default="", max_length=32, verbose_name="结果")),
+                ("user_check_time", models.DateTimeField(verbose_name="打卡时间")),
+                ("work_date", models.DateField(blank=True, null=True, verbose_name="工作日期")),
+                ("source_type", models.CharField(blank=True, default="", max_length=32, verbose_name="来源类型")),
+                ("content_hash", models.CharField(blank=True, default="", max_length=64, verbose_name="内容摘要")),
+                ("source_info", models.JSONField(blank=True, default=dict, verbose_name="原始数据")),
+                (
+                    "config",
+                    models.ForeignKey(
+                        default="default",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_attendance_records",
+                        to="dingtalk.dingtalkconfig",
+                        verbose_name="所属配置",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "dingtalk_attendance_archive",
+                "verbose_name": "钉钉考勤归档记录",
+                "verbose_name_plural": "钉钉考勤归档记录",
+                "ordering": ("-user_check_time", "userid"),
+                "indexes": [
+                    models.Index(fields=["config", "userid", "work_date"], name="dingtalk_arc_cfg_user_date_idx"),
+                    models.Index(fields=["config", "user_check_time"], name="dingtalk_arc_cfg_time_idx"),
+                    models.Index(fields=["user_check_time"], name="dingtalk_arc_time_idx"),
+                ],
+            },
+        ),
+    ]
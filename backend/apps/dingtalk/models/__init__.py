@@ -2,10 +2,15 @@ from .config import DingTalkConfig
 from .log import DingTalkSyncLog
 from .department import DingTalkDepartment
 from .user import DingTalkUser
-from .attendance import DingTalkAttendanceRecord
+from .attendance import DingTalkAttendanceArchive, DingTalkAttendanceRecord
 from .cursor import SyncCursor
 from .binding import DeptBinding, UserBinding
 from .dimission import DingTalkDimissionUser
+from .backfill import AttendanceBackfillShard
+from .event import DingTalkEvent
+from .job import SyncJob
+from .schedule import ScheduleState
+from .source import DingTalkSourcePayload, SourceStorage
 
 __all__ = [
     "DingTalkConfig",
@@ -14,7 +19,14 @@ __all__ = [
     "DingTalkUser",
     "DingTalkDimissionUser",
     "DingTalkAttendanceRecord",
+    "DingTalkAttendanceArchive",
     "SyncCursor",
     "DeptBinding",
     "UserBinding",
+    "AttendanceBackfillShard",
+    "DingTalkEvent",
+    "SyncJob",
+    "ScheduleState",
+    "DingTalkSourcePayload",
+    "SourceStorage",
 ]
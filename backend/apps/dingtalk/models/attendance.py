@@ -4,31 +4,71 @@ from django.db import models
 
 from utils.models import BaseModel
 
+from .source import SourceInfoModel
 
-class DingTalkAttendanceRecord(BaseModel):
-    """钉钉考勤记录"""
+
+class AttendanceRecordBase(SourceInfoModel, BaseModel):
+    """考勤记录字段，热表与冷表共用（字段顺序一致，便于跨表 UNION 查询）"""
+
+    source_key_field = "record_id"
 
     record_id = models.CharField(primary_key=True, max_length=128, verbose_name="记录ID")
-    config = models.ForeignKey(
-        "DingTalkConfig",
-        on_delete=models.CASCADE,
-        related_name="attendance_records",
-        verbose_name="所属配置",
-        default="default",
-    )
     userid = models.CharField(max_length=128, verbose_name="用户ID")
     check_type = models.CharField(max_length=32, blank=True, default="", verbose_name="打卡类型")
     time_result = models.CharField(max_length=32, blank=True, default="", verbose_name="结果")
     user_check_time = models.DateTimeField(verbose_name="打卡时间")
     work_date = models.DateField(null=True, blank=True, verbose_name="工作日期")
     source_type = models.CharField(max_length=32, blank=True, default="", verbose_name="来源类型")
+    content_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="内容摘要")
     source_info = models.JSONField(default=dict, blank=True, verbose_name="原始数据")
 
     class Meta:
-        db_table = "dingtalk_attendance_record"
-        verbose_name = "钉钉考勤记录"
-        verbose_name_plural = verbose_name
+        abstract = True
         ordering = ("-user_check_time", "userid")
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.userid}@{self.user_check_time.isoformat()}"
+
+
+class DingTalkAttendanceRecord(AttendanceRecordBase):
+    """钉钉考勤记录"""
+
+    config = models.ForeignKey(
+        "DingTalkConfig",
+        on_delete=models.CASCADE,
+        related_name="attendance_records",
+        verbose_name="所属配置",
+        default="default",
+    )
+
+    class Meta(AttendanceRecordBase.Meta):
+        db_table = "dingtalk_attendance_record"
+        verbose_name = "钉钉考勤记录"
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=["config", "userid", "work_date"], name="dingtalk_att_cfg_user_date_idx"),
+            models.Index(fields=["config", "user_check_time"], name="dingtalk_att_cfg_time_idx"),
+            models.Index(fields=["user_check_time"], name="dingtalk_att_time_idx"),
+        ]
+
+
+class DingTalkAttendanceArchive(AttendanceRecordBase):
+    """归档的钉钉考勤记录（冷表），原始数据统一压缩保存"""
+
+    config = models.ForeignKey(
+        "DingTalkConfig",
+        on_delete=models.CASCADE,
+        related_name="archived_attendance_records",
+        verbose_name="所属配置",
+        default="default",
+    )
+
+    class Meta(AttendanceRecordBase.Meta):
+        db_table = "dingtalk_attendance_archive"
+        verbose_name = "钉钉考勤归档记录"
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=["config", "userid", "work_date"], name="dingtalk_arc_cfg_user_date_idx"),
+            models.Index(fields=["config", "user_check_time"], name="dingtalk_arc_cfg_time_idx"),
+            models.Index(fields=["user_check_time"], name="dingtalk_arc_time_idx"),
+        ]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from django.db import models
+
+from utils.models import BaseModel
+
+
+class AttendanceBackfillShard(BaseModel):
+    """考勤回溯分片：日期分片 × 用户批次，记录每个分片的执行进度"""
+
+    STATUS_CHOICES = (
+        ("pending", "待执行"),
+        ("running", "执行中"),
+        ("success", "已完成"),
+        ("failed", "失败"),
+    )
+
+    config = models.ForeignKey("DingTalkConfig", on_delete=models.CASCADE, related_name="backfill_shards", verbose_name="所属配置")
+    backfill_id = models.CharField(max_length=64, db_index=True, verbose_name="回溯任务")
+    shard_start = models.DateTimeField(verbose_name="分片开始时间")
+    shard_end = models.DateTimeField(verbose_name="分片结束时间")
+    user_offset = models.PositiveIntegerField(default=0, verbose_name="用户批次偏移")
+    userids = models.JSONField(default=list, blank=True, verbose_name="用户列表")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending", verbose_name="状态")
+    record_count = models.PositiveIntegerField(default=0, verbose_name="记录数")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="执行次数")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+
+    class Meta:
+        db_table = "dingtalk_attendance_backfill_shard"
+        unique_together = ("config", "backfill_id", "shard_start", "user_offset")
+        ordering = ("shard_start", "user_offset")
+        verbose_name = "钉钉考勤回溯分片"
+        verbose_name_plural = verbose_name
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.backfill_id}:{self.shard_start:%Y-%m-%d}+{self.user_offset}={self.status}"
@@ -71,6 +71,10 @@ class DingTalkConfig(BaseModel):
         self.access_token_expires_at = None
         self.save(update_fields=["access_token", "access_token_expires_at", "update_time"])
 
+        from ..services.token import invalidate_access_token
+
+        invalidate_access_token(self.id)
+
     def update_sync_state(
         self,
         *,
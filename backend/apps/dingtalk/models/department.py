@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from django.db import models
 
-from utils.models import BaseModel
+from utils.models import BaseModel, SoftDeleteModel
 
+from .source import SourceInfoModel
 
-class DingTalkDepartment(BaseModel):
+
+class DingTalkDepartment(SourceInfoModel, SoftDeleteModel, BaseModel):
     """钉钉部门快照"""
 
+    source_key_field = "dept_id"
+
     dept_id = models.BigIntegerField(primary_key=True, verbose_name="部门ID")
     config = models.ForeignKey(
         "DingTalkConfig",
@@ -21,12 +25,15 @@ class DingTalkDepartment(BaseModel):
     order = models.BigIntegerField(null=True, blank=True, verbose_name="排序")
     leader_userid = models.CharField(max_length=128, blank=True, default="", verbose_name="负责人")
     dept_type = models.CharField(max_length=64, blank=True, default="", verbose_name="部门类型")
+    content_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="内容摘要")
     source_info = models.JSONField(default=dict, blank=True, verbose_name="原始数据")
+    sync_run = models.PositiveBigIntegerField(default=0, verbose_name="同步批次")
 
     class Meta:
         db_table = "dingtalk_department"
         verbose_name = "钉钉部门"
         verbose_name_plural = verbose_name
+        indexes = [models.Index(fields=["config", "sync_run"], name="dingtalk_dept_cfg_run_idx")]
         ordering = ("dept_id",)
 
     def __str__(self) -> str:  # pragma: no cover - 管理界面辅助
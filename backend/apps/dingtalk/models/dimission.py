@@ -6,10 +6,14 @@ from django.db import models
 
 from utils.models import BaseModel, UuidModel
 
+from .source import SourceInfoModel
 
-class DingTalkDimissionUser(UuidModel, BaseModel):
+
+class DingTalkDimissionUser(SourceInfoModel, UuidModel, BaseModel):
     """钉钉离职员工快照"""
 
+    source_key_field = "userid"
+
     userid = models.CharField(max_length=128, verbose_name="用户ID")
     config = models.ForeignKey(
         "DingTalkConfig",
@@ -35,11 +39,13 @@ class DingTalkDimissionUser(UuidModel, BaseModel):
     passive_reasons = models.JSONField(default=list, blank=True, verbose_name="被动离职原因")
     dept_ids = models.JSONField(default=list, blank=True, verbose_name="历史部门列表")
     source_info = models.JSONField(default=dict, blank=True, verbose_name="原始数据")
+    sync_run = models.PositiveBigIntegerField(default=0, verbose_name="同步批次")
 
     class Meta:
         db_table = "dingtalk_dimission_user"
         verbose_name = "钉钉离职员工"
         verbose_name_plural = verbose_name
+        indexes = [models.Index(fields=["config", "sync_run"], name="dingtalk_dim_cfg_run_idx")]
         unique_together = ("config", "userid")
         ordering = ("-leave_time", "userid")
 
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from django.db import models
+from django.utils import timezone
+
+from utils.models import BaseModel
+
+
+class DingTalkEvent(BaseModel):
+    """钉钉回调事件队列：回调接口只负责验签入队，由后台 worker 消费并做单实体增量同步"""
+
+    STATUS_CHOICES = (
+        ("pending", "待处理"),
+        ("processing", "处理中"),
+        ("done", "已处理"),
+        ("failed", "失败"),
+    )
+
+    config = models.ForeignKey("DingTalkConfig", on_delete=models.CASCADE, related_name="events", verbose_name="所属配置")
+    event_type = models.CharField(max_length=64, verbose_name="事件类型")
+    dedupe_key = models.CharField(max_length=64, unique=True, verbose_name="去重摘要")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="事件内容")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending", verbose_name="状态")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="处理次数")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="可处理时间")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="处理完成时间")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+
+    class Meta:
+        db_table = "dingtalk_event"
+        indexes = [models.Index(fields=["status", "available_at"], name="dingtalk_event_queue_idx")]
+        ordering = ("available_at", "create_time")
+        verbose_name = "钉钉回调事件"
+        verbose_name_plural = verbose_name
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.event_type}({self.config_id})={self.status}"
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from django.db import models
+
+from utils.models import BaseModel, UuidModel
+
+from ..constants import SyncOperation
+
+
+class SyncJob(UuidModel, BaseModel):
+    """后台同步任务：接口只负责入队，由 run_dingtalk_jobs worker 领取执行并回写进度"""
+
+    STATUS_CHOICES = (
+        ("pending", "排队中"),
+        ("running", "执行中"),
+        ("success", "已完成"),
+        ("failed", "失败"),
+    )
+
+    config = models.ForeignKey("DingTalkConfig", on_delete=models.CASCADE, related_name="sync_jobs", verbose_name="所属配置")
+    operation = models.CharField(max_length=32, choices=[(item.value, item.name) for item in SyncOperation], verbose_name="操作类型")
+    params = models.JSONField(default=dict, blank=True, verbose_name="任务参数")
+    dedupe_key = models.CharField(max_length=64, db_index=True, verbose_name="去重摘要")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending", verbose_name="状态")
+    progress = models.JSONField(default=dict, blank=True, verbose_name="执行进度")
+    result = models.JSONField(default=dict, blank=True, verbose_name="执行结果")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="执行次数")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="结束时间")
+    created_by = models.CharField(max_length=128, blank=True, default="", verbose_name="创建人")
+
+    class Meta:
+        db_table = "dingtalk_sync_job"
+        indexes = [models.Index(fields=["status", "create_time"], name="dingtalk_job_queue_idx")]
+        ordering = ("-create_time",)
+        verbose_name = "钉钉同步任务"
+        verbose_name_plural = verbose_name
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.operation}({self.config_id})={self.status}"
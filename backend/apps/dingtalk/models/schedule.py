@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from django.db import models
+
+from utils.models import BaseModel
+
+
+class ScheduleState(BaseModel):
+    """计划任务运行状态：记录下一次触发时间，并以租约字段防止同一配置的计划任务重叠执行"""
+
+    config = models.OneToOneField(
+        "DingTalkConfig",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="schedule_state",
+        verbose_name="所属配置",
+    )
+    cron = models.CharField(max_length=128, blank=True, default="", verbose_name="cron 表达式")
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name="下次执行时间")
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name="最近执行时间")
+    last_status = models.CharField(max_length=16, blank=True, default="", verbose_name="最近执行状态")
+    last_error = models.TextField(blank=True, default="", verbose_name="最近错误信息")
+    lease_owner = models.CharField(max_length=128, blank=True, default="", verbose_name="租约持有者")
+    lease_until = models.DateTimeField(null=True, blank=True, verbose_name="租约到期时间")
+
+    class Meta:
+        db_table = "dingtalk_schedule_state"
+        verbose_name = "钉钉计划任务状态"
+        verbose_name_plural = verbose_name
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.config_id}:{self.cron}@{self.next_run_at}"
@@ -0,0 +1,128 @@
+"""钉钉快照原始数据（source_info）的存储方式
+
+source_info 可按模型配置为完整保存、字段白名单、压缩后存入二进制列或转存到独立的原始数据表，
+读取时统一通过 get_source_info() 还原；存储策略见 services.source_storage。
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Iterable
+
+from django.db import models
+
+from utils.models import BaseModel
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于部署环境，未安装时只能使用 zlib
+    zstandard = None
+
+
+class SourceStorage(models.TextChoices):
+    FULL = "full", "完整保存"
+    ALLOWLIST = "allowlist", "字段白名单"
+    COMPRESSED = "compressed", "压缩保存"
+    EXTERNAL = "external", "独立表保存"
+
+
+# 压缩数据的首字节标识编码方式
+_CODEC_MARKERS = {"zlib": b"z", "zstd": b"s"}
+
+
+def compress_payload(payload: dict[str, Any], codec: str = "zlib") -> bytes:
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd 压缩需要安装 zstandard")
+        return _CODEC_MARKERS["zstd"] + zstandard.ZstdCompressor().compress(raw)
+    if codec != "zlib":
+        raise ValueError(f"不支持的压缩方式: {codec}")
+    return _CODEC_MARKERS["zlib"] + zlib.compress(raw)
+
+
+def decompress_payload(blob: bytes | memoryview | None) -> dict[str, Any]:
+    if not blob:
+        return {}
+    data = bytes(blob)
+    marker, body = data[:1], data[1:]
+    if marker == _CODEC_MARKERS["zstd"]:
+        if zstandard is None:
+            raise ValueError("读取 zstd 压缩数据需要安装 zstandard")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    elif marker == _CODEC_MARKERS["zlib"]:
+        raw = zlib.decompress(body)
+    else:
+        raise ValueError("无法识别的压缩数据")
+    payload = json.loads(raw.decode("utf-8"))
+    return payload if isinstance(payload, dict) else {}
+
+
+class SourceInfoModel(models.Model):
+    """带原始数据的快照模型，source_key_field 为同步时使用的业务主键（与配置一起定位独立表中的原始数据）"""
+
+    source_key_field = "pk"
+
+    source_storage = models.CharField(
+        max_length=16, choices=SourceStorage.choices, default=SourceStorage.FULL, verbose_name="原始数据存储方式"
+    )
+    source_blob = models.BinaryField(null=True, blank=True, editable=False, verbose_name="压缩原始数据")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def source_key(self) -> str:
+        return str(getattr(self, self.source_key_field))
+
+    def get_source_info(self) -> dict[str, Any]:
+        """返回原始数据：压缩数据即时解压，独立表中的数据首次访问时加载（列表场景请先调用 prefetch_source_info）"""
+
+        if self.source_storage == SourceStorage.COMPRESSED:
+            return decompress_payload(self.source_blob)
+        if self.source_storage == SourceStorage.EXTERNAL:
+            if not hasattr(self, "_source_info_cache"):
+                prefetch_source_info([self])
+            return self._source_info_cache
+        return self.source_info if isinstance(self.source_info, dict) else {}
+
+
+class DingTalkSourcePayload(BaseModel):
+    """转存到独立表的快照原始数据"""
+
+    source_model = models.CharField(max_length=64, verbose_name="快照模型")
+    config = models.ForeignKey(
+        "DingTalkConfig",
+        on_delete=models.CASCADE,
+        related_name="source_payloads",
+        verbose_name="所属配置",
+    )
+    object_key = models.CharField(max_length=128, verbose_name="业务主键")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="原始数据")
+
+    class Meta:
+        db_table = "dingtalk_source_payload"
+        verbose_name = "钉钉原始数据"
+        verbose_name_plural = verbose_name
+        unique_together = ("source_model", "config", "object_key")
+
+    def __str__(self) -> str:  # pragma: no cover - 调试用途
+        return f"{self.source_model}:{self.object_key}({self.config_id})"
+
+
+def prefetch_source_info(instances: Iterable[Any]) -> None:
+    """为独立表保存的实例批量加载原始数据，每个模型一次查询."""
+
+    pending: dict[str, list[SourceInfoModel]] = {}
+    for item in instances:
+        if isinstance(item, SourceInfoModel) and item.source_storage == SourceStorage.EXTERNAL:
+            pending.setdefault(item._meta.label_lower, []).append(item)
+    for label, items in pending.items():
+        rows = DingTalkSourcePayload.objects.filter(
+            source_model=label, object_key__in={item.source_key for item in items}
+        ).values_list("config_id", "object_key", "payload")
+        payloads = {(config_id, key): payload for config_id, key, payload in rows}
+        for item in items:
+            payload = payloads.get((item.config_id, item.source_key))
+            item._source_info_cache = payload if isinstance(payload, dict) else {}
@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from django.db import models
 
-from utils.models import BaseModel
+from utils.models import BaseModel, SoftDeleteModel
 
+from .source import SourceInfoModel
 
-class DingTalkUser(BaseModel):
+
+class DingTalkUser(SourceInfoModel, SoftDeleteModel, BaseModel):
     """钉钉用户快照"""
 
+    source_key_field = "userid"
+
     userid = models.CharField(primary_key=True, max_length=128, verbose_name="用户ID")
     config = models.ForeignKey(
         "DingTalkConfig",
@@ -25,12 +29,15 @@ class DingTalkUser(BaseModel):
     dept_ids = models.JSONField(default=list, blank=True, verbose_name="所属部门ID列表")
     unionid = models.CharField(max_length=255, blank=True, default="", verbose_name="UnionID")
     remark = models.CharField(max_length=255, blank=True, default="", verbose_name="备注")
+    content_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="内容摘要")
     source_info = models.JSONField(default=dict, blank=True, verbose_name="原始数据")
+    sync_run = models.PositiveBigIntegerField(default=0, verbose_name="同步批次")
 
     class Meta:
         db_table = "dingtalk_user"
         verbose_name = "钉钉用户"
         verbose_name_plural = verbose_name
+        indexes = [models.Index(fields=["config", "sync_run"], name="dingtalk_user_cfg_run_idx")]
         ordering = ("userid",)
 
     def __str__(self) -> str:  # pragma: no cover
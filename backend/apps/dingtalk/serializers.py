@@ -19,8 +19,10 @@ from .models import (
     DingTalkSyncLog,
     DingTalkUser,
     SyncCursor,
+    SyncJob,
     UserBinding,
 )
+from .models.source import prefetch_source_info
 
 
 def _ensure_list(instance: Any) -> list[Any]:
@@ -118,7 +120,50 @@ class DingTalkSyncLogSerializer(serializers.ModelSerializer):
         ]
 
 
-class DingTalkDepartmentSerializer(serializers.ModelSerializer):
+class SyncJobSerializer(serializers.ModelSerializer):
+    operationLabel = serializers.CharField(source="get_operation_display", read_only=True)
+    statusLabel = serializers.CharField(source="get_status_display", read_only=True)
+
+    class Meta:
+        model = SyncJob
+        fields = [
+            "id",
+            "config",
+            "operation",
+            "operationLabel",
+            "status",
+            "statusLabel",
+            "params",
+            "progress",
+            "result",
+            "error",
+            "attempts",
+            "created_by",
+            "started_at",
+            "finished_at",
+            "create_time",
+        ]
+        read_only_fields = fields
+
+
+class SourceInfoSerializerMixin:
+    """按存储方式还原 source_info（压缩数据解压、独立表中的数据按批次一次加载）"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        instance_source = kwargs.get("instance")
+        if instance_source is None and args:
+            instance_source = args[0]
+        prefetch_source_info(_ensure_list(instance_source))
+
+    def to_representation(self, instance: Any) -> dict[str, Any]:
+        data = super().to_representation(instance)
+        if "source_info" in data and hasattr(instance, "get_source_info"):
+            data["source_info"] = instance.get_source_info()
+        return data
+
+
+class DingTalkDepartmentSerializer(SourceInfoSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DingTalkDepartment
         fields = [
@@ -135,7 +180,7 @@ class DingTalkDepartmentSerializer(serializers.ModelSerializer):
         ]
 
 
-class DingTalkUserSerializer(serializers.ModelSerializer):
+class DingTalkUserSerializer(SourceInfoSerializerMixin, serializers.ModelSerializer):
     dept_names = serializers.SerializerMethodField()
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
@@ -209,7 +254,7 @@ class DingTalkUserSerializer(serializers.ModelSerializer):
         return names
 
 
-class DingTalkDimissionUserSerializer(serializers.ModelSerializer):
+class DingTalkDimissionUserSerializer(SourceInfoSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DingTalkDimissionUser
         fields = [
@@ -238,7 +283,7 @@ class DingTalkDimissionUserSerializer(serializers.ModelSerializer):
         ]
 
 
-class DingTalkAttendanceSerializer(serializers.ModelSerializer):
+class DingTalkAttendanceSerializer(SourceInfoSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     check_type_label = serializers.SerializerMethodField()
     time_result_label = serializers.SerializerMethodField()
@@ -1,3 +1,4 @@
+from .async_client import AsyncDingTalkClient
 from .client import DingTalkClient
 from .sync import SyncService
 from .tasks import (
@@ -6,14 +7,22 @@ from .tasks import (
     sync_dimission_users_task,
     sync_attendance_task,
     full_sync_task,
+    purge_tombstones_task,
+    archive_attendance_task,
+    process_events_task,
+    sync_all_configs_task,
 )
 from .exceptions import (
     DingTalkAPIError,
+    DingTalkCallbackError,
+    DingTalkCircuitOpenError,
     DingTalkConfigurationError,
     DingTalkDisabledError,
+    DingTalkTransientError,
 )
 
 __all__ = [
+    "AsyncDingTalkClient",
     "DingTalkClient",
     "SyncService",
     "sync_departments_task",
@@ -21,7 +30,14 @@ __all__ = [
     "sync_dimission_users_task",
     "sync_attendance_task",
     "full_sync_task",
+    "purge_tombstones_task",
+    "archive_attendance_task",
+    "process_events_task",
+    "sync_all_configs_task",
     "DingTalkAPIError",
+    "DingTalkCallbackError",
+    "DingTalkCircuitOpenError",
     "DingTalkConfigurationError",
     "DingTalkDisabledError",
+    "DingTalkTransientError",
 ]
@@ -0,0 +1,578 @@
+"""基于 asyncio + httpx 的钉钉客户端
+
+接口与 DingTalkClient 保持一致，分批/分部门的请求以协程并发发出，
+由信号量限制在途请求数、由共享限流器约束速率，适合上万人规模的考勤等高扇出同步。
+需要安装 httpx；通过 ``DINGTALK["CLIENT"] = "async"`` 让 SyncService 使用该客户端。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+import requests
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from ..constants import BASE_URL, DEFAULT_ASYNC_CONCURRENCY, DEFAULT_TIMEOUT, OPEN_API_BASE_URL
+from ..models import DingTalkConfig
+from .client import (
+    _DEFAULT_ROSTER_FIELDS,
+    DingTalkClient,
+    _attendance_request_data,
+    _chunk_iterable,
+    _extract_dept_list,
+    _extract_dimission_infos,
+    _extract_roster_records,
+    _merge_users,
+    _parse_attendance_page,
+    _parse_open_api_payload,
+    _parse_payload,
+    _parse_roster_items,
+    _raise_for_transient_status,
+)
+from .exceptions import DingTalkAPIError, DingTalkCircuitOpenError, DingTalkConfigurationError, DingTalkTransientError
+from .ratelimit import get_rate_limiter
+from .retry import RetryPolicy, get_circuit_breaker
+from .transport import build_async_session, get_connection_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _attendance_group_size(max_concurrency: int) -> int:
+    return 50 * max_concurrency
+
+
+class AsyncDingTalkClient:
+    """异步钉钉开放平台客户端，需在 ``async with`` 中使用以管理 httpx 会话."""
+
+    def __init__(
+        self,
+        config: DingTalkConfig,
+        *,
+        timeout: int | None = None,
+        session: Any | None = None,
+        max_concurrency: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.config = config
+        if not self.config.app_key or not self.config.app_secret:
+            raise DingTalkConfigurationError("请先配置钉钉 AppKey/AppSecret")
+        options = getattr(settings, "DINGTALK", {})
+        self.timeout = timeout or options.get("DEFAULT_TIMEOUT", DEFAULT_TIMEOUT)
+        self.max_concurrency = max(1, int(max_concurrency or options.get("ASYNC_MAX_CONCURRENCY", DEFAULT_ASYNC_CONCURRENCY)))
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.session = session
+        self._owns_session = session is None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._counters: Counter[str] = Counter()
+        # 令牌仍由同步客户端的多级缓存管理，与其他 worker 共享
+        self._token_client = DingTalkClient(config, timeout=timeout, retry_policy=self.retry_policy)
+
+    async def __aenter__(self) -> "AsyncDingTalkClient":
+        if self.session is None:
+            self.session = build_async_session()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def get_metrics(self) -> dict[str, Any]:
+        metrics = self._token_client.get_metrics()
+        metrics["connection"] = get_connection_stats(self.session)
+        for name, value in self._counters.items():
+            metrics[name] = metrics.get(name, 0) + value
+        return metrics
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _respect_rate_limit(self, bucket: str, *, limit: int = 15, interval: float = 1.0) -> None:
+        await get_rate_limiter().acquire_async(f"{self.config.id}:{bucket}", rate=limit / interval, capacity=limit)
+
+    # --------------------------- 基础 HTTP 封装 --------------------------- #
+    async def _call_with_retry(
+        self,
+        endpoint: str,
+        send: Callable[[], Awaitable[Dict[str, Any]]],
+        *,
+        bucket: str | None = None,
+        limit: int = 15,
+    ) -> Dict[str, Any]:
+        breaker = get_circuit_breaker(f"{self.config.id}:{endpoint}")
+        attempt = 0
+        while True:
+            # 与同步客户端一致：每次发送前检查熔断并取令牌
+            if not breaker.allow():
+                self._counters["circuit_open"] += 1
+                raise DingTalkCircuitOpenError(f"钉钉接口 {endpoint} 连续失败，已暂时熔断，请稍后重试")
+            if bucket:
+                await self._respect_rate_limit(bucket, limit=limit)
+            try:
+                result = await send()
+            except DingTalkTransientError as exc:
+                if attempt >= self.retry_policy.max_retries or breaker.is_open:
+                    breaker.record_failure()
+                    raise
+                delay = self.retry_policy.compute_delay(attempt, exc.retry_after)
+                logger.warning(
+                    "钉钉接口暂时不可用，准备重试 config=%s endpoint=%s attempt=%s delay=%.2fs error=%s",
+                    self.config.id,
+                    endpoint,
+                    attempt + 1,
+                    delay,
+                    exc,
+                )
+                self._counters["retries"] += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except DingTalkAPIError:
+                breaker.record_success()
+                raise
+            breaker.record_success()
+            return result
+
+    async def _send(self, method: str, url: str, *, label: str, **kwargs: Any) -> Any:
+        if self.session is None:
+            raise DingTalkConfigurationError("AsyncDingTalkClient 需在 async with 中使用")
+        async with self.semaphore:
+            try:
+                response = await self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                raise DingTalkTransientError(f"{label}网络异常: {exc}") from exc
+        _raise_for_transient_status(response, label)
+        return response
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        access_token: Optional[str] = None,
+        bucket: str | None = None,
+        limit: int = 15,
+    ) -> Dict[str, Any]:
+        params = params.copy() if params else {}
+        if access_token:
+            params.setdefault("access_token", access_token)
+        url = f"{BASE_URL}{path}"
+
+        async def _send_once() -> Dict[str, Any]:
+            return _parse_payload(await self._send(method, url, label="钉钉接口", params=params, json=data))
+
+        return await self._call_with_retry(path, _send_once, bucket=bucket, limit=limit)
+
+    async def _request_open_api(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        access_token: Optional[str] = None,
+        bucket: str | None = None,
+        limit: int = 15,
+    ) -> Dict[str, Any]:
+        params = params.copy() if params else {}
+        payload = data.copy() if data else None
+        token = access_token or await self.get_access_token()
+        url = path if path.startswith("http") else f"{OPEN_API_BASE_URL}{path}"
+        headers = {
+            "Content-Type": "application/json;charset=utf-8",
+            "x-acs-dingtalk-access-token": token,
+        }
+        is_get = method.upper() == "GET"
+
+        async def _send_once() -> Dict[str, Any]:
+            response = await self._send(
+                method,
+                url,
+                label="钉钉开放接口",
+                params=params if is_get else None,
+                json=payload if not is_get else None,
+                headers=headers,
+            )
+            return _parse_open_api_payload(response)
+
+        return await self._call_with_retry(path.split("?", 1)[0], _send_once, bucket=bucket, limit=limit)
+
+    # --------------------------- 令牌管理 --------------------------- #
+    async def get_access_token(self, *, force_refresh: bool = False) -> str:
+        return await sync_to_async(self._token_client.get_access_token)(force_refresh=force_refresh)
+
+    # --------------------------- 部门接口 --------------------------- #
+    async def get_department(self, dept_id: int, *, access_token: str | None = None) -> Dict[str, Any]:
+        token = access_token or await self.get_access_token()
+        response = await self._request(
+            "POST",
+            "/topapi/v2/department/get",
+            data={"dept_id": dept_id, "language": "zh_CN"},
+            access_token=token,
+        )
+        result = response.get("result")
+        return result if isinstance(result, dict) else {}
+
+    async def list_departments(self, root_dept_id: int = 1) -> list[Dict[str, Any]]:
+        """按层广度优先遍历部门树，同层子部门并发拉取."""
+
+        token = await self.get_access_token()
+        visited: set[int] = set()
+        results: list[Dict[str, Any]] = []
+
+        async def _list_sub(dept_id: int) -> list[Dict[str, Any]]:
+            payload = await self._request(
+                "POST",
+                "/topapi/v2/department/listsub",
+                data={"dept_id": dept_id, "language": "zh_CN"},
+                access_token=token,
+                bucket="department",
+            )
+            return _extract_dept_list(payload)
+
+        root_info = await self.get_department(root_dept_id, access_token=token)
+        if root_info:
+            root_id = root_info.get("dept_id", root_dept_id)
+            visited.add(root_id)
+            results.append(root_info)
+            level = [root_id]
+        else:
+            level = [root_dept_id]
+
+        while level:
+            next_level: list[int] = []
+            # gather 保持输入顺序，保证结果与同步客户端一致
+            for dept_list in await asyncio.gather(*(_list_sub(dept_id) for dept_id in level)):
+                for dept in dept_list:
+                    child_dept_id = dept.get("dept_id")
+                    if child_dept_id is None or child_dept_id in visited:
+                        continue
+                    visited.add(child_dept_id)
+                    results.append(dept)
+                    next_level.append(child_dept_id)
+            level = next_level
+        return results
+
+    # --------------------------- 用户接口 --------------------------- #
+    async def get_user(self, userid: str, *, access_token: str | None = None) -> Dict[str, Any]:
+        token = access_token or await self.get_access_token()
+        response = await self._request(
+            "POST",
+            "/topapi/v2/user/get",
+            data={"userid": userid, "language": "zh_CN"},
+            access_token=token,
+            bucket="user",
+        )
+        result = response.get("result")
+        return result if isinstance(result, dict) else {}
+
+    async def list_users_by_dept(self, dept_id: int, *, size: int = 100, access_token: str | None = None) -> list[Dict[str, Any]]:
+        token = access_token or await self.get_access_token()
+        cursor = 0
+        results: list[Dict[str, Any]] = []
+        while True:
+            payload = await self._request(
+                "POST",
+                "/topapi/v2/user/list",
+                data={
+                    "dept_id": dept_id,
+                    "cursor": cursor,
+                    "size": size,
+                    "language": "zh_CN",
+                },
+                access_token=token,
+                bucket="user",
+            )
+            result_data = payload.get("result") or {}
+            results.extend(result_data.get("list") or [])
+            next_cursor = result_data.get("next_cursor")
+            if not next_cursor:
+                break
+            cursor = next_cursor
+        return results
+
+    async def list_all_users(self, dept_ids: Iterable[int]) -> list[Dict[str, Any]]:
+        token = await self.get_access_token()
+        user_lists = await asyncio.gather(
+            *(self.list_users_by_dept(dept_id, access_token=token) for dept_id in dict.fromkeys(dept_ids))
+        )
+        return _merge_users(user_lists)
+
+    # --------------------------- 离职人员接口 --------------------------- #
+    async def list_dimission_userids(self, *, max_results: int = 50) -> list[str]:
+        try:
+            return await self._list_dimission_userids_open_api(max_results=max_results)
+        except DingTalkAPIError as exc:
+            logger.warning("fallback to legacy dimission user api: %s", exc)
+            return await self._list_dimission_userids_legacy(max_results=max_results)
+
+    async def list_dimission_infos(self, userids: Iterable[str]) -> list[Dict[str, Any]]:
+        try:
+            return await self._list_dimission_infos_open_api(userids)
+        except DingTalkAPIError as exc:
+            logger.warning("fallback to legacy dimission info api: %s", exc)
+            return await self._list_dimission_infos_legacy(userids)
+
+    async def list_roster_infos(
+        self,
+        userids: Iterable[str],
+        *,
+        field_codes: Sequence[str] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        unique_ids = list(dict.fromkeys(str(u) for u in userids if u))
+        fields = list(dict.fromkeys(field_codes or _DEFAULT_ROSTER_FIELDS))
+        if not unique_ids or not fields:
+            return {}
+
+        try:
+            raw_items = await self._list_roster_infos_open_api(unique_ids, fields)
+        except DingTalkAPIError as exc:
+            logger.warning("fallback to legacy roster api: %s", exc)
+            raw_items = await self._list_roster_infos_legacy(unique_ids, fields)
+        return _parse_roster_items(raw_items)
+
+    async def _list_dimission_userids_open_api(self, *, max_results: int = 50) -> list[str]:
+        max_results = max(1, min(int(max_results), 100))
+        userids: list[str] = []
+        next_token: Optional[str] = None
+        while True:
+            query: dict[str, Any] = {"maxResults": max_results}
+            if next_token:
+                query["nextToken"] = next_token
+            payload = await self._request_open_api("GET", "/v1.0/hrm/employees/dismissions", params=query, bucket="dimission-list")
+            userids.extend(str(u) for u in payload.get("userIdList") or [] if u)
+            next_token = payload.get("nextToken")
+            if not payload.get("hasMore") or not next_token:
+                break
+        return list(dict.fromkeys(userids))
+
+    async def _list_dimission_userids_legacy(self, *, max_results: int = 50) -> list[str]:
+        token = await self.get_access_token()
+        offset = 0
+        size = max(1, min(int(max_results), 50))
+        userids: list[str] = []
+        while True:
+            payload = await self._request(
+                "POST",
+                "/topapi/smartwork/hrm/employee/querydimission",
+                data={"offset": offset, "size": size},
+                access_token=token,
+                bucket="dimission-list",
+            )
+            result = payload.get("result") or {}
+            userid_list = result.get("userid_list") or result.get("useridList") or []
+            userids.extend([str(u) for u in userid_list if u])
+            if not (result.get("has_more") or result.get("hasMore")):
+                break
+            offset += size
+        return list(dict.fromkeys(userids))
+
+    async def _gather_batches(self, items: Sequence[str], fetch: Callable[[list[str]], Awaitable[list[Dict[str, Any]]]]) -> list[Dict[str, Any]]:
+        results: list[Dict[str, Any]] = []
+        for batch_result in await asyncio.gather(*(fetch(batch) for batch in _chunk_iterable(items, 50))):
+            results.extend(batch_result)
+        return results
+
+    async def _list_dimission_infos_open_api(self, userids: Iterable[str]) -> list[Dict[str, Any]]:
+        async def _fetch(batch: list[str]) -> list[Dict[str, Any]]:
+            params = {"userIdList": json.dumps(batch, ensure_ascii=False)}
+            data = await self._request_open_api("GET", "/v1.0/hrm/employees/dimissionInfos", params=params, bucket="dimission-info")
+            return _extract_dimission_infos(data)
+
+        return await self._gather_batches([str(u) for u in userids if u], _fetch)
+
+    async def _list_dimission_infos_legacy(self, userids: Iterable[str]) -> list[Dict[str, Any]]:
+        token = await self.get_access_token()
+
+        async def _fetch(batch: list[str]) -> list[Dict[str, Any]]:
+            payload = await self._request(
+                "POST",
+                "/topapi/smartwork/hrm/employee/listdimission",
+                data={"userid_list": ",".join(batch)},
+                access_token=token,
+                bucket="dimission-info",
+            )
+            result = payload.get("result") or {}
+            data_list = result.get("data_list") or result.get("dataList") or []
+            return [item for item in data_list if isinstance(item, dict)]
+
+        return await self._gather_batches([u for u in userids if u], _fetch)
+
+    async def _list_roster_infos_open_api(self, userids: Sequence[str], field_codes: Sequence[str]) -> list[dict[str, Any]]:
+        async def _fetch(batch: list[str]) -> list[Dict[str, Any]]:
+            payload: dict[str, Any] = {
+                "userIdList": batch,
+                "fieldFilterList": field_codes,
+                "text2SelectConvert": True,
+            }
+            if self.config.agent_id:
+                payload["appAgentId"] = self.config.agent_id
+            data = await self._request_open_api("POST", "/v1.0/hrm/rosters/lists/query", data=payload, bucket="roster-info", limit=10)
+            return _extract_roster_records(data)
+
+        return await self._gather_batches(userids, _fetch)
+
+    async def _list_roster_infos_legacy(self, userids: Sequence[str], field_codes: Sequence[str]) -> list[dict[str, Any]]:
+        token = await self.get_access_token()
+
+        async def _fetch(batch: list[str]) -> list[Dict[str, Any]]:
+            payload: dict[str, Any] = {
+                "userid_list": ",".join(batch),
+                "field_filter_list": list(field_codes),
+                "text2select_convert": True,
+            }
+            if self.config.agent_id:
+                payload["agentid"] = self.config.agent_id
+            data = await self._request("POST", "/topapi/smartwork/hrm/employee/v2/list", data=payload, access_token=token, bucket="roster-info", limit=10)
+            body = data.get("result") or {}
+            records = body.get("data_list") or body.get("dataList") or []
+            return [item for item in records if isinstance(item, dict)]
+
+        return await self._gather_batches(userids, _fetch)
+
+    async def list_dimission_records(
+        self,
+        *,
+        start_time: timezone.datetime | None = None,
+        end_time: timezone.datetime | None = None,
+        max_results: int = 200,
+    ) -> list[Dict[str, Any]]:
+        # 该接口只能按 nextToken 串行翻页，并发没有收益，直接复用同步实现
+        return await sync_to_async(self._token_client.list_dimission_records)(
+            start_time=start_time,
+            end_time=end_time,
+            max_results=max_results,
+        )
+
+    # --------------------------- 考勤接口 --------------------------- #
+    async def iter_attendance_records(
+        self,
+        userids: Iterable[str],
+        *,
+        start_time: timezone.datetime,
+        end_time: timezone.datetime,
+    ) -> AsyncIterator[list[Dict[str, Any]]]:
+        """按“并发上限 × 50 人”分组并发拉取，逐组产出，内存占用与时间窗口总量无关."""
+
+        for group in _chunk_iterable(userids, _attendance_group_size(self.max_concurrency)):
+            records = await self.list_attendance_records(group, start_time=start_time, end_time=end_time)
+            if records:
+                yield records
+
+    async def list_attendance_records(
+        self,
+        userids: Iterable[str],
+        *,
+        start_time: timezone.datetime,
+        end_time: timezone.datetime,
+    ) -> list[Dict[str, Any]]:
+        """各批 50 人并发拉取（批内按 offset 串行翻页），结果按批次顺序合并."""
+
+        user_list = list(userids)
+        if not user_list:
+            return []
+        token = await self.get_access_token()
+        limit = 50
+        start_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
+        end_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
+
+        async def _fetch(batch: list[str]) -> list[Dict[str, Any]]:
+            offset = 0
+            records_all: list[Dict[str, Any]] = []
+            while True:
+                payload = await self._request(
+                    "POST",
+                    "/attendance/listRecord",
+                    data=_attendance_request_data(batch, start_str, end_str, offset, limit),
+                    access_token=token,
+                    bucket="attendance",
+                )
+                records, has_more = _parse_attendance_page(payload)
+                records_all.extend(records)
+                if len(records) < limit or has_more is False:
+                    break
+                offset += limit
+            return records_all
+
+        return await self._gather_batches(user_list, _fetch)
+
+    # --------------------------- 回调订阅 --------------------------- #
+    async def register_event_subscribe(self, events: list[str]) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        payload = {
+            "call_back_tag": events,
+            "token": self.config.callback_token,
+            "aes_key": self.config.callback_aes_key,
+            "url": self.config.callback_url,
+        }
+        return await self._request("POST", "/call_back/register_call_back", data=payload, access_token=token)
+
+    async def unregister_event_subscribe(self) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        return await self._request("POST", "/call_back/delete_call_back", access_token=token)
+
+
+class BlockingAsyncClient:
+    """在同步代码中驱动 AsyncDingTalkClient，提供与 DingTalkClient 相同的同步方法.
+
+    每次调用在独立的事件循环中打开一个 httpx 会话，调用内部的请求全部并发执行。
+    """
+
+    def __init__(self, config: DingTalkConfig, **kwargs: Any) -> None:
+        self.config = config
+        self._kwargs = kwargs
+        self._last_client: AsyncDingTalkClient | None = None
+        self._sync_client = DingTalkClient(config)
+        options = getattr(settings, "DINGTALK", {})
+        self.max_concurrency = max(1, int(kwargs.get("max_concurrency") or options.get("ASYNC_MAX_CONCURRENCY", DEFAULT_ASYNC_CONCURRENCY)))
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(AsyncDingTalkClient, name)
+        if name.startswith("__") or not inspect.iscoroutinefunction(attr):
+            return getattr(self._sync_client, name)
+
+        def _call(*args: Any, **kwargs: Any) -> Any:
+            async def _run() -> Any:
+                async with AsyncDingTalkClient(self.config, **self._kwargs) as client:
+                    self._last_client = client
+                    return await getattr(client, name)(*args, **kwargs)
+
+            return async_to_sync(_run)()
+
+        return _call
+
+    def iter_attendance_records(
+        self,
+        userids: Iterable[str],
+        *,
+        start_time: timezone.datetime,
+        end_time: timezone.datetime,
+    ) -> Iterator[list[Dict[str, Any]]]:
+        # 异步生成器无法跨事件循环逐项驱动，改为每组用户单独运行一次并发拉取
+        for group in _chunk_iterable(userids, _attendance_group_size(self.max_concurrency)):
+            records = self.list_attendance_records(group, start_time=start_time, end_time=end_time)
+            if records:
+                yield records
+
+    def get_metrics(self) -> dict[str, Any]:
+        if self._last_client is not None:
+            return self._last_client.get_metrics()
+        return self._sync_client.get_metrics()
+
+
+__all__ = ["AsyncDingTalkClient", "BlockingAsyncClient"]
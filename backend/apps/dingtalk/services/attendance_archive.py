@@ -0,0 +1,387 @@
+"""考勤记录的冷热分层
+
+dingtalk_attendance_record（热表）只保留最近 ATTENDANCE_HOT_MONTHS 个自然月的打卡记录，
+更早的记录由 archive_attendance 按主键分批搬到 dingtalk_attendance_archive（冷表），
+每批在一个事务内完成插入与删除，原始数据在冷表中统一压缩保存。
+
+读取时：
+- 考勤列表带时间范围且范围早于冷表边界（冷表中最晚的打卡时间）时，以 UNION ALL 合并冷表中同条件的记录，
+  未带时间范围或只查询近期数据时只读热表，列表延迟不随历史数据增长；
+- fetch_attendance_records 供考勤统计按工作日期读取，范围涉及冷表时自动合并。
+
+MySQL 可通过 partition_dingtalk_attendance --convert 将热表改为按月（UTC）RANGE 分区，
+开启 ATTENDANCE_PARTITIONING 后归档时顺带预建后续月份的分区，见 convert_attendance_partitioning。
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Iterable, Iterator, Sequence
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+
+from ..constants import DEFAULT_ATTENDANCE_HOT_MONTHS, DEFAULT_ATTENDANCE_PARTITION_MONTHS_AHEAD
+from ..models import DingTalkAttendanceArchive, DingTalkAttendanceRecord, DingTalkConfig, SourceStorage
+from ..models.source import compress_payload, prefetch_source_info
+from .bulk import get_bulk_batch_size
+from .exceptions import DingTalkConfigurationError
+from .source_storage import _delete_external_payloads
+
+logger = logging.getLogger(__name__)
+
+_RECORD_FIELDS = tuple(field.attname for field in DingTalkAttendanceRecord._meta.concrete_fields)
+_MAX_PARTITION = "pmax"
+# 考勤统计用到的字段，批量读取时只查询这些列
+ATTENDANCE_METRIC_FIELDS = ("record_id", "userid", "check_type", "time_result", "user_check_time", "work_date", "source_type")
+
+
+def _setting_int(name: str, default: int) -> int:
+    value = getattr(settings, "DINGTALK", {}).get(name, default)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_hot_months() -> int:
+    return _setting_int("ATTENDANCE_HOT_MONTHS", DEFAULT_ATTENDANCE_HOT_MONTHS)
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_cutoff(months: int, *, now: datetime | None = None) -> datetime:
+    """热表保留边界：当前自然月往前 months 个月的月初（本地时区），早于该时间的记录归档."""
+
+    today = timezone.localdate(now or timezone.now())
+    first_day = _add_months(today.replace(day=1), -months)
+    return timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+
+
+def _archive_copy(record: DingTalkAttendanceRecord) -> DingTalkAttendanceArchive:
+    values = {name: getattr(record, name) for name in _RECORD_FIELDS}
+    if record.source_storage != SourceStorage.COMPRESSED:
+        values.update(
+            source_storage=SourceStorage.COMPRESSED,
+            source_blob=compress_payload(record.get_source_info()),
+            source_info={},
+        )
+    return DingTalkAttendanceArchive(**values)
+
+
+def archive_attendance(
+    config: DingTalkConfig | None = None,
+    *,
+    months: int | None = None,
+    batch_size: int | None = None,
+    now: datetime | None = None,
+) -> dict[str, object]:
+    """将早于保留边界的打卡记录搬到冷表，返回归档数量与边界；不指定 config 时处理全部配置."""
+
+    months = get_hot_months() if months is None else max(0, months)
+    cutoff = archive_cutoff(months, now=now)
+    batch_size = max(1, batch_size or get_bulk_batch_size())
+    queryset = DingTalkAttendanceRecord.objects.filter(user_check_time__lt=cutoff)
+    if config is not None:
+        queryset = queryset.filter(config=config)
+    archived = 0
+    while True:
+        batch = list(queryset.order_by("pk")[:batch_size])
+        if not batch:
+            break
+        prefetch_source_info(batch)
+        copies = [_archive_copy(record) for record in batch]
+        pks = [record.pk for record in batch]
+        with transaction.atomic():
+            # 之前归档过、又被回补同步写回热表的记录以热表为准
+            DingTalkAttendanceArchive.objects.filter(pk__in=pks).delete()
+            DingTalkAttendanceArchive.objects.bulk_create(copies)
+            # bulk_create 会按 auto_now 重置时间戳，这里写回热表中的原值
+            for copy, record in zip(copies, batch):
+                copy.create_time, copy.update_time = record.create_time, record.update_time
+            DingTalkAttendanceArchive.objects.bulk_update(copies, ["create_time", "update_time"])
+            DingTalkAttendanceRecord.objects.filter(pk__in=pks).delete()
+            _delete_external_payloads(
+                DingTalkAttendanceRecord,
+                [(record.config_id, record.source_key) for record in batch if record.source_storage == SourceStorage.EXTERNAL],
+            )
+        archived += len(batch)
+        if len(batch) < batch_size:
+            break
+    result = {"archived": archived, "cutoff": cutoff.isoformat()}
+    logger.info("钉钉考勤归档完成 config=%s result=%s", config.id if config else "*", result)
+    return result
+
+
+def archive_boundary(config_id: str | None = None) -> datetime | None:
+    """冷表中最晚的打卡时间，不晚于该时间的查询才需要读取冷表."""
+
+    queryset = DingTalkAttendanceArchive.objects.all()
+    if config_id:
+        queryset = queryset.filter(config_id=config_id)
+    return queryset.aggregate(boundary=Max("user_check_time"))["boundary"]
+
+
+def with_archived_records(
+    queryset: QuerySet,
+    archive_queryset: QuerySet,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    config_id: str | None = None,
+) -> QuerySet:
+    """为已过滤的热表查询集合并冷表中同条件的记录；archive_queryset 需使用与热表相同的过滤条件.
+
+    合并结果为 UNION 查询集，只能排序与分页，不能再追加过滤。
+    """
+
+    if start is None and end is None:
+        return queryset
+    boundary = archive_boundary(config_id)
+    if boundary is None or (start is not None and start > boundary):
+        return queryset
+    # 两侧的查询列必须一致，select_related 追加的关联列只能去掉
+    hot = queryset.select_related(None).order_by()
+    archived = archive_queryset.exclude(pk__in=hot.values("pk")).order_by()
+    return hot.union(archived, all=True).order_by(*DingTalkAttendanceRecord._meta.ordering)
+
+
+def fetch_attendance_records(userid: str, start: date, end: date, *, config_id: str | None = None) -> list:
+    """读取用户在工作日期范围内的打卡记录（含已归档记录），按打卡时间排序."""
+
+    filters: dict[str, object] = {"userid": userid, "work_date__range": (start, end)}
+    if config_id:
+        filters["config_id"] = config_id
+    records = list(DingTalkAttendanceRecord.objects.filter(**filters).order_by("user_check_time"))
+    boundary = archive_boundary(config_id)
+    if boundary is None or start > timezone.localdate(boundary):
+        return records
+    seen = {record.pk for record in records}
+    archived = [record for record in DingTalkAttendanceArchive.objects.filter(**filters) if record.pk not in seen]
+    if archived:
+        records = sorted([*records, *archived], key=lambda item: item.user_check_time)
+    return records
+
+
+def iter_attendance_by_user(
+    userids: Iterable[str],
+    start: date,
+    end: date,
+    *,
+    config_id: str | None = None,
+    fields: Sequence[str] = ATTENDANCE_METRIC_FIELDS,
+    chunk_size: int = 500,
+) -> Iterator[dict[str, list]]:
+    """批量读取多名用户在工作日期范围内的打卡记录（含已归档记录），每 chunk_size 名用户产出一次 {userid: [记录]}.
+
+    记录为只含 fields 字段的命名元组，不加载原始数据列，组内顺序不保证；内存占用只与单批用户的记录数相关。
+    """
+
+    fields = tuple(dict.fromkeys(("record_id", "userid", *fields)))
+    boundary = archive_boundary(config_id)
+    read_archive = boundary is not None and start <= timezone.localdate(boundary)
+    pending = list(dict.fromkeys(userids))
+    for offset in range(0, len(pending), chunk_size):
+        chunk = pending[offset : offset + chunk_size]
+        filters: dict[str, object] = {"userid__in": chunk, "work_date__range": (start, end)}
+        if config_id:
+            filters["config_id"] = config_id
+        groups: dict[str, list] = {userid: [] for userid in chunk}
+        hot = DingTalkAttendanceRecord.objects.filter(**filters).order_by().values_list(*fields, named=True)
+        for row in hot.iterator(chunk_size=2000):
+            groups[row.userid].append(row)
+        if read_archive:
+            seen = {row.record_id for rows in groups.values() for row in rows}
+            archived = DingTalkAttendanceArchive.objects.filter(**filters).order_by().values_list(*fields, named=True)
+            for row in archived.iterator(chunk_size=2000):
+                if row.record_id not in seen:
+                    groups[row.userid].append(row)
+        yield groups
+
+
+def partitioning_enabled() -> bool:
+    return bool(getattr(settings, "DINGTALK", {}).get("ATTENDANCE_PARTITIONING", False))
+
+
+def partition_bounds(first_month: date, last_month: date) -> list[tuple[str, date]]:
+    """按自然月生成 [(分区名, 上界)]，分区名形如 p202501."""
+
+    bounds: list[tuple[str, date]] = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        upper = _add_months(month, 1)
+        bounds.append((f"p{month:%Y%m}", upper))
+        month = upper
+    return bounds
+
+
+def partition_definitions(bounds: list[tuple[str, date]]) -> str:
+    parts = [f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))" for name, upper in bounds]
+    parts.append(f"PARTITION {_MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return ", ".join(parts)
+
+
+def _partition_connection():
+    return connections[router.db_for_write(DingTalkAttendanceRecord)]
+
+
+def _partition_months(now: datetime | None, months_ahead: int | None) -> tuple[date, date]:
+    if months_ahead is None:
+        months_ahead = _setting_int("ATTENDANCE_PARTITION_MONTHS_AHEAD", DEFAULT_ATTENDANCE_PARTITION_MONTHS_AHEAD)
+    # 数据库中保存的是 UTC 时间，分区边界按 UTC 自然月划分
+    current_month = (now or timezone.now()).astimezone(dt_timezone.utc).date().replace(day=1)
+    return current_month, _add_months(current_month, months_ahead)
+
+
+def _existing_partitions(cursor, table_name: str) -> list[str]:
+    cursor.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+        [table_name],
+    )
+    return sorted(row[0] for row in cursor.fetchall() if row[0] != _MAX_PARTITION)
+
+
+# 各数据库别名下热表是否已分区，转换/还原后清除
+_partitioned_tables: dict[str, bool] = {}
+
+
+def attendance_table_partitioned() -> bool:
+    """热表是否已按月分区：分区后 record_id 不再有唯一约束，写入需先删后插（见 bulk_upsert）."""
+
+    connection = _partition_connection()
+    if connection.vendor != "mysql":
+        return False
+    if connection.alias not in _partitioned_tables:
+        with connection.cursor() as cursor:
+            _partitioned_tables[connection.alias] = bool(
+                _existing_partitions(cursor, DingTalkAttendanceRecord._meta.db_table)
+            )
+    return _partitioned_tables[connection.alias]
+
+
+def _execute(connection, statements: list[str]) -> list[str]:
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _partitioned_tables.pop(connection.alias, None)
+    return statements
+
+
+def convert_attendance_partitioning(*, months_ahead: int | None = None, now: datetime | None = None) -> list[str]:
+    """将 MySQL 热表改造为按月 RANGE 分区，返回执行的 SQL；由 partition_dingtalk_attendance --convert 显式执行.
+
+    MySQL 要求分区列出现在每个唯一键中且分区表不支持外键，因此主键改为 (record_id, user_check_time)
+    并删除 config_id 外键约束。Django 5.1 不支持联合主键，模型仍以 record_id 作为 ORM 主键，
+    record_id 的唯一性改由 bulk_upsert 的先删后插写入保证；可通过 revert_attendance_partitioning 还原。
+    """
+
+    connection = _partition_connection()
+    if connection.vendor != "mysql":
+        raise DingTalkConfigurationError(f"考勤分区仅支持 MySQL，当前数据库为 {connection.vendor}")
+    table_name = DingTalkAttendanceRecord._meta.db_table
+    table = connection.ops.quote_name(table_name)
+    current_month, last_month = _partition_months(now, months_ahead)
+    with connection.cursor() as cursor:
+        if _existing_partitions(cursor, table_name):
+            return []
+        cursor.execute(f"SELECT MIN(user_check_time) FROM {table}")
+        earliest = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+            "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [table_name],
+        )
+        foreign_keys = [name for (name,) in cursor.fetchall()]
+    first_month = earliest.date().replace(day=1) if earliest else current_month
+    statements = [f"ALTER TABLE {table} DROP FOREIGN KEY {connection.ops.quote_name(name)}" for name in foreign_keys]
+    statements.append(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (record_id, user_check_time)")
+    statements.append(
+        f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(user_check_time)) "
+        f"({partition_definitions(partition_bounds(first_month, last_month))})"
+    )
+    _execute(connection, statements)
+    logger.info("钉钉考勤热表已改为按月分区 table=%s until=%s", table_name, last_month.isoformat())
+    return statements
+
+
+def revert_attendance_partitioning() -> list[str]:
+    """取消热表分区并恢复 record_id 主键与 config_id 外键，使表结构与迁移状态一致."""
+
+    connection = _partition_connection()
+    if connection.vendor != "mysql":
+        raise DingTalkConfigurationError(f"考勤分区仅支持 MySQL，当前数据库为 {connection.vendor}")
+    model = DingTalkAttendanceRecord
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if not _existing_partitions(cursor, model._meta.db_table):
+            return []
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT record_id FROM {table} GROUP BY record_id HAVING COUNT(*) > 1) t")
+        if cursor.fetchone()[0]:
+            raise DingTalkConfigurationError("考勤热表存在重复的 record_id，无法恢复主键")
+    statements = [
+        f"ALTER TABLE {table} REMOVE PARTITIONING",
+        f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (record_id)",
+    ]
+    with connection.schema_editor(collect_sql=True) as editor:
+        field = model._meta.get_field("config")
+        statements.append(str(editor._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s")))
+    _execute(connection, statements)
+    logger.info("钉钉考勤热表已取消分区 table=%s", model._meta.db_table)
+    return statements
+
+
+def ensure_attendance_partitions(*, months_ahead: int | None = None, now: datetime | None = None) -> list[str]:
+    """为已分区的热表提前建好后续 months_ahead 个月的分区，返回执行的 SQL.
+
+    未开启 ATTENDANCE_PARTITIONING、非 MySQL 数据库或热表尚未分区时不做任何事；
+    表结构的改造只由 convert_attendance_partitioning 显式执行。
+    """
+
+    if not partitioning_enabled():
+        return []
+    connection = _partition_connection()
+    if connection.vendor != "mysql":
+        logger.warning("考勤分区仅支持 MySQL，当前数据库为 %s，已跳过", connection.vendor)
+        return []
+    table_name = DingTalkAttendanceRecord._meta.db_table
+    _, last_month = _partition_months(now, months_ahead)
+    with connection.cursor() as cursor:
+        existing = _existing_partitions(cursor, table_name)
+    if not existing:
+        logger.warning("考勤热表尚未分区，请先执行 partition_dingtalk_attendance --convert")
+        return []
+    latest = datetime.strptime(existing[-1], "p%Y%m").date()
+    bounds = partition_bounds(_add_months(latest, 1), last_month)
+    if not bounds:
+        return []
+    table = connection.ops.quote_name(table_name)
+    statements = [f"ALTER TABLE {table} REORGANIZE PARTITION {_MAX_PARTITION} INTO ({partition_definitions(bounds)})"]
+    _execute(connection, statements)
+    logger.info("钉钉考勤分区已更新 table=%s until=%s", table_name, last_month.isoformat())
+    return statements
+
+
+__all__ = [
+    "ATTENDANCE_METRIC_FIELDS",
+    "archive_attendance",
+    "archive_boundary",
+    "archive_cutoff",
+    "attendance_table_partitioned",
+    "convert_attendance_partitioning",
+    "ensure_attendance_partitions",
+    "fetch_attendance_records",
+    "get_hot_months",
+    "iter_attendance_by_user",
+    "partition_bounds",
+    "partition_definitions",
+    "partitioning_enabled",
+    "revert_attendance_partitioning",
+    "with_archived_records",
+]
@@ -0,0 +1,177 @@
+"""考勤历史数据回溯
+
+钉钉 /attendance/listRecord 对查询的日期跨度有限制，大范围回溯按“日期分片 × 用户批次”拆分，
+分片在线程池中并发执行（仍受共享限流器约束）。每个分片的进度持久化到 AttendanceBackfillShard，
+中断后以相同参数重新执行即可从未完成的分片继续。
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..constants import DEFAULT_ATTENDANCE_USER_GROUP, DEFAULT_MAX_WORKERS, SyncOperation, SyncStatus
+from ..models import AttendanceBackfillShard, DingTalkConfig, DingTalkUser
+from .bulk import get_bulk_batch_size
+from .exceptions import DingTalkAPIError
+from .sync import SyncService
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES: dict[str, timedelta] = {"day": timedelta(days=1), "week": timedelta(days=7)}
+# 处于 running 状态超过该时长的分片视为上次执行中断，可被重新领取
+SHARD_LEASE = timedelta(minutes=30)
+
+
+def make_backfill_id(start: datetime, end: datetime, granularity: str) -> str:
+    return f"{granularity}:{start:%Y%m%d%H%M}-{end:%Y%m%d%H%M}"
+
+
+def iter_date_shards(start: datetime, end: datetime, granularity: str) -> Iterator[tuple[datetime, datetime]]:
+    step = GRANULARITIES[granularity]
+    shard_start = start
+    while True:
+        shard_end = min(shard_start + step, end)
+        yield shard_start, shard_end
+        if shard_end >= end:
+            break
+        shard_start = shard_end
+
+
+def plan_backfill(
+    config: DingTalkConfig,
+    start: datetime,
+    end: datetime,
+    *,
+    granularity: str = "day",
+    user_batch_size: int | None = None,
+    userids: Iterable[str] | None = None,
+) -> str:
+    """生成回溯计划并持久化分片，返回计划标识；同一范围的计划已存在时直接复用."""
+
+    if start > end:
+        raise DingTalkAPIError("开始时间不能晚于结束时间")
+    if granularity not in GRANULARITIES:
+        raise DingTalkAPIError(f"不支持的分片粒度: {granularity}")
+
+    backfill_id = make_backfill_id(start, end, granularity)
+    if AttendanceBackfillShard.objects.filter(config=config, backfill_id=backfill_id).exists():
+        return backfill_id
+
+    if userids is None:
+        userids = DingTalkUser.objects.filter(config=config).order_by("userid").values_list("userid", flat=True)
+    users = list(dict.fromkeys(str(u) for u in userids if u))
+    batch_size = max(1, int(user_batch_size or getattr(settings, "DINGTALK", {}).get("ATTENDANCE_USER_GROUP", DEFAULT_ATTENDANCE_USER_GROUP)))
+    shards = [
+        AttendanceBackfillShard(
+            config=config,
+            backfill_id=backfill_id,
+            shard_start=shard_start,
+            shard_end=shard_end,
+            user_offset=offset,
+            userids=users[offset : offset + batch_size],
+        )
+        for shard_start, shard_end in iter_date_shards(start, end, granularity)
+        for offset in range(0, len(users), batch_size)
+    ]
+    AttendanceBackfillShard.objects.bulk_create(shards, batch_size=get_bulk_batch_size(), ignore_conflicts=True)
+    logger.info("钉钉考勤回溯计划已生成 config=%s backfill=%s shards=%s", config.id, backfill_id, len(shards))
+    return backfill_id
+
+
+def _claimable(config: DingTalkConfig, backfill_id: str):
+    stale_before = timezone.now() - SHARD_LEASE
+    return AttendanceBackfillShard.objects.filter(config=config, backfill_id=backfill_id).filter(
+        Q(status__in=["pending", "failed"]) | Q(status="running", update_time__lt=stale_before)
+    )
+
+
+def _run_shard(service: SyncService, backfill_id: str, shard_id: int) -> int | None:
+    """执行单个分片，返回写入的记录数；分片已被其他进程领取时返回 None."""
+
+    claimed = _claimable(service.config, backfill_id).filter(pk=shard_id).update(
+        status="running",
+        attempts=F("attempts") + 1,
+        error="",
+        update_time=timezone.now(),
+    )
+    if not claimed:
+        return None
+    shard = AttendanceBackfillShard.objects.get(pk=shard_id)
+    progress: dict[str, int] = {}
+    try:
+        pages = service.client.iter_attendance_records(shard.userids, start_time=shard.shard_start, end_time=shard.shard_end)
+        service.store_attendance_pages(pages, progress)
+    except Exception as exc:  # noqa: BLE001 - 单个分片失败不影响其他分片
+        logger.warning("钉钉考勤回溯分片失败 backfill=%s shard=%s error=%s", backfill_id, shard_id, exc)
+        AttendanceBackfillShard.objects.filter(pk=shard_id).update(
+            status="failed",
+            error=str(exc)[:2000],
+            record_count=progress.get("attendance_count", 0),
+            update_time=timezone.now(),
+        )
+        raise
+    count = progress.get("attendance_count", 0)
+    AttendanceBackfillShard.objects.filter(pk=shard_id).update(status="success", record_count=count, update_time=timezone.now())
+    return count
+
+
+def run_backfill(config: DingTalkConfig, backfill_id: str, *, max_workers: int | None = None) -> dict:
+    """执行回溯计划中所有未完成的分片，返回汇总统计."""
+
+    service = SyncService(config)
+    workers = max(1, int(max_workers or getattr(settings, "DINGTALK", {}).get("MAX_WORKERS", DEFAULT_MAX_WORKERS)))
+    shard_ids = list(_claimable(config, backfill_id).values_list("id", flat=True))
+    summary = {"backfill_id": backfill_id, "executed": 0, "skipped": 0, "failed": 0, "attendance_count": 0}
+
+    def _execute(shard_id: int) -> int | None | Exception:
+        try:
+            return _run_shard(service, backfill_id, shard_id)
+        except Exception as exc:  # noqa: BLE001
+            return exc
+
+    def _execute_in_worker(shard_id: int) -> int | None | Exception:
+        try:
+            return _execute(shard_id)
+        finally:
+            connection.close()
+
+    if workers == 1:
+        outcomes = [_execute(shard_id) for shard_id in shard_ids]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dingtalk-backfill") as executor:
+            outcomes = list(executor.map(_execute_in_worker, shard_ids))
+    for outcome in outcomes:
+        if outcome is None:
+            summary["skipped"] += 1
+        elif isinstance(outcome, Exception):
+            summary["failed"] += 1
+        else:
+            summary["executed"] += 1
+            summary["attendance_count"] += outcome
+
+    shards = AttendanceBackfillShard.objects.filter(config=config, backfill_id=backfill_id)
+    summary["total"] = shards.count()
+    summary["remaining"] = shards.exclude(status="success").count()
+    status = SyncStatus.SUCCESS if summary["failed"] == 0 else SyncStatus.FAILED
+    message = f"考勤回溯 {backfill_id}：完成 {summary['executed']} 个分片，失败 {summary['failed']} 个，剩余 {summary['remaining']} 个"
+    service._record_log(  # noqa: SLF001 - 回溯属于同步服务的一部分
+        SyncOperation.SYNC_ATTENDANCE,
+        status,
+        message=message,
+        stats={"mode": "backfill", **summary},
+        level="info" if status == SyncStatus.SUCCESS else "warning",
+    )
+    if summary["remaining"] == 0:
+        service._update_sync_state(status=SyncStatus.SUCCESS, message=message, stats=summary)  # noqa: SLF001
+    return summary
+
+
+__all__ = ["GRANULARITIES", "iter_date_shards", "make_backfill_id", "plan_backfill", "run_backfill"]
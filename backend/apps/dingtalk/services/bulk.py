@@ -0,0 +1,238 @@
+"""批量写入工具
+
+一次查询加载已有记录，在内存中比对差异，再通过 bulk_create/bulk_update 分批落库，
+替代逐行 update_or_create 带来的大量数据库往返。
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from itertools import chain
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Sequence
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Model
+from django.utils import timezone
+
+from ..constants import DEFAULT_BULK_BATCH_SIZE
+from .client import _chunk_iterable
+from .mappers import compute_content_hash
+from .source_storage import encode_source_info, store_external_payloads
+
+
+@dataclass(slots=True)
+class BulkUpsertResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    keys: set[Any] = field(default_factory=set)
+
+    def as_stats(self) -> dict[str, int]:
+        return {"created": self.created, "updated": self.updated, "unchanged": self.unchanged}
+
+
+def get_bulk_batch_size() -> int:
+    value = getattr(settings, "DINGTALK", {}).get("BULK_BATCH_SIZE", DEFAULT_BULK_BATCH_SIZE)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_BULK_BATCH_SIZE
+
+
+# 多配置并行同步时限制同时写库的并发数（见 orchestrator），未设置时不限制
+_write_slots: Any = None
+
+
+def set_write_concurrency(semaphore: Any) -> None:
+    """设置写库并发信号量（threading 或 multiprocessing 的 Semaphore），传入 None 取消限制."""
+
+    global _write_slots
+    _write_slots = semaphore
+
+
+@contextmanager
+def write_slot() -> Iterator[None]:
+    semaphore = _write_slots
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def new_sync_run() -> int:
+    """生成同步批次号（微秒时间戳），后开始的同步批次号更大."""
+
+    return time.time_ns() // 1000
+
+
+def _conflict_options(model: type[Model], key: str, update_fields: Sequence[str]) -> dict[str, Any]:
+    """根据数据库能力生成 bulk_create 的冲突更新参数（MySQL 不支持指定冲突列）"""
+
+    features = connections[router.db_for_write(model)].features
+    if features.supports_update_conflicts_with_target:
+        return {"update_conflicts": True, "unique_fields": [key], "update_fields": list(update_fields)}
+    if features.supports_update_conflicts:
+        return {"update_conflicts": True, "update_fields": list(update_fields)}
+    return {}
+
+
+def _replaces_rows(model: type[Model]) -> bool:
+    """分区后的考勤热表以 (record_id, 打卡时间) 为主键，record_id 没有唯一约束，写入时需先删后插."""
+
+    from ..models import DingTalkAttendanceRecord
+
+    if model is not DingTalkAttendanceRecord:
+        return False
+    from .attendance_archive import attendance_table_partitioned
+
+    return attendance_table_partitioned()
+
+
+def _replace_rows(
+    model: type[Model],
+    key: str,
+    to_create: list[Model],
+    to_update: list[Model],
+    created_fields: Sequence[str],
+    batch_size: int,
+) -> None:
+    # 打卡时间变化后旧行可能位于其他分区，按 key 删除后整行插入；新增的记录也先删除，避免与并发写入重复
+    objs = to_create + to_update
+    if not objs:
+        return
+    for chunk in _chunk_iterable([getattr(obj, key) for obj in objs], batch_size):
+        model._base_manager.filter(**{f"{key}__in": chunk}).delete()
+    created = {getattr(obj, key): [getattr(obj, name) for name in created_fields] for obj in to_update}
+    model._base_manager.bulk_create(objs, batch_size=batch_size)
+    if created_fields and to_update:
+        # bulk_create 会按 auto_now_add 重置创建时间，这里写回原值
+        for obj in to_update:
+            for name, value in zip(created_fields, created[getattr(obj, key)]):
+                setattr(obj, name, value)
+        model._base_manager.bulk_update(to_update, created_fields, batch_size=batch_size)
+
+
+def bulk_upsert(
+    model: type[Model],
+    rows: Iterable[dict[str, Any]],
+    *,
+    key: str,
+    hash_field: str | None = None,
+    batch_size: int | None = None,
+    stamp: dict[str, Any] | None = None,
+) -> BulkUpsertResult:
+    """按主键批量写入映射后的数据行，只写入新增或发生变化的记录.
+
+    ``rows`` 为 ``map_*`` 的输出，同一主键出现多次时以最后一条为准（与逐行 update_or_create 一致）；
+    写入字段取所有行字段的并集，某行缺少的字段保留库中原值（新建时取模型默认值）。
+    指定 ``hash_field`` 时只加载主键与摘要列，摘要一致的记录直接跳过，避免读取和重写 source_info。
+    ``stamp`` 中的字段（如同步批次号）写入所有涉及的记录但不参与摘要与变更判断，
+    未变化的记录按批次执行一次 UPDATE 补写，不会刷新 update_time。
+    读写均经由 ``_base_manager``，软删除的记录同样参与比对，可通过 ``stamp`` 恢复。
+    已分区的考勤热表不能按主键冲突更新，改为按 ``key`` 删除旧行后重新插入，保留原创建时间。
+    """
+
+    batch_size = batch_size or get_bulk_batch_size()
+    stamp = stamp or {}
+    deduped: dict[Any, dict[str, Any]] = {}
+    externals: dict[Any, dict[str, Any]] = {}
+    for row in rows:
+        value = row.get(key)
+        if value in (None, ""):
+            continue
+        if hash_field:
+            row = {**row, hash_field: compute_content_hash(row)}
+        # 摘要按完整原始数据计算后再套用 source_info 存储策略
+        row, external = encode_source_info(model, row)
+        if external is None:
+            externals.pop(value, None)
+        else:
+            externals[value] = external
+        if stamp:
+            row = {**row, **stamp}
+        deduped[value] = row
+
+    result = BulkUpsertResult(keys=set(deduped))
+    if not deduped:
+        return result
+
+    # 各行字段不一定相同，取所有行字段的并集；某行缺少的字段保留库中原值
+    update_fields = list(dict.fromkeys(name for row in deduped.values() for name in row if name != key))
+    partial = any(len(row) != len(update_fields) + 1 for row in deduped.values())
+    auto_now_fields = [f.attname for f in model._meta.concrete_fields if getattr(f, "auto_now", False)]
+    replace = _replaces_rows(model)
+    created_fields = [f.attname for f in model._meta.concrete_fields if getattr(f, "auto_now_add", False)] if replace else []
+
+    existing: dict[Any, Model] = {}
+    for chunk in _chunk_iterable(deduped.keys(), batch_size):
+        queryset = model._base_manager.filter(**{f"{key}__in": chunk})
+        if hash_field and not partial:
+            queryset = queryset.only(key, hash_field, *created_fields)
+        for obj in queryset:
+            existing[getattr(obj, key)] = obj
+
+    now = timezone.now()
+    to_create: list[Model] = []
+    to_update: list[Model] = []
+    unchanged_keys: list[Any] = []
+    for value, row in deduped.items():
+        obj = existing.get(value)
+        if obj is None:
+            to_create.append(model(**row))
+            continue
+        if hash_field:
+            changed = getattr(obj, hash_field) != row[hash_field]
+            if changed and partial:
+                for name, field_value in row.items():
+                    setattr(obj, name, field_value)
+            elif changed:
+                obj = model(**row, **{name: getattr(obj, name) for name in created_fields})
+        else:
+            changed = False
+            for name in update_fields:
+                if name in stamp or name not in row:
+                    continue
+                if getattr(obj, name) != row[name]:
+                    setattr(obj, name, row[name])
+                    changed = True
+            for name, stamp_value in stamp.items():
+                setattr(obj, name, stamp_value)
+        if not changed:
+            result.unchanged += 1
+            unchanged_keys.append(value)
+            continue
+        for name in auto_now_fields:
+            setattr(obj, name, now)
+        to_update.append(obj)
+
+    write_fields = update_fields + [name for name in auto_now_fields if name not in update_fields]
+    with write_slot(), transaction.atomic(using=router.db_for_write(model)):
+        if replace:
+            _replace_rows(model, key, to_create, to_update, created_fields, batch_size)
+        if to_create and not replace:
+            model._base_manager.bulk_create(
+                to_create,
+                batch_size=batch_size,
+                **_conflict_options(model, key, write_fields),
+            )
+        if to_update and not replace:
+            model._base_manager.bulk_update(to_update, write_fields, batch_size=batch_size)
+        if stamp:
+            for chunk in _chunk_iterable(unchanged_keys, batch_size):
+                model._base_manager.filter(**{f"{key}__in": chunk}).update(**stamp)
+        if externals:
+            written = (getattr(obj, key) for obj in chain(to_create, to_update))
+            store_external_payloads(
+                model, [(deduped[value]["config_id"], value, externals[value]) for value in written if value in externals]
+            )
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    return result
+
+
+__all__ = ["BulkUpsertResult", "bulk_upsert", "get_bulk_batch_size", "new_sync_run", "set_write_concurrency", "write_slot"]
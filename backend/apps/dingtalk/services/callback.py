@@ -0,0 +1,91 @@
+"""钉钉回调加解密
+
+实现钉钉事件回调的签名校验与 AES-256-CBC 加解密：
+签名为 token、timestamp、nonce、encrypt 字典序拼接后的 SHA1；
+明文结构为 16 字节随机串 + 4 字节网络序长度 + 消息体 + 接收方标识（AppKey/CorpId），PKCS#7 以 32 字节补位。
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import time
+from typing import Iterable
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from ..models import DingTalkConfig
+from .exceptions import DingTalkCallbackError, DingTalkConfigurationError
+
+BLOCK_SIZE = 32
+
+
+class DingTalkCallbackCrypto:
+    """基于回调 Token 与 AES Key 的验签、解密与响应加密"""
+
+    def __init__(self, token: str, aes_key: str, receive_ids: Iterable[str]) -> None:
+        if not token or len(aes_key or "") != 43:
+            raise DingTalkConfigurationError("回调 Token 未配置或 AES Key 长度不是 43 位")
+        try:
+            self._key = base64.b64decode(aes_key + "=")
+        except ValueError as exc:
+            raise DingTalkConfigurationError("回调 AES Key 不是合法的 Base64 字符串") from exc
+        self.token = token
+        self.receive_ids = [item for item in receive_ids if item]
+
+    @classmethod
+    def for_config(cls, config: DingTalkConfig) -> "DingTalkCallbackCrypto":
+        return cls(config.callback_token, config.callback_aes_key, [config.app_key, config.tenant_id])
+
+    def _cipher(self) -> Cipher:
+        return Cipher(algorithms.AES(self._key), modes.CBC(self._key[:16]))
+
+    def signature(self, timestamp: str, nonce: str, encrypt: str) -> str:
+        return hashlib.sha1("".join(sorted([self.token, timestamp, nonce, encrypt])).encode("utf-8")).hexdigest()
+
+    def decrypt(self, signature: str, timestamp: str, nonce: str, encrypt: str) -> str:
+        """校验签名并解密回调消息，返回消息体明文（JSON 字符串）."""
+
+        if not encrypt or not hmac.compare_digest(self.signature(timestamp, nonce, encrypt), signature or ""):
+            raise DingTalkCallbackError("回调签名校验失败")
+        try:
+            decryptor = self._cipher().decryptor()
+            plain = decryptor.update(base64.b64decode(encrypt)) + decryptor.finalize()
+        except ValueError as exc:
+            raise DingTalkCallbackError("回调消息解密失败") from exc
+        pad = plain[-1] if plain else 0
+        if not 1 <= pad <= BLOCK_SIZE or len(plain) < 20 + pad:
+            raise DingTalkCallbackError("回调消息补位不合法")
+        content = plain[16:-pad]
+        (length,) = struct.unpack(">I", content[:4])
+        message = content[4 : 4 + length]
+        receive_id = content[4 + length :].decode("utf-8", errors="replace")
+        if self.receive_ids and receive_id not in self.receive_ids:
+            raise DingTalkCallbackError(f"回调接收方不匹配: {receive_id}")
+        return message.decode("utf-8")
+
+    def encrypt(self, message: str, *, timestamp: str | None = None, nonce: str | None = None) -> dict[str, str]:
+        """加密响应消息，返回钉钉要求的 msg_signature/timeStamp/nonce/encrypt 结构."""
+
+        body = message.encode("utf-8")
+        receive_id = (self.receive_ids[0] if self.receive_ids else "").encode("utf-8")
+        raw = os.urandom(16) + struct.pack(">I", len(body)) + body + receive_id
+        pad = BLOCK_SIZE - len(raw) % BLOCK_SIZE
+        raw += bytes([pad]) * pad
+        encryptor = self._cipher().encryptor()
+        encrypt = base64.b64encode(encryptor.update(raw) + encryptor.finalize()).decode("ascii")
+        timestamp = timestamp or str(int(time.time() * 1000))
+        nonce = nonce or secrets.token_hex(8)
+        return {
+            "msg_signature": self.signature(timestamp, nonce, encrypt),
+            "timeStamp": timestamp,
+            "nonce": nonce,
+            "encrypt": encrypt,
+        }
+
+
+__all__ = ["DingTalkCallbackCrypto"]
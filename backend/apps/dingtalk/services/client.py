@@ -3,53 +3,35 @@ from __future__ import annotations
 import json
 import logging
 import threading
-from collections import defaultdict
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, timezone as dt_timezone
-from time import monotonic, sleep
-from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+from itertools import islice
+from time import sleep
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
 
 import requests
 from requests import Response
 from django.conf import settings
 from django.utils import timezone
 
-from ..constants import BASE_URL, DEFAULT_TIMEOUT, OPEN_API_BASE_URL, DEFAULT_DIMISSION_ROSTER_FIELDS
+from ..constants import ATTENDANCE_USERS_PER_REQUEST, BASE_URL, DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT, OPEN_API_BASE_URL, DEFAULT_DIMISSION_ROSTER_FIELDS, THROTTLE_ERRCODES
 from ..models import DingTalkConfig
-from .exceptions import DingTalkAPIError, DingTalkConfigurationError
+from .exceptions import DingTalkAPIError, DingTalkCircuitOpenError, DingTalkConfigurationError, DingTalkTransientError
+from .ratelimit import get_rate_limit_metrics, get_rate_limiter
+from .retry import RetryPolicy, get_circuit_breaker, parse_retry_after
+from .token import get_token_provider
+from .transport import get_connection_stats, get_session
 
 logger = logging.getLogger(__name__)
 
-# 进程内速率控制
-_rate_lock = threading.Lock()
-_rate_state: dict[Tuple[str, str], dict[str, float | int]] = defaultdict(lambda: {"timestamp": 0.0, "count": 0})
-
 _DEFAULT_ROSTER_FIELDS: tuple[str, ...] = DEFAULT_DIMISSION_ROSTER_FIELDS
 
 
 def _respect_rate_limit(bucket: str, config_id: str, *, limit: int = 15, interval: float = 1.0) -> None:
-    """简单的滑动窗口节流，避免钉钉接口在 1 秒内被调用超过限制."""
-
-    key = (config_id, bucket)
-    with _rate_lock:
-        state = _rate_state[key]
-        now = monotonic()
-        timestamp = float(state.get("timestamp", 0.0))
-        count = int(state.get("count", 0))
-
-        if now - timestamp >= interval:
-            state["timestamp"] = now
-            state["count"] = 1
-            return
+    """令牌桶节流，避免钉钉接口在 interval 秒内被调用超过 limit 次（多 worker 共享额度见 ratelimit 模块）."""
 
-        if count >= limit:
-            wait = interval - (now - timestamp) + 0.05
-            if wait > 0:
-                sleep(wait)
-            now = monotonic()
-            state["timestamp"] = now
-            state["count"] = 1
-        else:
-            state["count"] = count + 1
+    get_rate_limiter().acquire(f"{config_id}:{bucket}", rate=limit / interval, capacity=limit)
 
 
 def _chunk_iterable(iterable: Iterable[Any], size: int) -> Iterable[list[Any]]:
@@ -63,6 +45,191 @@ def _chunk_iterable(iterable: Iterable[Any], size: int) -> Iterable[list[Any]]:
         yield chunk
 
 
+# ----------------- 响应解析（同步/异步客户端共用） ----------------- #
+def _raise_for_transient_status(response: Any, label: str) -> None:
+    if response.status_code == 429 or response.status_code >= 500:
+        raise DingTalkTransientError(
+            f"{label}服务异常: {response.status_code}",
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+
+def _parse_payload(response: Any) -> Dict[str, Any]:
+    try:
+        payload = response.json()
+    except ValueError as exc:
+        raise DingTalkAPIError("钉钉接口返回非 JSON 数据", payload={"text": response.text}) from exc
+
+    if isinstance(payload, dict) and payload.get("errcode") not in (0, None):
+        errmsg = payload.get("errmsg", "钉钉接口调用失败")
+        error_cls = DingTalkTransientError if payload.get("errcode") in THROTTLE_ERRCODES else DingTalkAPIError
+        raise error_cls(f"{errmsg}(errcode={payload.get('errcode')})", payload=payload)
+    if not isinstance(payload, dict):
+        raise DingTalkAPIError("钉钉接口返回格式异常", payload={"raw": payload})
+    return payload
+
+
+def _parse_open_api_payload(response: Any) -> Dict[str, Any]:
+    try:
+        result = response.json()
+    except ValueError as exc:
+        raise DingTalkAPIError("钉钉开放接口返回非 JSON 数据", payload={"text": response.text}) from exc
+
+    if isinstance(result, dict) and result.get("code") not in (None, "0"):
+        message = result.get("message") or result.get("msg") or "钉钉开放接口调用失败"
+        error_cls = DingTalkTransientError if "qpslimit" in str(result.get("code")).lower() else DingTalkAPIError
+        raise error_cls(f"{message}(code={result.get('code')})", payload=result)
+    if not isinstance(result, dict):
+        raise DingTalkAPIError("钉钉开放接口返回格式异常", payload={"raw": result})
+    return result
+
+
+def _extract_dept_list(payload: Dict[str, Any]) -> list[Dict[str, Any]]:
+    result_obj = payload.get("result")
+    if isinstance(result_obj, dict):
+        dept_list = result_obj.get("dept_list") or []
+    elif isinstance(result_obj, list):
+        dept_list = result_obj
+    else:
+        dept_list = []
+    return [dept for dept in dept_list if isinstance(dept, dict)]
+
+
+class UserMerger:
+    """按 userid 增量合并各部门成员，部门列表取并集；add 返回本批新增或内容发生变化的合并结果."""
+
+    def __init__(self) -> None:
+        self.users: dict[str, dict[str, Any]] = {}
+        self._dept_sets: dict[str, set[int]] = {}
+
+    def add(self, user_list: Iterable[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        touched: dict[str, dict[str, Any]] = {}
+        for user in user_list:
+            userid = user.get("userid")
+            if not userid:
+                continue
+            dept_set = self._dept_sets.setdefault(userid, set())
+            dept_size = len(dept_set)
+            dept_set.update(user.get("dept_id_list") or [])
+            current = self.users.get(userid)
+            if current is None:
+                self.users[userid] = current = user
+                changed = True
+            else:
+                updates = {k: v for k, v in user.items() if v not in (None, "") and current.get(k) != v}
+                current.update(updates)
+                changed = bool(updates) or len(dept_set) != dept_size
+            if dept_set:
+                current["dept_id_list"] = sorted(dept_set)
+            if changed:
+                touched[userid] = current
+        return list(touched.values())
+
+    def result(self) -> list[Dict[str, Any]]:
+        return list(self.users.values())
+
+
+def _merge_users(user_lists: Iterable[list[Dict[str, Any]]]) -> list[Dict[str, Any]]:
+    """按 userid 合并各部门成员，部门列表取并集."""
+
+    merger = UserMerger()
+    for user_list in user_lists:
+        merger.add(user_list)
+    return merger.result()
+
+
+def _extract_dimission_infos(data: Dict[str, Any]) -> list[Dict[str, Any]]:
+    data_list = data.get("result") or data.get("data") or []
+    if isinstance(data_list, dict):
+        data_list = data_list.get("records") or []
+    return [item for item in data_list if isinstance(item, dict)]
+
+
+def _extract_roster_records(data: Dict[str, Any]) -> list[Dict[str, Any]]:
+    records = data.get("result") or data.get("data") or data.get("records") or data.get("body")
+    if isinstance(records, dict):
+        records = records.get("data") or records.get("records")
+    if not isinstance(records, list):
+        return []
+    return [item for item in records if isinstance(item, dict)]
+
+
+def _parse_roster_items(raw_items: Iterable[Any]) -> dict[str, dict[str, Any]]:
+    roster_map: dict[str, dict[str, Any]] = {}
+    for item in raw_items:
+        if not isinstance(item, dict):
+            continue
+        userid = str(item.get("userId") or item.get("userid") or "")
+        if not userid:
+            continue
+        field_data_list = item.get("fieldDataList") or item.get("field_data_list") or []
+        parsed: dict[str, Any] = {}
+        if isinstance(field_data_list, list):
+            for field_entry in field_data_list:
+                if not isinstance(field_entry, dict):
+                    continue
+                code = field_entry.get("fieldCode") or field_entry.get("field_code")
+                if not code:
+                    continue
+                values_raw = field_entry.get("fieldValueList") or field_entry.get("field_value_list") or []
+                value = None
+                label = None
+                normalized_values: list[Any] = []
+                if isinstance(values_raw, list) and values_raw:
+                    first = values_raw[0]
+                    if isinstance(first, dict):
+                        label = first.get("label")
+                        value = first.get("value") or label
+                    else:
+                        value = first
+                    for item_value in values_raw:
+                        if isinstance(item_value, dict):
+                            normalized_values.append(item_value.get("value") or item_value.get("label"))
+                        else:
+                            normalized_values.append(item_value)
+                elif values_raw not in (None, ""):
+                    value = values_raw
+                    normalized_values = [values_raw]
+                if value in (None, "") and label in (None, ""):
+                    continue
+                parsed[code] = {
+                    "value": value,
+                    "label": label,
+                    "values": [v for v in normalized_values if v not in (None, "")],
+                }
+        roster_map[userid] = parsed
+    return roster_map
+
+
+def _parse_attendance_page(payload: Dict[str, Any]) -> tuple[list[Dict[str, Any]], bool | None]:
+    result_obj = payload.get("result") or payload
+    records = []
+    has_more_flag = None
+    if isinstance(result_obj, dict):
+        records = result_obj.get("recordresult") or []
+        has_more_flag = result_obj.get("has_more")
+        if has_more_flag is None:
+            has_more_flag = result_obj.get("hasMore")
+    elif isinstance(result_obj, list):
+        records = result_obj
+    if not isinstance(records, list):
+        records = []
+    has_more = bool(has_more_flag) if has_more_flag is not None else None
+    return records, has_more
+
+
+def _attendance_request_data(batch: list[str], start_str: str, end_str: str, offset: int, limit: int) -> Dict[str, Any]:
+    return {
+        "userIdList": batch,
+        "userIds": batch,
+        "checkDateFrom": start_str,
+        "checkDateTo": end_str,
+        "isI18n": False,
+        "offset": offset,
+        "limit": limit,
+    }
+
+
 class DingTalkClient:
     """基于 requests 的钉钉开放平台客户端"""
 
@@ -72,17 +239,96 @@ class DingTalkClient:
         *,
         timeout: int | None = None,
         session: requests.Session | None = None,
+        max_workers: int | None = None,
+        retry_policy: RetryPolicy | None = None,
     ) -> None:
         self.config = config
         if not self.config.app_key or not self.config.app_secret:
             raise DingTalkConfigurationError("请先配置钉钉 AppKey/AppSecret")
         self.timeout = timeout or getattr(settings, "DINGTALK", {}).get("DEFAULT_TIMEOUT", DEFAULT_TIMEOUT)
-        self.session = session or requests.Session()
-        proxies = getattr(settings, "DINGTALK", {}).get("PROXY")
-        if proxies:
-            self.session.proxies.update(proxies)
+        self.max_workers = max(1, int(max_workers or getattr(settings, "DINGTALK", {}).get("MAX_WORKERS", DEFAULT_MAX_WORKERS)))
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self._counters: Counter[str] = Counter()
+        self._counters_lock = threading.Lock()
+        if session is None:
+            self.session = get_session(self.config.id)
+        else:
+            self.session = session
+            proxies = getattr(settings, "DINGTALK", {}).get("PROXY")
+            if proxies:
+                self.session.proxies.update(proxies)
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._counters_lock:
+            self._counters[name] += value
+
+    def get_metrics(self) -> dict[str, Any]:
+        prefix = f"{self.config.id}:"
+        rate_limit = {key[len(prefix) :]: value for key, value in get_rate_limit_metrics().items() if key.startswith(prefix)}
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {"rate_limit": rate_limit, "connection": get_connection_stats(self.session), **counters}
 
     # --------------------------- 基础 HTTP 封装 --------------------------- #
+    def _call_with_retry(
+        self,
+        endpoint: str,
+        send: Callable[[], Dict[str, Any]],
+        *,
+        bucket: str | None = None,
+        limit: int = 15,
+    ) -> Dict[str, Any]:
+        """统一的重试/熔断入口：限流错误码、429/5xx 与网络异常按指数退避重试.
+
+        每次发送（包括重试）前都重新检查熔断器并从 ``bucket`` 令牌桶取令牌，重试同样计入接口频率。
+        """
+
+        breaker = get_circuit_breaker(f"{self.config.id}:{endpoint}")
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count("circuit_open")
+                raise DingTalkCircuitOpenError(f"钉钉接口 {endpoint} 连续失败，已暂时熔断，请稍后重试")
+            if bucket:
+                _respect_rate_limit(bucket, self.config.id, limit=limit)
+            try:
+                result = send()
+            except DingTalkTransientError as exc:
+                # 熔断冷却后的试探请求失败时直接重新熔断，不再重试
+                if attempt >= self.retry_policy.max_retries or breaker.is_open:
+                    breaker.record_failure()
+                    raise
+                delay = self.retry_policy.compute_delay(attempt, exc.retry_after)
+                logger.warning(
+                    "钉钉接口暂时不可用，准备重试 config=%s endpoint=%s attempt=%s delay=%.2fs error=%s",
+                    self.config.id,
+                    endpoint,
+                    attempt + 1,
+                    delay,
+                    exc,
+                )
+                self._count("retries")
+                sleep(delay)
+                attempt += 1
+                continue
+            except DingTalkAPIError:
+                # 业务错误说明接口本身可用，不计入熔断
+                breaker.record_success()
+                raise
+            breaker.record_success()
+            return result
+
+    def _send(self, method: str, url: str, *, label: str, **kwargs: Any) -> Response:
+        try:
+            response: Response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise DingTalkTransientError(f"{label}网络异常: {exc}") from exc
+        except requests.RequestException as exc:  # pragma: no cover - 网络错误
+            raise DingTalkAPIError(f"{label}网络异常: {exc}") from exc
+
+        _raise_for_transient_status(response, label)
+        return response
+
     def _request(
         self,
         method: str,
@@ -91,38 +337,18 @@ class DingTalkClient:
         params: Optional[Dict[str, Any]] = None,
         data: Optional[Dict[str, Any]] = None,
         access_token: Optional[str] = None,
+        bucket: str | None = None,
+        limit: int = 15,
     ) -> Dict[str, Any]:
         params = params.copy() if params else {}
         if access_token:
             params.setdefault("access_token", access_token)
         url = f"{BASE_URL}{path}"
-        headers = {"Content-Type": "application/json;charset=utf-8"}
 
-        try:
-            response: Response = self.session.request(
-                method,
-                url,
-                params=params,
-                json=data,
-                timeout=self.timeout,
-            )
-        except requests.RequestException as exc:  # pragma: no cover - 网络错误
-            raise DingTalkAPIError(f"钉钉接口网络异常: {exc}") from exc
-
-        if response.status_code >= 500:  # pragma: no cover - 钉钉返回500
-            raise DingTalkAPIError(f"钉钉接口服务异常: {response.status_code}")
-
-        try:
-            payload = response.json()
-        except ValueError as exc:
-            raise DingTalkAPIError("钉钉接口返回非 JSON 数据", payload={"text": response.text}) from exc
+        def _send_once() -> Dict[str, Any]:
+            return _parse_payload(self._send(method, url, label="钉钉接口", params=params, json=data))
 
-        if isinstance(payload, dict) and payload.get("errcode") not in (0, None):
-            errmsg = payload.get("errmsg", "钉钉接口调用失败")
-            raise DingTalkAPIError(f"{errmsg}(errcode={payload.get('errcode')})", payload=payload)
-        if not isinstance(payload, dict):
-            raise DingTalkAPIError("钉钉接口返回格式异常", payload={"raw": payload})
-        return payload
+        return self._call_with_retry(path, _send_once, bucket=bucket, limit=limit)
 
     def _request_open_api(
         self,
@@ -132,6 +358,8 @@ class DingTalkClient:
         params: Optional[Dict[str, Any]] = None,
         data: Optional[Dict[str, Any]] = None,
         access_token: Optional[str] = None,
+        bucket: str | None = None,
+        limit: int = 15,
     ) -> Dict[str, Any]:
         params = params.copy() if params else {}
         payload = data.copy() if data else None
@@ -141,39 +369,27 @@ class DingTalkClient:
             "Content-Type": "application/json;charset=utf-8",
             "x-acs-dingtalk-access-token": token,
         }
-        try:
-            response: Response = self.session.request(
+
+        def _send_once() -> Dict[str, Any]:
+            response = self._send(
                 method,
                 url,
+                label="钉钉开放接口",
                 params=params if method.upper() == "GET" else None,
                 json=payload if method.upper() != "GET" else None,
-                timeout=self.timeout,
                 headers=headers,
             )
-        except requests.RequestException as exc:  # pragma: no cover
-            raise DingTalkAPIError(f"钉钉开放接口网络异常: {exc}") from exc
+            return _parse_open_api_payload(response)
 
-        if response.status_code >= 500:  # pragma: no cover
-            raise DingTalkAPIError(f"钉钉开放接口服务异常: {response.status_code}")
-
-        try:
-            result = response.json()
-        except ValueError as exc:
-            raise DingTalkAPIError("钉钉开放接口返回非 JSON 数据", payload={"text": response.text}) from exc
-
-        if isinstance(result, dict) and result.get("code") not in (None, "0"):
-            message = result.get("message") or result.get("msg") or "钉钉开放接口调用失败"
-            raise DingTalkAPIError(f"{message}(code={result.get('code')})", payload=result)
-        if not isinstance(result, dict):
-            raise DingTalkAPIError("钉钉开放接口返回格式异常", payload={"raw": result})
-        return result
+        return self._call_with_retry(path.split("?", 1)[0], _send_once, bucket=bucket, limit=limit)
 
     # --------------------------- 令牌管理 --------------------------- #
     def get_access_token(self, *, force_refresh: bool = False) -> str:
-        if not force_refresh and self.config.access_token and self.config.access_token_expires_at:
-            if self.config.access_token_expires_at - timezone.now() > timezone.timedelta(minutes=2):
-                return self.config.access_token
+        """获取令牌：依次查找进程内缓存、Django cache、数据库，均失效时单飞刷新（见 token 模块）."""
+
+        return get_token_provider().get(self.config, self._fetch_access_token, force_refresh=force_refresh)
 
+    def _fetch_access_token(self) -> tuple[str, int]:
         payload = self._request(
             "GET",
             "/gettoken",
@@ -182,13 +398,7 @@ class DingTalkClient:
                 "appsecret": self.config.app_secret,
             },
         )
-        access_token = payload.get("access_token", "")
-        expires_in = int(payload.get("expires_in", 7200))
-        expires_at = timezone.now() + timezone.timedelta(seconds=max(expires_in - 60, 60))
-        self.config.access_token = access_token
-        self.config.access_token_expires_at = expires_at
-        self.config.save(update_fields=["access_token", "access_token_expires_at", "update_time"])
-        return access_token
+        return payload.get("access_token", ""), int(payload.get("expires_in", 7200))
 
     # --------------------------- 部门接口 --------------------------- #
     def get_department(self, dept_id: int, *, access_token: str | None = None) -> Dict[str, Any]:
@@ -203,47 +413,67 @@ class DingTalkClient:
         return result if isinstance(result, dict) else {}
 
     def list_departments(self, root_dept_id: int = 1) -> list[Dict[str, Any]]:
-        token = self.get_access_token()
+        """按层广度优先遍历部门树，同层子部门在线程池中并发拉取."""
+
+        return [dept for level in self.iter_department_levels(root_dept_id) for dept in level]
+
+    def iter_department_levels(self, root_dept_id: int = 1, *, access_token: str | None = None) -> Iterator[list[Dict[str, Any]]]:
+        """逐层产出部门列表（首层为根部门），调用方可在下一层拉取期间处理上一层数据."""
+
+        token = access_token or self.get_access_token()
         visited: set[int] = set()
-        results: list[Dict[str, Any]] = []
 
-        def _walk(dept_id: int) -> None:
+        def _list_sub(dept_id: int) -> list[Dict[str, Any]]:
             payload = self._request(
                 "POST",
                 "/topapi/v2/department/listsub",
                 data={"dept_id": dept_id, "language": "zh_CN"},
                 access_token=token,
+                bucket="department",
             )
-            result_obj = payload.get("result")
-            if isinstance(result_obj, dict):
-                dept_list = result_obj.get("dept_list") or []
-            elif isinstance(result_obj, list):
-                dept_list = result_obj
-            else:
-                dept_list = []
-            for dept in dept_list:
-                if not isinstance(dept, dict):
-                    continue
-                child_dept_id = dept.get("dept_id")
-                if child_dept_id is None or child_dept_id in visited:
-                    continue
-                visited.add(child_dept_id)
-                results.append(dept)
-                _walk(child_dept_id)
+            return _extract_dept_list(payload)
 
         root_info = self.get_department(root_dept_id, access_token=token)
         if root_info:
             root_id = root_info.get("dept_id", root_dept_id)
             visited.add(root_id)
-            results.append(root_info)
-            _walk(root_id)
+            yield [root_info]
+            level = [root_id]
         else:
-            _walk(root_dept_id)
-        return results
+            level = [root_dept_id]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dingtalk-dept") as executor:
+            while level:
+                next_level: list[int] = []
+                departments: list[Dict[str, Any]] = []
+                # executor.map 保持输入顺序，保证结果稳定
+                for dept_list in executor.map(_list_sub, level):
+                    for dept in dept_list:
+                        child_dept_id = dept.get("dept_id")
+                        if child_dept_id is None or child_dept_id in visited:
+                            continue
+                        visited.add(child_dept_id)
+                        departments.append(dept)
+                        next_level.append(child_dept_id)
+                if departments:
+                    yield departments
+                level = next_level
 
     # --------------------------- 用户接口 --------------------------- #
-    def list_users_by_dept(self, dept_id: int, *, size: int = 100) -> list[Dict[str, Any]]:
-        token = self.get_access_token()
+    def get_user(self, userid: str, *, access_token: str | None = None) -> Dict[str, Any]:
+        token = access_token or self.get_access_token()
+        response = self._request(
+            "POST",
+            "/topapi/v2/user/get",
+            data={"userid": userid, "language": "zh_CN"},
+            access_token=token,
+            bucket="user",
+        )
+        result = response.get("result")
+        return result if isinstance(result, dict) else {}
+
+    def list_users_by_dept(self, dept_id: int, *, size: int = 100, access_token: str | None = None) -> list[Dict[str, Any]]:
+        token = access_token or self.get_access_token()
         cursor = 0
         results: list[Dict[str, Any]] = []
         while True:
@@ -257,6 +487,7 @@ class DingTalkClient:
                     "language": "zh_CN",
                 },
                 access_token=token,
+                bucket="user",
             )
             result_data = payload.get("result") or {}
             user_list = result_data.get("list") or []
@@ -268,21 +499,36 @@ class DingTalkClient:
         return results
 
     def list_all_users(self, dept_ids: Iterable[int]) -> list[Dict[str, Any]]:
-        aggregated: dict[str, dict[str, Any]] = {}
-        for dept_id in dept_ids:
-            for user in self.list_users_by_dept(dept_id):
-                userid = user.get("userid")
-                if not userid:
-                    continue
-                current = aggregated.get(userid)
-                if current:
-                    dept_id_list = set(current.get("dept_id_list") or [])
-                    dept_id_list.update(user.get("dept_id_list") or [])
-                    current["dept_id_list"] = sorted(dept_id_list)
-                    current.update({k: v for k, v in user.items() if v not in (None, "")})
-                else:
-                    aggregated[userid] = user
-        return list(aggregated.values())
+        """并发分页拉取各部门成员，并按 userid 流式合并（部门列表取并集）."""
+
+        # iter_user_batches 按部门顺序产出结果，合并阶段与后续部门的拉取重叠进行
+        return _merge_users(self.iter_user_batches(dept_ids))
+
+    def iter_user_batches(self, dept_ids: Iterable[int], *, access_token: str | None = None) -> Iterator[list[Dict[str, Any]]]:
+        """在线程池中并发拉取各部门成员，按部门顺序逐个产出（未合并，同一用户可能出现在多个部门中）.
+
+        同时提交的部门最多为 max_workers 的两倍，调用方取走一个结果后才提交下一个部门，
+        消费变慢时拉取随之放缓，已完成的结果不会在内存中无限堆积。
+        """
+
+        token = access_token or self.get_access_token()
+
+        def _fetch(dept_id: int) -> list[Dict[str, Any]]:
+            return self.list_users_by_dept(dept_id, access_token=token)
+
+        remaining = iter(list(dict.fromkeys(dept_ids)))
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dingtalk-user") as executor:
+            in_flight = deque(executor.submit(_fetch, dept_id) for dept_id in islice(remaining, self.max_workers * 2))
+            try:
+                while in_flight:
+                    batch = in_flight.popleft().result()
+                    for dept_id in islice(remaining, 1):
+                        in_flight.append(executor.submit(_fetch, dept_id))
+                    yield batch
+            finally:
+                # 提前结束（调用方关闭生成器或拉取失败）时取消尚未开始的请求
+                for future in in_flight:
+                    future.cancel()
 
     # --------------------------- 离职人员接口 --------------------------- #
     def list_dimission_userids(self, *, max_results: int = 50) -> list[str]:
@@ -320,50 +566,7 @@ class DingTalkClient:
             logger.warning("fallback to legacy roster api: %s", exc)
             raw_items = self._list_roster_infos_legacy(unique_ids, fields)
 
-        roster_map: dict[str, dict[str, Any]] = {}
-        for item in raw_items:
-            if not isinstance(item, dict):
-                continue
-            userid = str(item.get("userId") or item.get("userid") or "")
-            if not userid:
-                continue
-            field_data_list = item.get("fieldDataList") or item.get("field_data_list") or []
-            parsed: dict[str, Any] = {}
-            if isinstance(field_data_list, list):
-                for field_entry in field_data_list:
-                    if not isinstance(field_entry, dict):
-                        continue
-                    code = field_entry.get("fieldCode") or field_entry.get("field_code")
-                    if not code:
-                        continue
-                    values_raw = field_entry.get("fieldValueList") or field_entry.get("field_value_list") or []
-                    value = None
-                    label = None
-                    normalized_values: list[Any] = []
-                    if isinstance(values_raw, list) and values_raw:
-                        first = values_raw[0]
-                        if isinstance(first, dict):
-                            label = first.get("label")
-                            value = first.get("value") or label
-                        else:
-                            value = first
-                        for item_value in values_raw:
-                            if isinstance(item_value, dict):
-                                normalized_values.append(item_value.get("value") or item_value.get("label"))
-                            else:
-                                normalized_values.append(item_value)
-                    elif values_raw not in (None, ""):
-                        value = values_raw
-                        normalized_values = [values_raw]
-                    if value in (None, "") and label in (None, ""):
-                        continue
-                    parsed[code] = {
-                        "value": value,
-                        "label": label,
-                        "values": [v for v in normalized_values if v not in (None, "")],
-                    }
-            roster_map[userid] = parsed
-        return roster_map
+        return _parse_roster_items(raw_items)
 
     # --- 新版 OpenAPI --- #
     def _list_dimission_userids_open_api(self, *, max_results: int = 50) -> list[str]:
@@ -375,8 +578,7 @@ class DingTalkClient:
             query = params.copy()
             if next_token:
                 query["nextToken"] = next_token
-            _respect_rate_limit("dimission-list", self.config.id)
-            payload = self._request_open_api("GET", "/v1.0/hrm/employees/dismissions", params=query)
+            payload = self._request_open_api("GET", "/v1.0/hrm/employees/dismissions", params=query, bucket="dimission-list")
             user_list = payload.get("userIdList") or []
             userids.extend(str(u) for u in user_list if u)
             has_more = payload.get("hasMore")
@@ -390,15 +592,9 @@ class DingTalkClient:
         for batch in _chunk_iterable([str(u) for u in userids if u], 50):
             if not batch:
                 continue
-            _respect_rate_limit("dimission-info", self.config.id)
             params = {"userIdList": json.dumps(batch, ensure_ascii=False)}
-            data = self._request_open_api("GET", "/v1.0/hrm/employees/dimissionInfos", params=params)
-            data_list = data.get("result") or data.get("data") or []
-            if isinstance(data_list, dict):
-                data_list = data_list.get("records") or []
-            for item in data_list:
-                if isinstance(item, dict):
-                    results.append(item)
+            data = self._request_open_api("GET", "/v1.0/hrm/employees/dimissionInfos", params=params, bucket="dimission-info")
+            results.extend(_extract_dimission_infos(data))
         return results
 
     # --- 旧版 TopAPI 兼容 --- #
@@ -408,12 +604,12 @@ class DingTalkClient:
         size = max(1, min(int(max_results), 50))
         userids: list[str] = []
         while True:
-            _respect_rate_limit("dimission-list", self.config.id)
             payload = self._request(
                 "POST",
                 "/topapi/smartwork/hrm/employee/querydimission",
                 data={"offset": offset, "size": size},
                 access_token=token,
+                bucket="dimission-list",
             )
             result = payload.get("result") or {}
             userid_list = result.get("userid_list") or result.get("useridList") or []
@@ -428,12 +624,12 @@ class DingTalkClient:
         token = self.get_access_token()
         results: list[Dict[str, Any]] = []
         for batch in _chunk_iterable([u for u in userids if u], 50):
-            _respect_rate_limit("dimission-info", self.config.id)
             payload = self._request(
                 "POST",
                 "/topapi/smartwork/hrm/employee/listdimission",
                 data={"userid_list": ",".join(batch)},
                 access_token=token,
+                bucket="dimission-info",
             )
             result = payload.get("result") or {}
             data_list = result.get("data_list") or result.get("dataList") or []
@@ -447,7 +643,6 @@ class DingTalkClient:
         for batch in _chunk_iterable(userids, 50):
             if not batch:
                 continue
-            _respect_rate_limit("roster-info", self.config.id, limit=10)
             payload: dict[str, Any] = {
                 "userIdList": batch,
                 "fieldFilterList": field_codes,
@@ -455,15 +650,8 @@ class DingTalkClient:
             }
             if self.config.agent_id:
                 payload["appAgentId"] = self.config.agent_id
-            data = self._request_open_api("POST", "/v1.0/hrm/rosters/lists/query", data=payload)
-            records = data.get("result") or data.get("data") or data.get("records") or data.get("body")
-            if isinstance(records, dict):
-                records = records.get("data") or records.get("records")
-            if not isinstance(records, list):
-                continue
-            for item in records:
-                if isinstance(item, dict):
-                    results.append(item)
+            data = self._request_open_api("POST", "/v1.0/hrm/rosters/lists/query", data=payload, bucket="roster-info", limit=10)
+            results.extend(_extract_roster_records(data))
         return results
 
     def _list_roster_infos_legacy(self, userids: Sequence[str], field_codes: Sequence[str]) -> list[dict[str, Any]]:
@@ -472,7 +660,6 @@ class DingTalkClient:
         for batch in _chunk_iterable(userids, 50):
             if not batch:
                 continue
-            _respect_rate_limit("roster-info", self.config.id, limit=10)
             payload: dict[str, Any] = {
                 "userid_list": ",".join(batch),
                 "field_filter_list": list(field_codes),
@@ -485,6 +672,8 @@ class DingTalkClient:
                 "/topapi/smartwork/hrm/employee/v2/list",
                 data=payload,
                 access_token=token,
+                bucket="roster-info",
+                limit=10,
             )
             body = data.get("result") or {}
             records = body.get("data_list") or body.get("dataList") or []
@@ -561,9 +750,8 @@ class DingTalkClient:
                 query = params.copy()
                 if next_token:
                     query["nextToken"] = next_token
-                _respect_rate_limit("dimission-records", self.config.id, limit=10, interval=1.0)
                 try:
-                    payload = self._request_open_api("GET", "/v1.0/contact/empLeaveRecords", params=query)
+                    payload = self._request_open_api("GET", "/v1.0/contact/empLeaveRecords", params=query, bucket="dimission-records", limit=10)
                 except DingTalkAPIError as exc:
                     payload = getattr(exc, "payload", None)
                     if _is_no_permission_error(exc):
@@ -604,19 +792,20 @@ class DingTalkClient:
             raise
 
     # --------------------------- 考勤接口 --------------------------- #
-    def list_attendance_records(
+    def iter_attendance_records(
         self,
         userids: Iterable[str],
         *,
         start_time: timezone.datetime,
         end_time: timezone.datetime,
-    ) -> list[Dict[str, Any]]:
-        token = self.get_access_token()
+    ) -> Iterator[list[Dict[str, Any]]]:
+        """逐页产出考勤记录，调用方无需在内存中保留整个时间窗口的数据."""
+
         user_list = list(userids)
         if not user_list:
-            return []
-        batch_size = 50
-        results: list[Dict[str, Any]] = []
+            return
+        token = self.get_access_token()
+        batch_size = ATTENDANCE_USERS_PER_REQUEST
         start_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
         end_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
         for index in range(0, len(user_list), batch_size):
@@ -624,58 +813,32 @@ class DingTalkClient:
             offset = 0
             limit = batch_size
             while True:
-                retries = 0
-                while True:
-                    try:
-                        _respect_rate_limit("attendance", self.config.id)
-                        payload = self._request(
-                            "POST",
-                            "/attendance/listRecord",
-                            data={
-                                "userIdList": batch,
-                                "userIds": batch,
-                                "checkDateFrom": start_str,
-                                "checkDateTo": end_str,
-                                "isI18n": False,
-                                "offset": offset,
-                                "limit": limit,
-                            },
-                            access_token=token,
-                        )
-                        break
-                    except DingTalkAPIError as exc:
-                        errcode = exc.payload.get("errcode") if isinstance(exc.payload, dict) else None
-                        if errcode == 90018 and retries < 3:
-                            backoff = 0.8 + 0.4 * retries
-                            logger.warning(
-                                "钉钉考勤接口触发限流，准备重试 config=%s offset=%s retries=%s backoff=%.1fs",
-                                self.config.id,
-                                offset,
-                                retries,
-                                backoff,
-                            )
-                            sleep(backoff)
-                            retries += 1
-                            continue
-                        raise
-                result_obj = payload.get("result") or payload
-                records = []
-                has_more_flag = None
-                if isinstance(result_obj, dict):
-                    records = result_obj.get("recordresult") or []
-                    has_more_flag = result_obj.get("has_more")
-                    if has_more_flag is None:
-                        has_more_flag = result_obj.get("hasMore")
-                elif isinstance(result_obj, list):
-                    records = result_obj
-                if not isinstance(records, list):
-                    records = []
-                results.extend(records)
-                has_more = bool(has_more_flag) if has_more_flag is not None else None
+                payload = self._request(
+                    "POST",
+                    "/attendance/listRecord",
+                    data=_attendance_request_data(batch, start_str, end_str, offset, limit),
+                    access_token=token,
+                    bucket="attendance",
+                )
+                records, has_more = _parse_attendance_page(payload)
+                if records:
+                    yield records
                 if len(records) < limit or has_more is False:
                     break
                 offset += limit
-        return results
+
+    def list_attendance_records(
+        self,
+        userids: Iterable[str],
+        *,
+        start_time: timezone.datetime,
+        end_time: timezone.datetime,
+    ) -> list[Dict[str, Any]]:
+        return [
+            record
+            for page in self.iter_attendance_records(userids, start_time=start_time, end_time=end_time)
+            for record in page
+        ]
 
     # --------------------------- 回调订阅 --------------------------- #
     def register_event_subscribe(self, events: list[str]) -> Dict[str, Any]:
@@ -693,4 +856,4 @@ class DingTalkClient:
         return self._request("POST", "/call_back/delete_call_back", access_token=token)
 
 
-__all__ = ["DingTalkClient"]
+__all__ = ["DingTalkClient", "UserMerger"]
@@ -0,0 +1,116 @@
+"""精简的 cron 表达式解析
+
+支持标准 5 段格式（分 时 日 月 周）：``*``、``*/n``、``a-b``、``a-b/n``、逗号列表，
+以及 @hourly/@daily/@weekly/@monthly 别名。周字段 0 与 7 均表示周日。
+日与周字段同时受限时按 cron 惯例取“或”。时间按 Django 当前时区计算。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# 各字段取值范围：分、时、日、月、周
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# 查找下一次触发时间的最大跨度，超过视为表达式永远不会触发（如 2 月 30 日）
+MAX_LOOKAHEAD = timedelta(days=366 * 5)
+
+
+def _parse_field(text: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"cron 步长必须为正数: {text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron 字段超出范围 [{low}-{high}]: {text}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronExpression:
+    expression: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    day_restricted: bool
+    weekday_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronExpression":
+        text = ALIASES.get(expression.strip().lower(), expression.strip())
+        parts = text.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expression}")
+        try:
+            fields = [_parse_field(part, low, high) for part, (low, high) in zip(parts, FIELD_RANGES)]
+        except ValueError as exc:
+            raise ValueError(f"无法解析 cron 表达式 {expression}: {exc}") from exc
+        weekdays = frozenset(0 if day == 7 else day for day in fields[4])
+        return cls(
+            expression=expression,
+            minutes=fields[0],
+            hours=fields[1],
+            days=fields[2],
+            months=fields[3],
+            weekdays=weekdays,
+            day_restricted=parts[2] != "*",
+            weekday_restricted=parts[4] != "*",
+        )
+
+    def _day_matches(self, value: datetime) -> bool:
+        day_ok = value.day in self.days
+        # Python weekday(): 周一为 0；cron: 周日为 0
+        weekday_ok = (value.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """返回严格晚于 after 的下一次触发时间（与 after 同为 aware datetime）."""
+
+        tz = timezone.get_current_timezone()
+        local = timezone.localtime(after, tz).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        limit = local + MAX_LOOKAHEAD
+        while local <= limit:
+            if local.month not in self.months:
+                year, month = (local.year + 1, 1) if local.month == 12 else (local.year, local.month + 1)
+                local = local.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(local):
+                local = (local + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if local.hour not in self.hours:
+                local = (local + timedelta(hours=1)).replace(minute=0)
+                continue
+            if local.minute not in self.minutes:
+                local += timedelta(minutes=1)
+                continue
+            return timezone.make_aware(local, tz)
+        raise ValueError(f"cron 表达式在 {MAX_LOOKAHEAD.days} 天内不会触发: {self.expression}")
+
+
+__all__ = ["CronExpression"]
@@ -0,0 +1,229 @@
+"""钉钉回调事件队列
+
+回调接口验签解密后调用 enqueue_event 将事件写入 DingTalkEvent 表即返回；
+process_events 作为后台 worker 领取待处理事件，按事件类型对涉及的单个用户/部门/考勤窗口做定向同步，
+全量同步只作为夜间兜底。失败的事件按指数退避重新入队，超过最大次数后标记为 failed。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..constants import DEFAULT_EVENT_BATCH_SIZE, DEFAULT_EVENT_MAX_ATTEMPTS
+from ..models import DingTalkConfig, DingTalkDepartment, DingTalkEvent, DingTalkUser
+from .bulk import bulk_upsert, new_sync_run
+from .exceptions import DingTalkAPIError
+from .mappers import map_department, map_user
+from .sync import SyncService
+from .tombstone import LIVE_STAMP
+
+logger = logging.getLogger(__name__)
+
+USER_UPSERT_EVENTS = frozenset({"user_add_org", "user_modify_org", "user_active_org"})
+USER_REMOVE_EVENTS = frozenset({"user_leave_org"})
+DEPT_UPSERT_EVENTS = frozenset({"org_dept_create", "org_dept_modify"})
+DEPT_REMOVE_EVENTS = frozenset({"org_dept_remove"})
+ATTENDANCE_EVENTS = frozenset({"attendance_check_record"})
+SUPPORTED_EVENTS = USER_UPSERT_EVENTS | USER_REMOVE_EVENTS | DEPT_UPSERT_EVENTS | DEPT_REMOVE_EVENTS | ATTENDANCE_EVENTS
+
+# 钉钉返回“用户/部门不存在”的错误码，收到修改事件但实体已被删除时按删除处理
+USER_NOT_FOUND_ERRCODES = {60121}
+DEPT_NOT_FOUND_ERRCODES = {60003}
+# 处于 processing 状态超过该时长的事件视为 worker 中断，可被重新领取
+EVENT_LEASE = timedelta(minutes=10)
+# 考勤打卡事件前后各扩展的查询时间
+ATTENDANCE_EVENT_MARGIN = timedelta(minutes=1)
+
+
+def _get_option(name: str, default: int) -> int:
+    try:
+        return max(1, int(getattr(settings, "DINGTALK", {}).get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_list(value: Any) -> list:
+    if value in (None, ""):
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def enqueue_event(config: DingTalkConfig, message: dict[str, Any]) -> DingTalkEvent | None:
+    """将解密后的回调消息写入事件队列；不关心的事件类型返回 None，重复投递的消息只保留一条."""
+
+    event_type = message.get("EventType") or ""
+    if event_type not in SUPPORTED_EVENTS:
+        return None
+    canonical = json.dumps(message, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    dedupe_key = hashlib.sha256(f"{config.id}:{canonical}".encode("utf-8")).hexdigest()
+    event, _ = DingTalkEvent.objects.get_or_create(
+        dedupe_key=dedupe_key,
+        defaults={"config": config, "event_type": event_type, "payload": message},
+    )
+    return event
+
+
+# --------------------------- 事件处理 --------------------------- #
+def _tombstone(model, config: DingTalkConfig, key: str, values: Iterable[Any]) -> int:
+    return model.objects.filter(config=config, **{f"{key}__in": list(values)}).update(is_deleted=True, deleted_at=timezone.now())
+
+
+def _upsert_entities(
+    service: SyncService,
+    ids: list,
+    fetch: Callable[[Any, str], dict],
+    mapper: Callable[[str, dict], dict],
+    model,
+    key: str,
+    not_found: set[int],
+) -> dict[str, int]:
+    token = service.client.get_access_token()
+    rows, missing = [], []
+    for entity_id in ids:
+        try:
+            item = fetch(entity_id, token)
+        except DingTalkAPIError as exc:
+            if exc.payload.get("errcode") not in not_found:
+                raise
+            item = None
+        if item:
+            rows.append(mapper(service.config.id, item))
+        else:
+            missing.append(entity_id)
+    # 新批次号保证事件写入的记录不会被同时进行中的全量同步当作过期数据
+    result = bulk_upsert(model, rows, key=key, hash_field="content_hash", stamp={"sync_run": new_sync_run(), **LIVE_STAMP})
+    removed = _tombstone(model, service.config, key, missing) if missing else 0
+    return {**result.as_stats(), "removed": removed}
+
+
+def _apply_user_event(service: SyncService, event: DingTalkEvent) -> dict[str, int]:
+    userids = [str(item) for item in _as_list(event.payload.get("UserId")) if item]
+    if event.event_type in USER_REMOVE_EVENTS:
+        return {"removed": _tombstone(DingTalkUser, service.config, "userid", userids)}
+    return _upsert_entities(
+        service,
+        userids,
+        lambda userid, token: service.client.get_user(userid, access_token=token),
+        map_user,
+        DingTalkUser,
+        "userid",
+        USER_NOT_FOUND_ERRCODES,
+    )
+
+
+def _apply_dept_event(service: SyncService, event: DingTalkEvent) -> dict[str, int]:
+    dept_ids = [int(item) for item in _as_list(event.payload.get("DeptId")) if item not in (None, "")]
+    if event.event_type in DEPT_REMOVE_EVENTS:
+        return {"removed": _tombstone(DingTalkDepartment, service.config, "dept_id", dept_ids)}
+    return _upsert_entities(
+        service,
+        dept_ids,
+        lambda dept_id, token: service.client.get_department(dept_id, access_token=token),
+        map_department,
+        DingTalkDepartment,
+        "dept_id",
+        DEPT_NOT_FOUND_ERRCODES,
+    )
+
+
+def _apply_attendance_event(service: SyncService, event: DingTalkEvent) -> dict[str, int]:
+    userids: list[str] = []
+    check_times: list[datetime] = []
+    for item in _as_list(event.payload.get("DataList")):
+        userid = item.get("userId") or item.get("UserId")
+        check_time = item.get("checkTime") or item.get("CheckTime")
+        if not userid or check_time in (None, ""):
+            continue
+        userids.append(str(userid))
+        check_times.append(datetime.fromtimestamp(int(check_time) / 1000, tz=timezone.get_current_timezone()))
+    if not userids:
+        return {"attendance_count": 0}
+    pages = service.client.iter_attendance_records(
+        list(dict.fromkeys(userids)),
+        start_time=min(check_times) - ATTENDANCE_EVENT_MARGIN,
+        end_time=max(check_times) + ATTENDANCE_EVENT_MARGIN,
+    )
+    progress: dict[str, int] = {}
+    service.store_attendance_pages(pages, progress)
+    return progress
+
+
+def apply_event(service: SyncService, event: DingTalkEvent) -> dict[str, int]:
+    if event.event_type in USER_UPSERT_EVENTS | USER_REMOVE_EVENTS:
+        return _apply_user_event(service, event)
+    if event.event_type in DEPT_UPSERT_EVENTS | DEPT_REMOVE_EVENTS:
+        return _apply_dept_event(service, event)
+    if event.event_type in ATTENDANCE_EVENTS:
+        return _apply_attendance_event(service, event)
+    return {}
+
+
+def _claimable(config: DingTalkConfig | None):
+    now = timezone.now()
+    queryset = DingTalkEvent.objects.filter(
+        Q(status="pending", available_at__lte=now) | Q(status="processing", update_time__lt=now - EVENT_LEASE)
+    )
+    return queryset.filter(config=config) if config is not None else queryset
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def process_events(config: DingTalkConfig | None = None, *, limit: int | None = None) -> dict[str, int]:
+    """领取并处理一批待处理事件，返回处理统计；多个 worker 并发执行时通过条件更新保证同一事件只被领取一次."""
+
+    limit = limit or _get_option("EVENT_BATCH_SIZE", DEFAULT_EVENT_BATCH_SIZE)
+    max_attempts = _get_option("EVENT_MAX_ATTEMPTS", DEFAULT_EVENT_MAX_ATTEMPTS)
+    summary = {"processed": 0, "retried": 0, "failed": 0, "skipped": 0}
+    services: dict[str, SyncService] = {}
+    event_ids = list(_claimable(config).order_by("available_at", "id").values_list("id", flat=True)[:limit])
+    for event_id in event_ids:
+        claimed = _claimable(config).filter(pk=event_id).update(
+            status="processing", attempts=F("attempts") + 1, update_time=timezone.now()
+        )
+        if not claimed:
+            summary["skipped"] += 1
+            continue
+        event = DingTalkEvent.objects.select_related("config").get(pk=event_id)
+        if event.config_id not in services:
+            services[event.config_id] = SyncService(event.config)
+        service = services[event.config_id]
+        try:
+            service.ensure_enabled()
+            result = apply_event(service, event)
+        except Exception as exc:  # noqa: BLE001 - 单个事件失败不影响队列中的其他事件
+            exhausted = event.attempts >= max_attempts
+            logger.warning(
+                "钉钉回调事件处理失败 config=%s event=%s type=%s attempts=%s error=%s",
+                event.config_id,
+                event.pk,
+                event.event_type,
+                event.attempts,
+                exc,
+            )
+            DingTalkEvent.objects.filter(pk=event_id).update(
+                status="failed" if exhausted else "pending",
+                available_at=timezone.now() + _retry_delay(event.attempts),
+                error=str(exc)[:2000],
+                update_time=timezone.now(),
+            )
+            summary["failed" if exhausted else "retried"] += 1
+            continue
+        DingTalkEvent.objects.filter(pk=event_id).update(
+            status="done", processed_at=timezone.now(), error="", update_time=timezone.now()
+        )
+        summary["processed"] += 1
+        logger.info("钉钉回调事件已处理 config=%s type=%s result=%s", event.config_id, event.event_type, result)
+    return summary
+
+
+__all__ = ["SUPPORTED_EVENTS", "apply_event", "enqueue_event", "process_events"]
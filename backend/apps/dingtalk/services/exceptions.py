@@ -6,6 +6,22 @@ class DingTalkAPIError(Exception):
         self.payload = payload or {}
 
 
+class DingTalkTransientError(DingTalkAPIError):
+    """可重试的钉钉接口异常（限流、5xx、网络中断）"""
+
+    def __init__(self, message: str, payload: dict | None = None, *, retry_after: float | None = None):
+        super().__init__(message, payload)
+        self.retry_after = retry_after
+
+
+class DingTalkCircuitOpenError(DingTalkAPIError):
+    """接口连续失败触发熔断，暂停调用"""
+
+
+class DingTalkCallbackError(Exception):
+    """回调验签或解密失败"""
+
+
 class DingTalkConfigurationError(Exception):
     """钉钉配置缺失或不合法"""
 
@@ -0,0 +1,277 @@
+"""后台同步任务队列
+
+SyncCommandView 只负责把同步请求写入 SyncJob 表并立即返回任务 ID；
+run_dingtalk_jobs worker 领取排队中的任务执行，执行过程中通过 SyncService 的进度回调回写进度，
+Web 请求耗时与同步规模无关，也不会因 gunicorn 超时在事务中途被杀掉。
+
+- 去重：相同配置、操作与参数的任务在排队期间只保留一条；
+- 并发：同一配置同时执行的任务数不超过 ``JOB_CONCURRENCY_PER_CONFIG``，领取时锁定配置行保证多 worker 下计数准确；
+- 容错：执行期间由独立的续约线程每 JOB_HEARTBEAT_INTERVAL 刷新一次 update_time（与进度回调无关），
+  超过 JOB_LEASE 未续约视为 worker 中断，未达到最大次数时重新排队；续约与结果写回都以执行次数作为租约标识，
+  任务被重新领取后旧 worker 的写入不再生效。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..constants import DEFAULT_JOB_CONCURRENCY_PER_CONFIG, DEFAULT_JOB_MAX_ATTEMPTS, SyncOperation
+from ..models import DingTalkConfig, SyncJob
+from .sync import SyncService
+
+logger = logging.getLogger(__name__)
+
+# 可以放入队列的操作；连接测试需要即时反馈，仍在请求内执行
+QUEUEABLE_OPERATIONS = frozenset(
+    {
+        SyncOperation.SYNC_DEPARTMENTS,
+        SyncOperation.SYNC_USERS,
+        SyncOperation.SYNC_DIMISSION_USERS,
+        SyncOperation.SYNC_ATTENDANCE,
+        SyncOperation.FULL_SYNC,
+    }
+)
+JOB_LEASE = timedelta(minutes=30)
+# 续约线程刷新任务 update_time 的间隔，需明显小于 JOB_LEASE
+JOB_HEARTBEAT_INTERVAL = timedelta(seconds=60)
+# 进度写库的最小间隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+
+def _get_option(name: str, default: int) -> int:
+    try:
+        return max(1, int(getattr(settings, "DINGTALK", {}).get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _serialize_params(params: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in sorted(params.items())
+        if value not in (None, "", [])
+    }
+
+
+def enqueue_job(
+    config: DingTalkConfig,
+    operation: SyncOperation | str,
+    params: dict[str, Any] | None = None,
+    *,
+    created_by: str = "",
+) -> tuple[SyncJob, bool]:
+    """提交同步任务，返回 (任务, 是否新建)；已有相同的排队任务时直接返回该任务."""
+
+    operation = SyncOperation(operation)
+    if operation not in QUEUEABLE_OPERATIONS:
+        raise ValueError(f"操作 {operation.value} 不支持后台执行")
+    params = _serialize_params(params or {})
+    canonical = json.dumps({"operation": operation.value, "params": params}, sort_keys=True, ensure_ascii=False)
+    dedupe_key = hashlib.sha256(f"{config.id}:{canonical}".encode("utf-8")).hexdigest()
+    with transaction.atomic():
+        # 锁定配置行，串行化同一配置的入队与领取
+        DingTalkConfig.objects.select_for_update().filter(pk=config.pk).first()
+        existing = SyncJob.objects.filter(dedupe_key=dedupe_key, status="pending").order_by("create_time").first()
+        if existing is not None:
+            return existing, False
+        job = SyncJob.objects.create(
+            config=config,
+            operation=operation.value,
+            params=params,
+            dedupe_key=dedupe_key,
+            created_by=created_by,
+        )
+    logger.info("钉钉同步任务已入队 config=%s job=%s operation=%s", config.id, job.pk, operation.value)
+    return job, True
+
+
+def _owned_job(job_id: Any, attempts: int):
+    """仍由本次执行持有租约的任务：重新排队并被再次领取后执行次数会变化"""
+
+    return SyncJob.objects.filter(pk=job_id, status="running", attempts=attempts)
+
+
+def _recover_stale_jobs() -> None:
+    max_attempts = _get_option("JOB_MAX_ATTEMPTS", DEFAULT_JOB_MAX_ATTEMPTS)
+    stale = SyncJob.objects.filter(status="running", update_time__lt=timezone.now() - JOB_LEASE)
+    for job_id, config_id, attempts in stale.values_list("id", "config_id", "attempts")[:100]:
+        with transaction.atomic():
+            DingTalkConfig.objects.select_for_update().filter(pk=config_id).first()
+            now = timezone.now()
+            # 加锁后按当前时间重新判断租约，期间续约过的任务仍属于原 worker
+            expired = _owned_job(job_id, attempts).filter(update_time__lt=now - JOB_LEASE)
+            if attempts >= max_attempts:
+                recovered = expired.update(
+                    status="failed", error="任务执行超时（worker 中断）", finished_at=now, update_time=now
+                )
+            else:
+                recovered = expired.update(status="pending", update_time=now)
+        if recovered:
+            logger.warning("钉钉同步任务租约过期 config=%s job=%s attempts=%s", config_id, job_id, attempts)
+
+
+def claim_next_job() -> SyncJob | None:
+    """领取下一个可执行的任务；所属配置的执行中任务数已达上限时跳过该配置."""
+
+    _recover_stale_jobs()
+    limit = _get_option("JOB_CONCURRENCY_PER_CONFIG", DEFAULT_JOB_CONCURRENCY_PER_CONFIG)
+    blocked: set[str] = set()
+    candidates = SyncJob.objects.filter(status="pending").order_by("create_time").values_list("id", "config_id")
+    for job_id, config_id in candidates[:100]:
+        if config_id in blocked:
+            continue
+        with transaction.atomic():
+            DingTalkConfig.objects.select_for_update().filter(pk=config_id).first()
+            if SyncJob.objects.filter(config_id=config_id, status="running").count() >= limit:
+                blocked.add(config_id)
+                continue
+            claimed = SyncJob.objects.filter(pk=job_id, status="pending").update(
+                status="running",
+                attempts=F("attempts") + 1,
+                started_at=timezone.now(),
+                update_time=timezone.now(),
+            )
+        if claimed:
+            return SyncJob.objects.select_related("config").get(pk=job_id)
+    return None
+
+
+class _LeaseKeeper:
+    """任务执行期间在后台线程中定期续约，长时间没有进度回调的拉取阶段也不会被判定为 worker 中断"""
+
+    def __init__(self, job: SyncJob) -> None:
+        self.job_id = job.pk
+        self.attempts = job.attempts
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"dingtalk-job-lease-{job.pk}", daemon=True)
+
+    def __enter__(self) -> "_LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def renew(self) -> bool:
+        renewed = _owned_job(self.job_id, self.attempts).update(update_time=timezone.now())
+        if not renewed and not self.lost:
+            self.lost = True
+            logger.warning("钉钉同步任务租约已失效 job=%s attempts=%s", self.job_id, self.attempts)
+        return bool(renewed)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(JOB_HEARTBEAT_INTERVAL.total_seconds()):
+                try:
+                    self.renew()
+                except Exception as exc:  # noqa: BLE001 - 续约失败在下一个间隔重试
+                    logger.warning("钉钉同步任务续约失败 job=%s error=%s", self.job_id, exc)
+        finally:
+            connection.close()
+
+
+class _ProgressReporter:
+    """SyncService 进度回调：合并各阶段进度并按间隔写回任务记录"""
+
+    def __init__(self, job_id: Any, attempts: int) -> None:
+        self.job_id = job_id
+        self.attempts = attempts
+        self.progress: dict[str, Any] = {}
+        self._last_flush = 0.0
+
+    def __call__(self, stage: str, values: dict[str, Any]) -> None:
+        self.progress["stage"] = stage
+        self.progress[stage] = values
+        now = time.monotonic()
+        if now - self._last_flush >= PROGRESS_INTERVAL:
+            self._last_flush = now
+            _owned_job(self.job_id, self.attempts).update(progress=self.progress, update_time=timezone.now())
+
+
+def _parse_param_datetime(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def _dispatch(service: SyncService, job: SyncJob) -> dict:
+    params = job.params or {}
+    mode = params.get("mode", "full")
+    operation = SyncOperation(job.operation)
+    if operation == SyncOperation.SYNC_DEPARTMENTS:
+        return service.sync_departments(mode=mode)
+    if operation == SyncOperation.SYNC_USERS:
+        return service.sync_users(mode=mode)
+    if operation == SyncOperation.SYNC_DIMISSION_USERS:
+        return service.sync_dimission_users(mode=mode)
+    if operation == SyncOperation.SYNC_ATTENDANCE:
+        return service.sync_attendance(
+            _parse_param_datetime(params.get("start")),
+            _parse_param_datetime(params.get("end")),
+            mode=mode,
+            user_ids=params.get("userIds"),
+        )
+    if operation == SyncOperation.FULL_SYNC:
+        return service.full_sync()
+    raise ValueError(f"操作 {operation.value} 不支持后台执行")
+
+
+def run_job(job: SyncJob) -> SyncJob:
+    """执行已领取的任务并写回结果；同步本身的日志与失败记录仍由 SyncService 负责."""
+
+    reporter = _ProgressReporter(job.pk, job.attempts)
+    service = SyncService(job.config, progress_callback=reporter)
+    with _LeaseKeeper(job):
+        try:
+            result = _dispatch(service, job)
+        except Exception as exc:  # noqa: BLE001 - 任务失败只记录到任务表，不影响 worker
+            logger.warning(
+                "钉钉同步任务失败 config=%s job=%s operation=%s error=%s", job.config_id, job.pk, job.operation, exc
+            )
+            outcome = {"status": "failed", "error": str(exc)[:2000]}
+        else:
+            outcome = {"status": "success", "result": result or {}, "error": ""}
+    written = _owned_job(job.pk, job.attempts).update(
+        **outcome,
+        progress=reporter.progress,
+        finished_at=timezone.now(),
+        update_time=timezone.now(),
+    )
+    if not written:
+        # 租约过期后任务已被重新排队或领取，结果以新的执行为准
+        logger.warning("钉钉同步任务租约已失效，结果未写回 config=%s job=%s", job.config_id, job.pk)
+    job.refresh_from_db()
+    return job
+
+
+def run_pending_jobs(*, limit: int | None = None) -> dict[str, int]:
+    """依次领取并执行排队中的任务，直到队列为空或达到 limit，返回执行统计."""
+
+    summary = {"success": 0, "failed": 0}
+    while limit is None or summary["success"] + summary["failed"] < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        job = run_job(job)
+        summary["success" if job.status == "success" else "failed"] += 1
+    return summary
+
+
+__all__ = ["QUEUEABLE_OPERATIONS", "claim_next_job", "enqueue_job", "run_job", "run_pending_jobs"]
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-from datetime import date, datetime, timezone as dt_timezone
-from typing import Any, Dict
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from functools import partial
+from itertools import chain
+from typing import Any, Callable, Dict, Sequence
 
 from django.utils import timezone
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 取决于部署环境，未安装时使用纯 Python 换算
+    np = None
+
 from ..models import DingTalkAttendanceRecord, DingTalkDepartment, DingTalkUser
 
 
@@ -63,6 +72,13 @@ def _parse_date(value: Any) -> datetime.date | None:
     return None
 
 
+def compute_content_hash(row: Dict[str, Any]) -> str:
+    """对 map_* 的输出计算稳定摘要，用于判断快照内容是否变化."""
+
+    serialized = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
 def map_department(config_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "dept_id": payload.get("dept_id"),
@@ -94,21 +110,21 @@ def map_user(config_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def map_attendance(config_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    check_dt = _parse_datetime(payload.get("user_check_time") or payload.get("userCheckTime"))
-    work_date_raw = payload.get("work_date") or payload.get("workDate")
-    work_date = None
-    if isinstance(work_date_raw, str):
+def _parse_work_date(value: Any) -> date | None:
+    if isinstance(value, str):
         try:
-            work_date = datetime.fromisoformat(work_date_raw).date()
+            return datetime.fromisoformat(value).date()
         except ValueError:
             try:
-                work_date = datetime.strptime(work_date_raw, "%Y-%m-%d").date()
+                return datetime.strptime(value, "%Y-%m-%d").date()
             except ValueError:
-                work_date = None
-    elif isinstance(work_date_raw, datetime):
-        work_date = work_date_raw.date()
+                return None
+    if isinstance(value, datetime):
+        return value.date()
+    return None
 
+
+def _attendance_row(config_id: str, payload: Dict[str, Any], check_dt: datetime | None, work_date: date | None) -> Dict[str, Any]:
     record_id = payload.get("record_id") or payload.get("recordId")
     if not record_id and check_dt:
         record_id = f"{payload.get('userid') or payload.get('userId')}_{int(check_dt.timestamp())}"
@@ -126,19 +142,324 @@ def map_attendance(config_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def map_attendance(config_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    check_dt = _parse_datetime(payload.get("user_check_time") or payload.get("userCheckTime"))
+    work_date = _parse_work_date(payload.get("work_date") or payload.get("workDate"))
+    return _attendance_row(config_id, payload, check_dt, work_date)
+
+
+# 整列换算只处理结果与 _parse_datetime 逐位一致的整数时间戳：秒级或毫秒级且不超过 2**33 秒（约 2242 年），
+# 此范围内浮点除法的误差小于 1 微秒，其余取值（含 bool、浮点数）逐条交给 _parse_datetime
+_EPOCH_SECONDS_LIMIT = 2**33
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _epoch_milliseconds(value: Any) -> int | None:
+    if type(value) is not int or value <= 0:
+        return None
+    if value < _EPOCH_SECONDS_LIMIT:
+        return value * 1000
+    if 10**12 < value < _EPOCH_SECONDS_LIMIT * 1000:
+        return value
+    return None
+
+
+def _epoch_column_to_datetimes(milliseconds: list[int]) -> list[datetime]:
+    current_tz = timezone.get_current_timezone()
+    if np is not None:
+        # datetime64[ms] -> object 在 C 层批量生成 naive UTC 时间
+        naive_values = np.asarray(milliseconds, dtype=np.int64).astype("datetime64[ms]").astype(object)
+        return [value.replace(tzinfo=dt_timezone.utc).astimezone(current_tz) for value in naive_values]
+    return [(_UTC_EPOCH + timedelta(milliseconds=value)).astimezone(current_tz) for value in milliseconds]
+
+
+def map_attendance_batch(config_id: str, payloads: Sequence[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """批量映射考勤记录，输出与逐条调用 map_attendance 完全一致.
+
+    每批只判断一次打卡时间列的类型：全部为整数时间戳时整列换算（安装了 NumPy 时使用向量化转换），
+    否则逐条解析但对重复的字符串只解析一次；工作日期同样按字符串缓存。
+    """
+
+    check_values = [payload.get("user_check_time") or payload.get("userCheckTime") for payload in payloads]
+    milliseconds = [_epoch_milliseconds(value) for value in check_values]
+    if milliseconds and all(value is not None for value in milliseconds):
+        check_times: list[datetime | None] = list(_epoch_column_to_datetimes(milliseconds))
+    else:
+        parsed: dict[str, datetime | None] = {}
+        check_times = []
+        for value in check_values:
+            if isinstance(value, str):
+                if value not in parsed:
+                    parsed[value] = _parse_datetime(value)
+                check_times.append(parsed[value])
+            else:
+                check_times.append(_parse_datetime(value))
+
+    work_dates: dict[Any, date | None] = {}
+    rows: list[Dict[str, Any]] = []
+    for payload, check_dt in zip(payloads, check_times):
+        work_date_raw = payload.get("work_date") or payload.get("workDate")
+        if isinstance(work_date_raw, str):
+            if work_date_raw not in work_dates:
+                work_dates[work_date_raw] = _parse_work_date(work_date_raw)
+            work_date = work_dates[work_date_raw]
+        else:
+            work_date = _parse_work_date(work_date_raw)
+        rows.append(_attendance_row(config_id, payload, check_dt, work_date))
+    return rows
+
+
+# ----------------- 花名册字段合并 ----------------- #
+_EMPTY_VALUES = (None, "", [], {})
+
+
+def _roster_value(roster: Dict[str, Any], codes: tuple[str, ...], prefer_label: bool = False) -> Any:
+    """依次读取花名册字段，返回首个非空值；字段为 {value, label} 时 value 优先（prefer_label 时 label 优先）."""
+
+    value: Any = None
+    for code in codes:
+        entry = roster.get(code)
+        if isinstance(entry, dict):
+            label = entry.get("label")
+            if prefer_label and label not in (None, ""):
+                value = label
+            else:
+                value = entry.get("value")
+                if value in (None, ""):
+                    value = label
+        else:
+            value = entry
+        if value:
+            return value
+    return value
+
+
+def _roster_main_dept_id(roster: Dict[str, Any]) -> Any:
+    entry = roster.get("sys00-mainDept")
+    value = entry.get("value") if isinstance(entry, dict) else None
+    if value in (None, ""):
+        value = _roster_value(roster, ("sys00-mainDeptId",))
+    return value
+
+
+def _roster_main_dept_name(roster: Dict[str, Any]) -> Any:
+    entry = roster.get("sys00-mainDept")
+    if not isinstance(entry, dict):
+        return None
+    return entry.get("label") or entry.get("value")
+
+
+# 预编译的提取表：(写入的键, 取值函数)，按顺序写入 employeeInfo 与离职信息本身，已有值不覆盖
+_ROSTER_FIELD_PLAN: tuple[tuple[tuple[str, ...], Callable[[Dict[str, Any]], Any]], ...] = (
+    (("name",), partial(_roster_value, codes=("sys00-name",), prefer_label=True)),
+    (("mobile",), partial(_roster_value, codes=("sys00-mobile",))),
+    (("jobNumber", "job_number"), partial(_roster_value, codes=("sys00-jobNumber", "sys00-employeeId"))),
+    (("email",), partial(_roster_value, codes=("sys00-email", "sys00-orgEmail"))),
+    (("title",), partial(_roster_value, codes=("sys00-position",))),
+    (("mainDeptId", "main_dept_id"), _roster_main_dept_id),
+    (("mainDeptName", "main_dept_name"), _roster_main_dept_name),
+)
+
+
+def merge_roster_info(info: Dict[str, Any], roster: Dict[str, Any]) -> Dict[str, Any]:
+    """将花名册字段合并进离职信息（原地修改并返回），离职接口已有的值优先."""
+
+    employee_info: Dict[str, Any] = {}
+    base_employee_info = info.get("employeeInfo") or info.get("employee_info")
+    if isinstance(base_employee_info, dict):
+        employee_info.update(base_employee_info)
+
+    for keys, extractor in _ROSTER_FIELD_PLAN:
+        value = extractor(roster)
+        if value in _EMPTY_VALUES:
+            continue
+        for key in keys:
+            for target in (employee_info, info):
+                if target.get(key) in _EMPTY_VALUES:
+                    target[key] = value
+
+    dept_entry = roster.get("sys00-dept")
+    dept_values = dept_entry.get("values") if isinstance(dept_entry, dict) else None
+    dept_values = [item for item in dept_values if item not in (None, "")] if isinstance(dept_values, list) else []
+    if dept_values:
+        existing_dept_ids = info.get("dept_ids") or info.get("deptIdList") or []
+        if not isinstance(existing_dept_ids, list):
+            existing_dept_ids = [existing_dept_ids]
+        combined = {str(item) for item in chain(existing_dept_ids, dept_values) if item not in (None, "")}
+        if combined:
+            info["dept_ids"] = sorted(combined)
+    if employee_info:
+        info["employeeInfo"] = employee_info
+    return info
+
+
+class _ExtractionPlan:
+    """预编译的字段提取计划：候选键预先按 "." 拆分，并按数据源的键集合缓存可能命中的候选路径.
+
+    同一批数据的结构通常一致，首次遇到某种键集合时筛掉首段键不存在的候选路径，
+    之后同结构的数据源直接按筛选后的路径读取；取值顺序与逐个尝试全部候选键完全一致。
+    """
+
+    max_schemas = 256
+
+    def __init__(self, fields: Dict[str, tuple[str, ...]]) -> None:
+        self.paths = {name: tuple(tuple(key.split(".")) for key in keys) for name, keys in fields.items()}
+        self._resolved: dict[frozenset, Dict[str, tuple[tuple[str, ...], ...]]] = {}
+
+    def resolve(self, source: Dict[str, Any]) -> Dict[str, tuple[tuple[str, ...], ...]]:
+        schema = frozenset(source)
+        resolved = self._resolved.get(schema)
+        if resolved is None:
+            resolved = {name: tuple(path for path in paths if path[0] in schema) for name, paths in self.paths.items()}
+            if len(self._resolved) >= self.max_schemas:
+                # 结构异常分散时整体清空重建，避免缓存无限增长
+                self._resolved.clear()
+            self._resolved[schema] = resolved
+        return resolved
+
+
+_DIMISSION_PLAN = _ExtractionPlan(
+    {
+        "userid": ("userid", "userId"),
+        "name": (
+            "name",
+            "userName",
+            "employee_name",
+            "employeeName",
+            "staff_name",
+            "staffName",
+            "user_name",
+            "realName",
+            "employeeInfo.name",
+            "employee_info.name",
+            "leaveRecord.userName",
+        ),
+        "mobile": (
+            "mobile",
+            "mobilePhone",
+            "mobile_phone",
+            "phone",
+            "phoneNumber",
+            "phone_number",
+            "employeeInfo.mobile",
+            "employee_info.mobile",
+            "leaveRecord.mobile",
+        ),
+        "job_number": (
+            "job_number",
+            "jobNumber",
+            "job_no",
+            "jobNo",
+            "employeeCode",
+            "employeeId",
+            "leaveRecord.jobNumber",
+        ),
+        "main_dept_id": (
+            "main_dept_id",
+            "mainDeptId",
+            "main_department_id",
+            "dept_id",
+            "deptId",
+            "employeeInfo.mainDeptId",
+            "employee_info.mainDeptId",
+            "leaveRecord.deptId",
+        ),
+        "main_dept_name": (
+            "main_dept_name",
+            "mainDeptName",
+            "main_department_name",
+            "dept_name",
+            "deptName",
+            "employeeInfo.mainDeptName",
+            "employee_info.mainDeptName",
+            "leaveRecord.deptName",
+        ),
+        "handover_userid": (
+            "handover_userid",
+            "handoverUserId",
+            "handover_user_id",
+            "handoverUserID",
+            "leaveRecord.handoverUserId",
+        ),
+        "last_work_day": (
+            "last_work_day",
+            "lastWorkDay",
+            "last_workday",
+            "lastWorkday",
+            "lastWorkDate",
+            "employeeInfo.lastWorkDay",
+            "employee_info.lastWorkDay",
+            "leaveRecord.lastWorkDay",
+        ),
+        "leave_time": (
+            "leave_time",
+            "leaveTime",
+            "leaveRecord.leaveTime",
+            "leave_record.leaveTime",
+            "leaveRecord.leave_time",
+            "employeeInfo.leaveTime",
+            "employee_info.leaveTime",
+        ),
+        "leave_reason": (
+            "leave_reason",
+            "leaveReason",
+            "leave_record.leaveReason",
+            "leaveRecord.leaveReason",
+            "leaveRecord.reason",
+            "reason",
+            "reasonMemo",
+            "leaveRecord.reasonMemo",
+        ),
+        "voluntary_reasons": (
+            "voluntary_reason_set",
+            "voluntaryReasons",
+            "voluntary_reason_list",
+            "voluntaryReasonList",
+            "voluntaryReason",
+            "leaveRecord.voluntaryReasons",
+            "leaveRecord.voluntaryReason",
+        ),
+        "passive_reasons": (
+            "passive_reason_set",
+            "passiveReasons",
+            "passive_reason_list",
+            "passiveReasonList",
+            "passiveReason",
+            "leaveRecord.passiveReasons",
+            "leaveRecord.passiveReason",
+        ),
+        "reason_type": ("reason_type", "reasonType", "leaveRecord.reasonType"),
+        "reason_memo": ("reason_memo", "reasonMemo", "leaveRecord.reasonMemo"),
+        "pre_status": ("pre_status", "preStatus", "leaveRecord.preStatus"),
+        "status": ("status", "statusCode", "leaveRecord.status"),
+    }
+)
+
+
+def _ensure_list(value: Any) -> list[Any]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, tuple):
+        return list(value)
+    return [value]
+
+
 def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str, Any] | None = None) -> Dict[str, Any]:
     leave_record = leave_record or {}
     sources: tuple[Dict[str, Any], ...] = tuple(
         item for item in (info, leave_record, info.get("employeeInfo"), info.get("employee_info")) if isinstance(item, dict)
     ) or ({},)
+    plans = [(source, _DIMISSION_PLAN.resolve(source)) for source in sources]
 
-    def _extract(keys: tuple[str, ...], default: Any = "") -> Any:
+    def _extract(field: str, default: Any = "") -> Any:
         """从多个数据源中提取首个有效值，兼容大小写/下划线差异."""
 
-        for source in sources:
-            for key in keys:
+        for source, resolved in plans:
+            for path in resolved[field]:
                 current: Any = source
-                for part in key.split("."):
+                for part in path:
                     if not isinstance(current, dict):
                         current = None
                         break
@@ -153,8 +474,8 @@ def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str,
                 return current
         return default
 
-    def _extract_int(keys: tuple[str, ...]) -> int | None:
-        value = _extract(keys, default=None)
+    def _extract_int(field: str) -> int | None:
+        value = _extract(field, default=None)
         if value in (None, ""):
             return None
         try:
@@ -162,35 +483,8 @@ def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str,
         except (TypeError, ValueError):
             return None
 
-    last_work_day = _parse_date(
-        _extract(
-            (
-                "last_work_day",
-                "lastWorkDay",
-                "last_workday",
-                "lastWorkday",
-                "lastWorkDate",
-                "employeeInfo.lastWorkDay",
-                "employee_info.lastWorkDay",
-                "leaveRecord.lastWorkDay",
-            ),
-            default=None,
-        )
-    )
-    leave_time = _parse_datetime(
-        _extract(
-            (
-                "leave_time",
-                "leaveTime",
-                "leaveRecord.leaveTime",
-                "leave_record.leaveTime",
-                "leaveRecord.leave_time",
-                "employeeInfo.leaveTime",
-                "employee_info.leaveTime",
-            ),
-            default=None,
-        )
-    )
+    last_work_day = _parse_date(_extract("last_work_day", default=None))
+    leave_time = _parse_datetime(_extract("leave_time", default=None))
     dept_values_raw: list[Any] = []
     base_depts = info.get("dept_ids") or info.get("dept_ids_list") or info.get("deptIdList")
     if base_depts:
@@ -216,56 +510,9 @@ def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str,
             continue
     dept_ids = sorted(set(dept_ids))
 
-    def _ensure_list(value: Any) -> list[Any]:
-        if value in (None, ""):
-            return []
-        if isinstance(value, list):
-            return value
-        if isinstance(value, tuple):
-            return list(value)
-        return [value]
-
-    voluntary_list = _ensure_list(
-        _extract(
-            (
-                "voluntary_reason_set",
-                "voluntaryReasons",
-                "voluntary_reason_list",
-                "voluntaryReasonList",
-                "voluntaryReason",
-                "leaveRecord.voluntaryReasons",
-                "leaveRecord.voluntaryReason",
-            ),
-            default=[],
-        )
-    )
-    passive_list = _ensure_list(
-        _extract(
-            (
-                "passive_reason_set",
-                "passiveReasons",
-                "passive_reason_list",
-                "passiveReasonList",
-                "passiveReason",
-                "leaveRecord.passiveReasons",
-                "leaveRecord.passiveReason",
-            ),
-            default=[],
-        )
-    )
-    leave_reason = _extract(
-        (
-            "leave_reason",
-            "leaveReason",
-            "leave_record.leaveReason",
-            "leaveRecord.leaveReason",
-            "leaveRecord.reason",
-            "reason",
-            "reasonMemo",
-            "leaveRecord.reasonMemo",
-        ),
-        default="",
-    )
+    voluntary_list = _ensure_list(_extract("voluntary_reasons", default=[]))
+    passive_list = _ensure_list(_extract("passive_reasons", default=[]))
+    leave_reason = _extract("leave_reason", default="")
     if not leave_reason:
         if voluntary_list:
             leave_reason = "、".join(str(item) for item in voluntary_list if item)
@@ -274,91 +521,20 @@ def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str,
 
     return {
         "config_id": config_id,
-        "userid": _extract(("userid", "userId"), default=""),
-        "name": _extract(
-            (
-                "name",
-                "userName",
-                "employee_name",
-                "employeeName",
-                "staff_name",
-                "staffName",
-                "user_name",
-                "realName",
-                "employeeInfo.name",
-                "employee_info.name",
-                "leaveRecord.userName",
-            ),
-            default="",
-        ),
-        "mobile": _extract(
-            (
-                "mobile",
-                "mobilePhone",
-                "mobile_phone",
-                "phone",
-                "phoneNumber",
-                "phone_number",
-                "employeeInfo.mobile",
-                "employee_info.mobile",
-                "leaveRecord.mobile",
-            ),
-            default="",
-        ),
-        "job_number": _extract(
-            (
-                "job_number",
-                "jobNumber",
-                "job_no",
-                "jobNo",
-                "employeeCode",
-                "employeeId",
-                "leaveRecord.jobNumber",
-            ),
-            default="",
-        ),
-        "main_dept_id": _extract_int(
-            (
-                "main_dept_id",
-                "mainDeptId",
-                "main_department_id",
-                "dept_id",
-                "deptId",
-                "employeeInfo.mainDeptId",
-                "employee_info.mainDeptId",
-                "leaveRecord.deptId",
-            )
-        ),
-        "main_dept_name": _extract(
-            (
-                "main_dept_name",
-                "mainDeptName",
-                "main_department_name",
-                "dept_name",
-                "deptName",
-                "employeeInfo.mainDeptName",
-                "employee_info.mainDeptName",
-                "leaveRecord.deptName",
-            ),
-            default="",
-        ),
-        "handover_userid": _extract(
-            (
-                "handover_userid",
-                "handoverUserId",
-                "handover_user_id",
-                "handoverUserID",
-                "leaveRecord.handoverUserId",
-            ),
-            default="",
-        ),
+        "userid": _extract("userid", default=""),
+        "name": _extract("name", default=""),
+        "mobile": _extract("mobile", default=""),
+        "job_number": _extract("job_number", default=""),
+        "main_dept_id": _extract_int("main_dept_id"),
+        "main_dept_name": _extract("main_dept_name", default=""),
+        "handover_userid": _extract("handover_userid", default=""),
         "last_work_day": last_work_day,
         "leave_time": leave_time,
         "leave_reason": leave_reason,
-        "reason_type": _extract(("reason_type", "reasonType", "leaveRecord.reasonType"), default=None),
-        "reason_memo": _extract(("reason_memo", "reasonMemo", "leaveRecord.reasonMemo"), default=""),
-        "pre_status": _extract(("pre_status", "preStatus", "leaveRecord.preStatus"), default=None),
-        "status": _extract(("status", "statusCode", "leaveRecord.status"), default=None),
+        "reason_type": _extract("reason_type", default=None),
+        "reason_memo": _extract("reason_memo", default=""),
+        "pre_status": _extract("pre_status", default=None),
+        "status": _extract("status", default=None),
         "voluntary_reasons": voluntary_list,
         "passive_reasons": passive_list,
         "dept_ids": dept_ids,
@@ -367,8 +543,11 @@ def map_dimission(config_id: str, info: Dict[str, Any], leave_record: Dict[str,
 
 
 __all__ = [
+    "compute_content_hash",
     "map_department",
     "map_user",
     "map_attendance",
+    "map_attendance_batch",
     "map_dimission",
+    "merge_roster_info",
 ]
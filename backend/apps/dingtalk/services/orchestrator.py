@@ -0,0 +1,181 @@
+"""多配置并行同步编排
+
+为所有启用的配置依次执行 部门 → 用户 → 离职人员 → 考勤 四个阶段，不同配置在进程池（或线程池）中并行：
+
+- 限流：client 的令牌桶以 ``{config_id}:{bucket}`` 为键，每个配置各自占用独立额度；
+- 写库：全局信号量（``DB_WRITE_CONCURRENCY``）限制同时执行批量写入的 worker 数，避免数据库被并发写入压垮；
+- 汇总：每个配置、每个阶段的结果与耗时汇总为一份报告，单个配置失败不影响其他配置。
+
+进程池使用 fork 启动 worker，fork 前关闭父进程的数据库连接，子进程各自重新建立连接；
+不支持 fork 的平台自动退回线程池。
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.db import connection, connections
+
+from ..constants import DEFAULT_DB_WRITE_CONCURRENCY, DEFAULT_ORCHESTRATOR_WORKERS
+from ..models import DingTalkConfig
+from .bulk import set_write_concurrency
+from .sync import SyncService
+
+logger = logging.getLogger(__name__)
+
+STAGES: tuple[str, ...] = ("departments", "users", "dimission_users", "attendance")
+EXECUTORS = ("process", "thread")
+# 汇总报告中累加的计数字段
+COUNT_FIELDS = ("count", "staleCount")
+
+
+def _get_option(name: str, default: Any) -> Any:
+    return getattr(settings, "DINGTALK", {}).get(name, default)
+
+
+def _config_stages(config: DingTalkConfig, stages: Iterable[str]) -> list[str]:
+    """根据配置的同步开关过滤阶段：离职人员随用户同步开关."""
+
+    enabled = {
+        "departments": config.sync_departments,
+        "users": config.sync_users,
+        "dimission_users": config.sync_users,
+        "attendance": config.sync_attendance,
+    }
+    return [stage for stage in stages if enabled.get(stage)]
+
+
+def _stage_runner(service: SyncService, stage: str) -> Callable[[], dict]:
+    if stage == "departments":
+        return service.sync_departments
+    if stage == "users":
+        return service.sync_users
+    if stage == "dimission_users":
+        return service.sync_dimission_users
+    return lambda: service.sync_attendance(None, None, mode="incremental")
+
+
+def sync_config(config_id: str, stages: Iterable[str] = STAGES) -> dict[str, Any]:
+    """按阶段顺序同步单个配置；某阶段失败后跳过后续依赖阶段，返回该配置的报告."""
+
+    started = time.monotonic()
+    config = DingTalkConfig.load(config_id)
+    service = SyncService(config)
+    report: dict[str, Any] = {"config_id": config_id, "status": "success", "stages": {}}
+    for stage in _config_stages(config, stages):
+        stage_started = time.monotonic()
+        try:
+            result = _stage_runner(service, stage)()
+        except Exception as exc:  # noqa: BLE001 - 失败记录到报告，由汇总统一呈现
+            logger.warning("钉钉多配置同步阶段失败 config=%s stage=%s error=%s", config_id, stage, exc)
+            report["stages"][stage] = {"status": "failed", "error": str(exc), "duration": round(time.monotonic() - stage_started, 3)}
+            report["status"] = "failed"
+            break
+        report["stages"][stage] = {"status": "success", "result": result, "duration": round(time.monotonic() - stage_started, 3)}
+    report["duration"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def _init_process_worker(semaphore: Any) -> None:
+    set_write_concurrency(semaphore)
+
+
+def _sync_config_in_thread(config_id: str, stages: tuple[str, ...]) -> dict[str, Any]:
+    try:
+        return sync_config(config_id, stages)
+    finally:
+        connection.close()
+
+
+def _summarize(reports: list[dict[str, Any]], duration: float) -> dict[str, Any]:
+    totals: dict[str, dict[str, int]] = {}
+    for report in reports:
+        for stage, outcome in report["stages"].items():
+            result = outcome.get("result") or {}
+            stage_totals = totals.setdefault(stage, {})
+            for name in COUNT_FIELDS:
+                if isinstance(result.get(name), int):
+                    stage_totals[name] = stage_totals.get(name, 0) + result[name]
+    failed = [report["config_id"] for report in reports if report["status"] != "success"]
+    return {
+        "configs": len(reports),
+        "succeeded": len(reports) - len(failed),
+        "failed": failed,
+        "totals": totals,
+        "duration": round(duration, 3),
+        "reports": reports,
+    }
+
+
+def _build_executor(kind: str, workers: int, write_concurrency: int) -> tuple[Executor, Callable[..., dict]]:
+    if kind == "process" and "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        # fork 前关闭连接，避免子进程复用父进程的数据库连接
+        connections.close_all()
+        semaphore = context.BoundedSemaphore(write_concurrency)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_process_worker,
+            initargs=(semaphore,),
+        )
+        return executor, sync_config
+    set_write_concurrency(threading.BoundedSemaphore(write_concurrency))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dingtalk-orchestrator"), _sync_config_in_thread
+
+
+def sync_all_configs(
+    config_ids: Iterable[str] | None = None,
+    *,
+    stages: Iterable[str] = STAGES,
+    max_workers: int | None = None,
+    executor: str | None = None,
+    write_concurrency: int | None = None,
+) -> dict[str, Any]:
+    """并行同步所有（或指定的）启用配置，返回汇总报告."""
+
+    stages = tuple(stage for stage in stages if stage in STAGES)
+    if config_ids is None:
+        config_ids = DingTalkConfig.enabled_configs().order_by("id").values_list("id", flat=True)
+    config_ids = list(config_ids)
+    workers = max(1, min(int(max_workers or _get_option("ORCHESTRATOR_WORKERS", DEFAULT_ORCHESTRATOR_WORKERS)), len(config_ids) or 1))
+    write_concurrency = max(1, int(write_concurrency or _get_option("DB_WRITE_CONCURRENCY", DEFAULT_DB_WRITE_CONCURRENCY)))
+    kind = executor or _get_option("ORCHESTRATOR_EXECUTOR", "process")
+    if kind not in EXECUTORS:
+        raise ValueError(f"不支持的执行方式: {kind}")
+
+    started = time.monotonic()
+    if workers == 1:
+        reports = [sync_config(config_id, stages) for config_id in config_ids]
+    else:
+        pool, func = _build_executor(kind, workers, write_concurrency)
+        try:
+            with pool:
+                futures = [pool.submit(func, config_id, stages) for config_id in config_ids]
+                reports = []
+                for config_id, future in zip(config_ids, futures):
+                    try:
+                        reports.append(future.result())
+                    except Exception as exc:  # noqa: BLE001 - worker 进程异常退出等
+                        reports.append({"config_id": config_id, "status": "failed", "stages": {}, "error": str(exc)})
+        finally:
+            set_write_concurrency(None)
+    summary = _summarize(reports, time.monotonic() - started)
+    logger.info(
+        "钉钉多配置同步完成 configs=%s succeeded=%s failed=%s duration=%.1fs totals=%s",
+        summary["configs"],
+        summary["succeeded"],
+        summary["failed"],
+        summary["duration"],
+        summary["totals"],
+    )
+    return summary
+
+
+__all__ = ["STAGES", "sync_all_configs", "sync_config"]
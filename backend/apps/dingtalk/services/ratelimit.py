@@ -0,0 +1,204 @@
+"""钉钉接口速率限制
+
+提供令牌桶算法的进程内实现，以及基于 Redis（复用 ``CACHES`` 配置）的分布式实现，
+后者让多个 gunicorn worker 共享同一个限流额度。调用方在锁外等待，不会阻塞其他线程。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from time import monotonic, sleep
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# GCRA（通用信元速率算法）：以“理论到达时间”描述令牌桶，预约一个令牌并返回需等待的秒数
+_REDIS_RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local emission = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+local wait = new_tat - emission * capacity - now
+if wait < 0 then
+    wait = 0
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RateLimiter:
+    """速率限制器基类，子类只需实现 ``_reserve``."""
+
+    backend = "base"
+
+    def __init__(self) -> None:
+        self._metrics_lock = threading.Lock()
+        self._metrics: dict[str, dict[str, float | int]] = defaultdict(
+            lambda: {"calls": 0, "throttled": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        )
+
+    def _reserve(self, key: str, *, rate: float, capacity: int) -> float:
+        raise NotImplementedError
+
+    def acquire(self, key: str, *, rate: float, capacity: int) -> float:
+        """预约一个令牌并在锁外等待，返回实际等待的秒数."""
+
+        wait = max(0.0, self._reserve(key, rate=rate, capacity=capacity))
+        if wait > 0:
+            sleep(wait)
+        self._record(key, wait)
+        return wait
+
+    async def _reserve_async(self, key: str, *, rate: float, capacity: int) -> float:
+        return self._reserve(key, rate=rate, capacity=capacity)
+
+    async def acquire_async(self, key: str, *, rate: float, capacity: int) -> float:
+        """异步版本的 acquire，与同步调用方共享同一份额度."""
+
+        wait = max(0.0, await self._reserve_async(key, rate=rate, capacity=capacity))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._record(key, wait)
+        return wait
+
+    def _record(self, key: str, wait: float) -> None:
+        with self._metrics_lock:
+            stats = self._metrics[key]
+            stats["calls"] += 1
+            if wait > 0:
+                stats["throttled"] += 1
+                stats["wait_seconds"] += wait
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+
+    def get_metrics(self) -> dict[str, dict[str, Any]]:
+        with self._metrics_lock:
+            return {key: {"backend": self.backend, **value} for key, value in self._metrics.items()}
+
+    def reset_metrics(self) -> None:
+        with self._metrics_lock:
+            self._metrics.clear()
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """进程内令牌桶，允许令牌数为负以表示已被预约的等待额度."""
+
+    backend = "local"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def _reserve(self, key: str, *, rate: float, capacity: int) -> float:
+        with self._lock:
+            now = monotonic()
+            tokens, updated = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * rate)
+            tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+        return -tokens / rate if tokens < 0 else 0.0
+
+
+class RedisRateLimiter(RateLimiter):
+    """基于 Redis 的分布式令牌桶，Redis 不可用时退回进程内令牌桶."""
+
+    backend = "redis"
+
+    def __init__(self, cache_alias: str = "default", *, key_prefix: str = "dingtalk:ratelimit:") -> None:
+        super().__init__()
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self._fallback = TokenBucketRateLimiter()
+        self._script = None
+        # Redis 故障期间每次预约都会失败，只在进入和恢复时各记录一次日志
+        self._state_lock = threading.Lock()
+        self._unavailable = False
+
+    def _get_script(self):
+        if self._script is None:
+            from django_redis import get_redis_connection
+
+            self._script = get_redis_connection(self.cache_alias).register_script(_REDIS_RESERVE_SCRIPT)
+        return self._script
+
+    def _reserve(self, key: str, *, rate: float, capacity: int) -> float:
+        try:
+            result = self._get_script()(keys=[f"{self.key_prefix}{key}"], args=[1.0 / rate, capacity])
+        except Exception as exc:  # noqa: BLE001 - Redis 故障不应中断同步
+            self._set_unavailable(True, key=key, error=exc)
+            return self._fallback._reserve(key, rate=rate, capacity=capacity)  # noqa: SLF001
+        if self._unavailable:
+            self._set_unavailable(False, key=key)
+        return float(result.decode() if isinstance(result, bytes) else result)
+
+    def _set_unavailable(self, unavailable: bool, *, key: str, error: Exception | None = None) -> None:
+        with self._state_lock:
+            if self._unavailable == unavailable:
+                return
+            self._unavailable = unavailable
+        if unavailable:
+            logger.warning("Redis 限流不可用，退回进程内限流直至恢复 key=%s error=%s", key, error)
+        else:
+            logger.info("Redis 限流已恢复 key=%s", key)
+
+    async def _reserve_async(self, key: str, *, rate: float, capacity: int) -> float:
+        # Redis 调用是阻塞 IO，放到线程中执行以免卡住事件循环
+        return await asyncio.to_thread(self._reserve, key, rate=rate, capacity=capacity)
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def _build_rate_limiter() -> RateLimiter:
+    options = getattr(settings, "DINGTALK", {})
+    backend = str(options.get("RATE_LIMITER", "auto")).lower()
+    cache_alias = options.get("RATE_LIMIT_CACHE_ALIAS", "default")
+    if backend == "auto":
+        cache_backend = settings.CACHES.get(cache_alias, {}).get("BACKEND", "")
+        backend = "redis" if "django_redis" in cache_backend else "local"
+    if backend == "redis":
+        return RedisRateLimiter(cache_alias)
+    return TokenBucketRateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = _build_rate_limiter()
+    return _limiter
+
+
+def reset_rate_limiter() -> None:
+    """丢弃当前限流器（配置变更或测试时使用）."""
+
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+def get_rate_limit_metrics() -> dict[str, dict[str, Any]]:
+    return get_rate_limiter().get_metrics()
+
+
+__all__ = [
+    "RateLimiter",
+    "TokenBucketRateLimiter",
+    "RedisRateLimiter",
+    "get_rate_limiter",
+    "reset_rate_limiter",
+    "get_rate_limit_metrics",
+]
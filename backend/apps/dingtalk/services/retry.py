@@ -0,0 +1,133 @@
+"""钉钉接口重试与熔断策略"""
+
+from __future__ import annotations
+
+import random
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from time import monotonic
+from typing import Any
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..constants import (
+    DEFAULT_CIRCUIT_BREAKER_COOLDOWN,
+    DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_BACKOFF_BASE,
+    DEFAULT_RETRY_BACKOFF_MAX,
+)
+
+
+@dataclass(slots=True)
+class RetryPolicy:
+    max_retries: int = DEFAULT_RETRIES
+    backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE
+    backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        options = getattr(settings, "DINGTALK", {})
+        return cls(
+            max_retries=max(0, int(options.get("DEFAULT_RETRIES", DEFAULT_RETRIES))),
+            backoff_base=float(options.get("RETRY_BACKOFF_BASE", DEFAULT_RETRY_BACKOFF_BASE)),
+            backoff_max=float(options.get("RETRY_BACKOFF_MAX", DEFAULT_RETRY_BACKOFF_MAX)),
+        )
+
+    def compute_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """指数退避加抖动；服务端给出 Retry-After 时以其为准，但不超过 backoff_max."""
+
+        if retry_after is not None:
+            return min(self.backoff_max, max(0.0, retry_after))
+        ceiling = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+
+def parse_retry_after(value: Any) -> float | None:
+    """解析 Retry-After 头，支持秒数与 HTTP 日期两种格式."""
+
+    if value in (None, ""):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - timezone.now()).total_seconds())
+
+
+class CircuitBreaker:
+    """连续失败达到阈值后熔断，冷却期结束放行一次试探请求."""
+
+    def __init__(self, *, threshold: int, cooldown: float) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key: str) -> CircuitBreaker:
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+    options = getattr(settings, "DINGTALK", {})
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                threshold=int(options.get("CIRCUIT_BREAKER_THRESHOLD", DEFAULT_CIRCUIT_BREAKER_THRESHOLD)),
+                cooldown=float(options.get("CIRCUIT_BREAKER_COOLDOWN", DEFAULT_CIRCUIT_BREAKER_COOLDOWN)),
+            )
+            _breakers[key] = breaker
+    return breaker
+
+
+def reset_circuit_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+__all__ = [
+    "RetryPolicy",
+    "CircuitBreaker",
+    "parse_retry_after",
+    "get_circuit_breaker",
+    "reset_circuit_breakers",
+]
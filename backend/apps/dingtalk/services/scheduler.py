@@ -1,30 +1,63 @@
-"""计划任务调度适配层
+"""内置计划任务调度
 
-默认提供空实现，项目可根据需要接入 Celery beat / APScheduler / Django-Q 等调度器。
+DingTalkConfig.schedule 中的 ``cron`` 字段按 5 段 cron 表达式解析，调度进程（run_dingtalk_scheduler 命令）
+周期性调用 run_due_schedules 执行到期的计划：
+
+- 每个配置在 ScheduleState 中有一行状态记录，执行前通过条件更新抢占租约，执行期间由续约线程
+  每 1/4 个 SCHEDULER_LEASE 延长一次租约，多个调度进程或上一次执行尚未结束时不会重叠执行；
+- 删除或改坏 cron 后清空下一次执行时间，计划随即停止触发，不会沿用旧表达式；
+- 触发时间按配置 ID 叠加固定的抖动偏移（``jitter`` 秒），多个配置不会同时请求钉钉接口；
+- 进程停机期间错过的计划在重启后补跑一次（多次错过合并为一次），``catch_up: false`` 时直接跳过。
+
+schedule 示例::
+
+    {"cron": "0 2 * * *", "operations": ["departments", "users", "attendance"], "jitter": 120, "catch_up": true}
+
+未指定 operations 时根据配置的 sync_departments/sync_users/sync_attendance 开关决定。
+也可以不启动调度进程，由 Celery beat 等外部调度器直接调用 run_scheduled_sync。
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Iterable
 
 from django.conf import settings
-from django.db import connections
+from django.db import connection, connections
+from django.db.models import Q
 from django.db.utils import OperationalError, ProgrammingError
 from django.utils import timezone
 
-from ..models import DingTalkConfig
+from ..constants import (
+    DEFAULT_SCHEDULER_CATCH_UP_GRACE,
+    DEFAULT_SCHEDULER_JITTER,
+    DEFAULT_SCHEDULER_LEASE,
+    DEFAULT_SCHEDULER_WORKERS,
+)
+from ..models import DingTalkConfig, ScheduleState
+from .cron import CronExpression
+from .events import process_events
 from .sync import SyncService
+from .tombstone import purge_tombstones
 
 logger = logging.getLogger(__name__)
 
 
-def autodiscover_schedules() -> None:
-    """应用初始化时调用，针对启用的配置自动注册计划任务。
+def _get_option(name: str, default: int) -> int:
+    try:
+        return max(0, int(getattr(settings, "DINGTALK", {}).get(name, default)))
+    except (TypeError, ValueError):
+        return default
 
-    默认实现仅打印日志，避免强绑定具体调度框架。
-    使用者可在此函数中接入实际调度器。
-    """
+
+def autodiscover_schedules() -> None:
+    """应用初始化时调用，校验启用配置的计划任务并打印下一次执行时间（只读，不写数据库）."""
 
     try:
         # 在迁移阶段可能尚未创建表
@@ -34,12 +67,199 @@ def autodiscover_schedules() -> None:
         logger.debug("钉钉配置表尚未准备好，跳过计划任务加载")
         return
 
-    configs = DingTalkConfig.enabled_configs()
-    for config in configs:
-        schedule = config.schedule or {}
-        if not schedule:
+    now = timezone.now()
+    for config in DingTalkConfig.enabled_configs():
+        expression = (config.schedule or {}).get("cron")
+        if not expression:
+            continue
+        try:
+            next_run = compute_next_run(config, CronExpression.parse(expression), now)
+        except ValueError as exc:
+            logger.warning("钉钉计划任务配置无效 config=%s cron=%s error=%s", config.id, expression, exc)
+            continue
+        logger.info("检测到钉钉计划任务 config=%s cron=%s next=%s（由 run_dingtalk_scheduler 执行）", config.id, expression, next_run)
+
+
+def get_schedule_operations(config: DingTalkConfig) -> list[str]:
+    operations = (config.schedule or {}).get("operations")
+    if operations:
+        return [str(item) for item in operations]
+    flags = (("departments", config.sync_departments), ("users", config.sync_users), ("attendance", config.sync_attendance))
+    return [name for name, enabled in flags if enabled]
+
+
+def jitter_offset(config: DingTalkConfig) -> timedelta:
+    """按配置 ID 计算固定的抖动偏移，重启后保持不变，不同配置分散在 [0, jitter) 秒内."""
+
+    jitter = (config.schedule or {}).get("jitter", _get_option("SCHEDULER_JITTER", DEFAULT_SCHEDULER_JITTER))
+    try:
+        jitter = int(jitter)
+    except (TypeError, ValueError):
+        jitter = DEFAULT_SCHEDULER_JITTER
+    if jitter <= 0:
+        return timedelta(0)
+    digest = int(hashlib.sha256(config.id.encode("utf-8")).hexdigest()[:8], 16)
+    return timedelta(seconds=digest % jitter)
+
+
+def compute_next_run(config: DingTalkConfig, cron: CronExpression, after: datetime) -> datetime:
+    offset = jitter_offset(config)
+    return cron.next_after(after - offset) + offset
+
+
+def refresh_schedule_states(now: datetime | None = None) -> None:
+    """为启用计划任务的配置创建状态行；cron 变更后按新表达式重新计算下一次执行时间，
+    cron 被删除或无效时清空下一次执行时间（保留最近一次执行记录）."""
+
+    now = now or timezone.now()
+    for config in DingTalkConfig.enabled_configs():
+        expression = (config.schedule or {}).get("cron") or ""
+        if not expression:
+            ScheduleState.objects.filter(config=config).exclude(cron="", next_run_at=None).update(
+                cron="", next_run_at=None, update_time=now
+            )
+            continue
+        state, _ = ScheduleState.objects.get_or_create(config=config)
+        if state.cron == expression and state.next_run_at is not None:
+            continue
+        try:
+            next_run = compute_next_run(config, CronExpression.parse(expression), now)
+        except ValueError as exc:
+            # 只在表达式变化时记录一次，之后保持停用直到修正
+            if state.cron != expression or state.next_run_at is not None:
+                logger.warning("钉钉计划任务配置无效，已停用 config=%s cron=%s error=%s", config.id, expression, exc)
+                ScheduleState.objects.filter(pk=state.pk).update(cron=expression, next_run_at=None, update_time=now)
             continue
-        logger.info("检测到钉钉计划任务配置 config=%s schedule=%s（需要自行接入调度器）", config.id, schedule)
+        ScheduleState.objects.filter(pk=state.pk).update(cron=expression, next_run_at=next_run, update_time=now)
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=_get_option("SCHEDULER_LEASE", DEFAULT_SCHEDULER_LEASE))
+
+
+def _claim(state: ScheduleState, owner: str, now: datetime) -> bool:
+    # next_run_at 作为乐观锁：其他调度进程已执行并推进了时间时不会再次领取
+    return bool(
+        ScheduleState.objects.filter(pk=state.pk, next_run_at=state.next_run_at)
+        .filter(Q(lease_until__isnull=True) | Q(lease_until__lt=now))
+        .update(lease_owner=owner, lease_until=now + _lease(), update_time=now)
+    )
+
+
+class _LeaseKeeper:
+    """计划执行期间在后台线程中定期延长租约，执行时间超过 SCHEDULER_LEASE 也不会被其他调度进程重复领取"""
+
+    def __init__(self, state: ScheduleState, owner: str) -> None:
+        self.state_id = state.pk
+        self.owner = owner
+        self.lease = _lease()
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"dingtalk-schedule-lease-{state.pk}", daemon=True)
+
+    def __enter__(self) -> "_LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def renew(self) -> bool:
+        now = timezone.now()
+        renewed = ScheduleState.objects.filter(pk=self.state_id, lease_owner=self.owner).update(
+            lease_until=now + self.lease, update_time=now
+        )
+        if not renewed and not self.lost:
+            self.lost = True
+            logger.warning("钉钉计划任务租约已失效 config=%s owner=%s", self.state_id, self.owner)
+        return bool(renewed)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(max(self.lease.total_seconds() / 4, 0.1)):
+                try:
+                    self.renew()
+                except Exception as exc:  # noqa: BLE001 - 续约失败在下一个间隔重试
+                    logger.warning("钉钉计划任务续约失败 config=%s error=%s", self.state_id, exc)
+        finally:
+            connection.close()
+
+
+def _current_cron(config: DingTalkConfig) -> str:
+    schedule = DingTalkConfig.objects.filter(pk=config.pk).values_list("schedule", flat=True).first()
+    return (schedule or {}).get("cron") or ""
+
+
+def _execute(state: ScheduleState, owner: str, now: datetime) -> str:
+    config = state.config
+    schedule = config.schedule or {}
+    grace = timedelta(seconds=_get_option("SCHEDULER_CATCH_UP_GRACE", DEFAULT_SCHEDULER_CATCH_UP_GRACE))
+    missed = now - state.next_run_at > grace
+    status, error = "success", ""
+    if missed and not schedule.get("catch_up", True):
+        status = "skipped"
+        logger.info("钉钉计划任务错过执行时间，按配置跳过补跑 config=%s due=%s", config.id, state.next_run_at)
+    else:
+        if missed:
+            logger.info("钉钉计划任务补跑 config=%s due=%s", config.id, state.next_run_at)
+        with _LeaseKeeper(state, owner):
+            try:
+                run_scheduled_sync(config.id, get_schedule_operations(config))
+            except Exception as exc:  # noqa: BLE001 - 失败不影响下一次调度
+                status, error = "failed", str(exc)[:2000]
+                logger.warning("钉钉计划任务执行失败 config=%s error=%s", config.id, exc)
+    finished = timezone.now()
+    next_run = None
+    # 执行期间 cron 被修改或删除时不再沿用旧表达式，由 refresh_schedule_states 按新配置重新计算
+    if _current_cron(config) == state.cron:
+        try:
+            next_run = compute_next_run(config, CronExpression.parse(state.cron), max(finished, now))
+        except ValueError:
+            next_run = None
+    updated = ScheduleState.objects.filter(pk=state.pk, lease_owner=owner).update(
+        next_run_at=next_run,
+        last_run_at=now,
+        last_status=status,
+        last_error=error,
+        lease_owner="",
+        lease_until=None,
+        update_time=finished,
+    )
+    if not updated:
+        logger.warning("钉钉计划任务租约已被其他调度进程接管，放弃写回结果 config=%s status=%s", config.id, status)
+    return status
+
+
+def run_due_schedules(*, now: datetime | None = None, owner: str | None = None, max_workers: int | None = None) -> dict[str, int]:
+    """执行所有到期的计划任务，返回统计；不同配置的计划可在线程池中并行执行."""
+
+    now = now or timezone.now()
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    refresh_schedule_states(now)
+    due = ScheduleState.objects.select_related("config").filter(config__enabled=True, next_run_at__lte=now).order_by("next_run_at")
+    # 只执行 cron 与当前配置一致的状态行，配置变更后尚未刷新的旧计划不会再触发
+    claimed = [state for state in due if state.cron == (state.config.schedule or {}).get("cron") and _claim(state, owner, now)]
+    summary = {"due": len(claimed), "success": 0, "failed": 0, "skipped": 0}
+    if not claimed:
+        return summary
+
+    workers = max(1, max_workers or _get_option("SCHEDULER_WORKERS", DEFAULT_SCHEDULER_WORKERS))
+
+    def _execute_in_worker(state: ScheduleState) -> str:
+        try:
+            return _execute(state, owner, now)
+        finally:
+            connection.close()
+
+    if workers == 1 or len(claimed) == 1:
+        outcomes = [_execute(state, owner, now) for state in claimed]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(claimed)), thread_name_prefix="dingtalk-schedule") as executor:
+            outcomes = list(executor.map(_execute_in_worker, claimed))
+    for outcome in outcomes:
+        summary[outcome] += 1
+    return summary
 
 
 def run_scheduled_sync(config_id: str, operations: Iterable[str]) -> None:
@@ -53,7 +273,26 @@ def run_scheduled_sync(config_id: str, operations: Iterable[str]) -> None:
         service.sync_users()
     if "attendance" in op_set:
         schedule = service.config.schedule or {}
-        window = schedule.get("attendance_window", 1)
-        end = settings.TIME_ZONE and timezone.now() or timezone.now()
-        start = end - timezone.timedelta(days=window)
-        service.sync_attendance(start, end)
+        if schedule.get("attendance_mode", "incremental") == "incremental":
+            # 从考勤游标的水位线续传，首次运行时回退 attendance_window 天
+            service.sync_attendance(None, None, mode="incremental")
+        else:
+            window = schedule.get("attendance_window", 1)
+            end = timezone.now()
+            start = end - timezone.timedelta(days=window)
+            service.sync_attendance(start, end)
+    if "events" in op_set:
+        process_events(service.config)
+    if "tombstones" in op_set:
+        purge_tombstones(service.config)
+
+
+__all__ = [
+    "autodiscover_schedules",
+    "compute_next_run",
+    "get_schedule_operations",
+    "jitter_offset",
+    "refresh_schedule_states",
+    "run_due_schedules",
+    "run_scheduled_sync",
+]
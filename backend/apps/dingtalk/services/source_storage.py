@@ -0,0 +1,237 @@
+"""快照原始数据（source_info）的存储策略
+
+DINGTALK["SOURCE_INFO_POLICY"] 按模型（department/user/attendance/dimission，未配置时取 default）选择：
+
+- ``full``：完整保存在 source_info（JSON 列），默认行为；
+- ``allowlist``：只保留 ``fields`` 中列出的顶层字段，其余字段丢弃；
+- ``compressed``：压缩后写入 source_blob（``codec`` 为 zlib 或 zstd，后者需安装 zstandard），source_info 置空；
+- ``external``：转存到 dingtalk_source_payload 表，列表查询不再读取原始数据，按需加载。
+
+示例::
+
+    "SOURCE_INFO_POLICY": {
+        "default": "full",
+        "attendance": {"mode": "compressed", "codec": "zstd"},
+        "user": {"mode": "allowlist", "fields": ["userid", "name", "dept_id_list"]},
+        "dimission": "external",
+    }
+
+内容摘要始终按完整原始数据计算，修改策略不会触发同步重写；已有数据通过 rewrite_dingtalk_source_info 命令转换。
+注意 allowlist 会永久丢弃未列出的字段，之后再切换到其他策略也无法恢复。
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Model
+
+from ..models import (
+    DingTalkAttendanceRecord,
+    DingTalkConfig,
+    DingTalkDepartment,
+    DingTalkDimissionUser,
+    DingTalkSourcePayload,
+    DingTalkUser,
+    SourceStorage,
+)
+from ..models.source import compress_payload, prefetch_source_info
+from .exceptions import DingTalkConfigurationError
+
+logger = logging.getLogger(__name__)
+
+SOURCE_INFO_MODELS: dict[str, type[Model]] = {
+    "department": DingTalkDepartment,
+    "user": DingTalkUser,
+    "attendance": DingTalkAttendanceRecord,
+    "dimission": DingTalkDimissionUser,
+}
+_MODEL_ALIASES = {model: name for name, model in SOURCE_INFO_MODELS.items()}
+STORAGE_FIELDS = ("source_info", "source_blob", "source_storage")
+
+
+@dataclass(frozen=True)
+class SourceInfoPolicy:
+    mode: str = SourceStorage.FULL
+    fields: tuple[str, ...] = ()
+    codec: str = "zlib"
+
+
+def get_source_policy(model: type[Model]) -> SourceInfoPolicy:
+    policies = getattr(settings, "DINGTALK", {}).get("SOURCE_INFO_POLICY") or {}
+    raw = policies.get(_MODEL_ALIASES.get(model, ""), policies.get("default", SourceStorage.FULL))
+    if isinstance(raw, str):
+        raw = {"mode": raw}
+    if not isinstance(raw, dict):
+        raise DingTalkConfigurationError(f"source_info 存储策略格式错误: {raw!r}")
+    mode = str(raw.get("mode") or SourceStorage.FULL)
+    if mode not in SourceStorage.values:
+        raise DingTalkConfigurationError(f"不支持的 source_info 存储策略: {mode}")
+    fields = tuple(str(item) for item in raw.get("fields") or ())
+    if mode == SourceStorage.ALLOWLIST and not fields:
+        raise DingTalkConfigurationError("allowlist 存储策略需要配置 fields")
+    return SourceInfoPolicy(mode=mode, fields=fields, codec=str(raw.get("codec") or "zlib"))
+
+
+def encode_source_info(model: type[Model], row: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """按存储策略转换 map_* 输出中的 source_info，返回 (写入数据行, 需转存到独立表的原始数据或 None)."""
+
+    if model not in _MODEL_ALIASES or "source_info" not in row:
+        return row, None
+    policy = get_source_policy(model)
+    payload = row["source_info"] if isinstance(row["source_info"], dict) else {}
+    row = {**row, "source_storage": policy.mode, "source_blob": None}
+    external = None
+    if policy.mode == SourceStorage.ALLOWLIST:
+        row["source_info"] = {key: payload[key] for key in policy.fields if key in payload}
+    elif policy.mode == SourceStorage.COMPRESSED:
+        try:
+            row["source_blob"] = compress_payload(payload, policy.codec)
+        except ValueError as exc:
+            raise DingTalkConfigurationError(str(exc)) from exc
+        row["source_info"] = {}
+    elif policy.mode == SourceStorage.EXTERNAL:
+        row["source_info"] = {}
+        external = payload
+    return row, external
+
+
+def store_external_payloads(model: type[Model], payloads: Iterable[tuple[str, Any, dict[str, Any]]]) -> int:
+    """写入（覆盖）独立表中的原始数据，payloads 为 (config_id, 业务主键, 原始数据)."""
+
+    objs = [
+        DingTalkSourcePayload(source_model=model._meta.label_lower, config_id=config_id, object_key=str(key), payload=payload)
+        for config_id, key, payload in payloads
+    ]
+    if not objs:
+        return 0
+    features = connections[router.db_for_write(DingTalkSourcePayload)].features
+    options: dict[str, Any] = {"update_conflicts": True, "update_fields": ["payload", "update_time"]}
+    if features.supports_update_conflicts_with_target:
+        options["unique_fields"] = ["source_model", "config", "object_key"]
+    elif not features.supports_update_conflicts:
+        _delete_external_payloads(model, [(obj.config_id, obj.object_key) for obj in objs])
+        options = {}
+    DingTalkSourcePayload.objects.bulk_create(objs, **options)
+    return len(objs)
+
+
+def _delete_external_payloads(model: type[Model], keys: Iterable[tuple[str, str]]) -> None:
+    by_config: dict[str, list[str]] = {}
+    for config_id, key in keys:
+        by_config.setdefault(config_id, []).append(key)
+    for config_id, object_keys in by_config.items():
+        DingTalkSourcePayload.objects.filter(
+            source_model=model._meta.label_lower, config_id=config_id, object_key__in=object_keys
+        ).delete()
+
+
+def _rewrite_model(model: type[Model], config: DingTalkConfig | None, batch_size: int) -> int:
+    queryset = model._base_manager.order_by("pk")
+    if config is not None:
+        queryset = queryset.filter(config=config)
+    key_field = model.source_key_field
+    rewritten = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        prefetch_source_info(batch)
+        changed: list[Model] = []
+        externals: list[tuple[str, Any, dict[str, Any]]] = []
+        released: list[tuple[str, str]] = []
+        for obj in batch:
+            row, external = encode_source_info(
+                model, {"config_id": obj.config_id, key_field: obj.source_key, "source_info": obj.get_source_info()}
+            )
+            if all(getattr(obj, name) == row[name] for name in STORAGE_FIELDS):
+                continue
+            if external is not None:
+                externals.append((obj.config_id, obj.source_key, external))
+            elif obj.source_storage == SourceStorage.EXTERNAL:
+                released.append((obj.config_id, obj.source_key))
+            for name in STORAGE_FIELDS:
+                setattr(obj, name, row[name])
+            changed.append(obj)
+        with transaction.atomic():
+            # bulk_update 不刷新 update_time：存储方式变化不算内容更新
+            if changed:
+                model._base_manager.bulk_update(changed, list(STORAGE_FIELDS), batch_size=batch_size)
+            store_external_payloads(model, externals)
+            _delete_external_payloads(model, released)
+        rewritten += len(changed)
+        if len(batch) < batch_size:
+            break
+    return rewritten
+
+
+def _prune_orphan_payloads(model: type[Model], config: DingTalkConfig | None, batch_size: int) -> int:
+    """删除独立表中对应记录已删除或已不再使用独立表保存的原始数据."""
+
+    label = model._meta.label_lower
+    queryset = DingTalkSourcePayload.objects.filter(source_model=label).order_by("pk")
+    if config is not None:
+        queryset = queryset.filter(config=config)
+    key_field = model.source_key_field
+    pruned = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values_list("pk", "config_id", "object_key")[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        live = set(
+            model._base_manager.filter(
+                **{f"{key_field}__in": {key for _, _, key in rows}}, source_storage=SourceStorage.EXTERNAL
+            ).values_list("config_id", key_field)
+        )
+        live = {(config_id, str(key)) for config_id, key in live}
+        orphans = [pk for pk, config_id, key in rows if (config_id, key) not in live]
+        if orphans:
+            pruned += DingTalkSourcePayload.objects.filter(pk__in=orphans).delete()[0]
+        if len(rows) < batch_size:
+            break
+    return pruned
+
+
+def rewrite_source_info(
+    model_names: Iterable[str] | None = None,
+    *,
+    config: DingTalkConfig | None = None,
+    batch_size: int | None = None,
+) -> dict[str, dict[str, int]]:
+    """按当前存储策略分批重写已有记录的原始数据，并清理独立表中的孤立数据；返回各模型的重写与清理数量."""
+
+    from .bulk import get_bulk_batch_size
+
+    batch_size = max(1, batch_size or get_bulk_batch_size())
+    names = list(model_names or SOURCE_INFO_MODELS)
+    unknown = [name for name in names if name not in SOURCE_INFO_MODELS]
+    if unknown:
+        raise DingTalkConfigurationError(f"未知的快照模型: {', '.join(unknown)}")
+    summary: dict[str, dict[str, int]] = {}
+    for name in names:
+        model = SOURCE_INFO_MODELS[name]
+        summary[name] = {
+            "rewritten": _rewrite_model(model, config, batch_size),
+            "pruned": _prune_orphan_payloads(model, config, batch_size),
+        }
+    logger.info("钉钉原始数据存储重写完成 config=%s result=%s", config.id if config else "*", summary)
+    return summary
+
+
+__all__ = [
+    "SOURCE_INFO_MODELS",
+    "SourceInfoPolicy",
+    "encode_source_info",
+    "get_source_policy",
+    "rewrite_source_info",
+    "store_external_payloads",
+]
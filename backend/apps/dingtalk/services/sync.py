@@ -1,13 +1,30 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
-from typing import Any, Dict, Iterable, List
-
-from django.db import transaction
+from functools import partial
+from itertools import chain
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Model
 from django.utils import timezone
 
-from ..constants import SyncOperation, SyncStatus
+from ..constants import (
+    ATTENDANCE_USERS_PER_REQUEST,
+    DEFAULT_ATTENDANCE_OVERLAP_MINUTES,
+    DEFAULT_ATTENDANCE_USER_GROUP,
+    DEFAULT_FULL_SYNC_QUEUE_SIZE,
+    SyncOperation,
+    SyncStatus,
+)
 from ..models import (
     DingTalkAttendanceRecord,
     DingTalkConfig,
@@ -19,27 +36,54 @@ from ..models import (
 )
 from ..serializers import DingTalkAttendancePreviewSerializer
 from ..signals import post_sync, pre_sync, sync_failed
-from .client import DingTalkClient
+from .async_client import BlockingAsyncClient
+from .bulk import BulkUpsertResult, bulk_upsert, get_bulk_batch_size, new_sync_run, write_slot
+from .client import DingTalkClient, UserMerger, _chunk_iterable
 from .exceptions import DingTalkAPIError, DingTalkConfigurationError, DingTalkDisabledError
-from .mappers import map_attendance, map_department, map_dimission, map_user
+from .mappers import map_attendance_batch, map_department, map_dimission, map_user, merge_roster_info
+from .source_storage import encode_source_info, store_external_payloads
+from .tombstone import LIVE_STAMP
 
 logger = logging.getLogger(__name__)
 
 
+def _get_option(name: str, default: Any) -> Any:
+    return getattr(settings, "DINGTALK", {}).get(name, default)
+
+
 class SyncService:
     """钉钉同步业务逻辑"""
 
-    def __init__(self, config: DingTalkConfig | None = None) -> None:
+    def __init__(
+        self,
+        config: DingTalkConfig | None = None,
+        *,
+        progress_callback: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> None:
         self.config = config or DingTalkConfig.load()
-        self._client: DingTalkClient | None = None
+        self._client: DingTalkClient | BlockingAsyncClient | None = None
+        self.progress_callback = progress_callback
 
     # --------------------------- 工具方法 --------------------------- #
     @property
-    def client(self) -> DingTalkClient:
+    def client(self) -> DingTalkClient | BlockingAsyncClient:
         if self._client is None:
-            self._client = DingTalkClient(self.config)
+            if str(_get_option("CLIENT", "sync")).lower() == "async":
+                self._client = BlockingAsyncClient(self.config)
+            else:
+                self._client = DingTalkClient(self.config)
         return self._client
 
+    def _report_progress(self, stage: str, **values: Any) -> None:
+        """向调用方（如后台任务 worker）汇报执行进度，进度回调异常不影响同步本身."""
+
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(stage, values)
+        except Exception:  # noqa: BLE001
+            logger.debug("钉钉同步进度回调失败 config=%s stage=%s", self.config.id, stage, exc_info=True)
+
     def ensure_enabled(self) -> None:
         if not self.config.enabled:
             raise DingTalkDisabledError("钉钉集成未启用，请先开启")
@@ -111,6 +155,19 @@ class SyncService:
         self._update_sync_state(status=SyncStatus.FAILED, message=message, stats=stats)
         sync_failed.send(sender=self.__class__, config=self.config, operation=operation.value, log=log, exception=exc)
 
+    def _delete_stale(self, model: type[Model], sync_run: int) -> int:
+        """删除本次同步未涉及的记录：批次号早于本次的行即为远端已不存在的数据（走 config+sync_run 索引）."""
+
+        _, per_model = model.objects.filter(config=self.config, sync_run__lt=sync_run).delete()
+        return per_model.get(model._meta.label, 0)
+
+    def _tombstone_stale(self, model: type[Model], sync_run: int) -> int:
+        """将本次同步未涉及的记录标记为软删除，不触发级联删除；真正的删除由 purge_tombstones 在后台分批执行."""
+
+        return model.objects.filter(config=self.config, sync_run__lt=sync_run).update(
+            is_deleted=True, deleted_at=timezone.now()
+        )
+
     # --------------------------- 对外接口 --------------------------- #
     def test_connection(self, *, force_refresh: bool = True) -> dict:
         pre_sync.send(sender=self.__class__, config=self.config, operation=SyncOperation.TEST_CONNECTION.value)
@@ -135,47 +192,49 @@ class SyncService:
             self._handle_failure(SyncOperation.TEST_CONNECTION, exc)
             raise
 
+    def _complete_sync(
+        self,
+        operation: SyncOperation,
+        model: type[Model],
+        result: BulkUpsertResult,
+        sync_run: int,
+        *,
+        synced_at: datetime,
+        mode: str,
+    ) -> dict:
+        """部门/用户写库完成后的收尾：软删除过期记录、记录日志、更新同步状态并发送 post_sync 信号."""
+
+        is_department = model is DingTalkDepartment
+        synced_count = len(result.keys)
+        stale_count = self._tombstone_stale(model, sync_run)
+        count_key, label = ("dept_count", "部门") if is_department else ("user_count", "用户")
+        stats = {count_key: synced_count, "stale_count": stale_count, "mode": mode, **result.as_stats()}
+        message = f"同步{label}完成 ({synced_count} 个)"
+        self._record_log(operation, SyncStatus.SUCCESS, message=message, stats=stats)
+        self._update_sync_state(
+            status=SyncStatus.SUCCESS,
+            message=message,
+            stats=stats,
+            dept_sync_time=synced_at if is_department else None,
+            user_sync_time=None if is_department else synced_at,
+        )
+        post_sync.send(sender=self.__class__, config=self.config, operation=operation.value, stats=stats)
+        return {"count": synced_count, "staleCount": stale_count}
+
     def sync_departments(self, *, mode: str = "full") -> dict:
         self.ensure_enabled()
         pre_sync.send(sender=self.__class__, config=self.config, operation=SyncOperation.SYNC_DEPARTMENTS.value)
         try:
             departments = self.client.list_departments()
-            synced_ids: set[int] = set()
+            self._report_progress("departments", fetched=len(departments))
             now = timezone.now()
+            rows = [map_department(self.config.id, dept) for dept in departments if dept.get("dept_id") is not None]
+            sync_run = new_sync_run()
             with transaction.atomic():
-                for dept in departments:
-                    dept_id = dept.get("dept_id")
-                    if dept_id is None:
-                        continue
-                    defaults = map_department(self.config.id, dept)
-                    DingTalkDepartment.objects.update_or_create(dept_id=dept_id, defaults=defaults)
-                    synced_ids.add(dept_id)
-            stale_queryset = DingTalkDepartment.objects.filter(config=self.config).exclude(dept_id__in=synced_ids)
-            stale_count = stale_queryset.count()
-            if stale_count:
-                stale_queryset.delete()
-
-            stats = {"dept_count": len(synced_ids), "stale_count": stale_count, "mode": mode}
-            message = f"同步部门完成 ({len(synced_ids)} 个)"
-            self._record_log(
-                SyncOperation.SYNC_DEPARTMENTS,
-                SyncStatus.SUCCESS,
-                message=message,
-                stats=stats,
-            )
-            self._update_sync_state(
-                status=SyncStatus.SUCCESS,
-                message=message,
-                stats=stats,
-                dept_sync_time=now,
-            )
-            post_sync.send(
-                sender=self.__class__,
-                config=self.config,
-                operation=SyncOperation.SYNC_DEPARTMENTS.value,
-                stats=stats,
-            )
-            return {"count": len(synced_ids), "staleCount": stale_count}
+                result = bulk_upsert(
+                    DingTalkDepartment, rows, key="dept_id", hash_field="content_hash", stamp={"sync_run": sync_run, **LIVE_STAMP}
+                )
+            return self._complete_sync(SyncOperation.SYNC_DEPARTMENTS, DingTalkDepartment, result, sync_run, synced_at=now, mode=mode)
         except Exception as exc:  # noqa: BLE001
             self._handle_failure(SyncOperation.SYNC_DEPARTMENTS, exc)
             raise
@@ -192,52 +251,53 @@ class SyncService:
         try:
             dept_ids = self._get_dept_ids_for_user_sync()
             users = self.client.list_all_users(dept_ids)
-            synced_ids: set[str] = set()
+            self._report_progress("users", fetched=len(users))
             now = timezone.now()
+            rows = [map_user(self.config.id, user) for user in users if user.get("userid")]
+            sync_run = new_sync_run()
             with transaction.atomic():
-                for user in users:
-                    userid = user.get("userid")
-                    if not userid:
-                        continue
-                    defaults = map_user(self.config.id, user)
-                    DingTalkUser.objects.update_or_create(userid=userid, defaults=defaults)
-                    synced_ids.add(userid)
-            stale_queryset = DingTalkUser.objects.filter(config=self.config).exclude(userid__in=synced_ids)
-            stale_count = stale_queryset.count()
-            if stale_count:
-                stale_queryset.delete()
-
-            stats = {"user_count": len(synced_ids), "stale_count": stale_count, "mode": mode}
-            message = f"同步用户完成 ({len(synced_ids)} 个)"
-            self._record_log(
-                SyncOperation.SYNC_USERS,
-                SyncStatus.SUCCESS,
-                message=message,
-                stats=stats,
-            )
-            self._update_sync_state(
-                status=SyncStatus.SUCCESS,
-                message=message,
-                stats=stats,
-                user_sync_time=now,
-            )
-            post_sync.send(
-                sender=self.__class__,
-                config=self.config,
-                operation=SyncOperation.SYNC_USERS.value,
-                stats=stats,
-            )
-            return {"count": len(synced_ids), "staleCount": stale_count}
+                result = bulk_upsert(DingTalkUser, rows, key="userid", hash_field="content_hash", stamp={"sync_run": sync_run, **LIVE_STAMP})
+            return self._complete_sync(SyncOperation.SYNC_USERS, DingTalkUser, result, sync_run, synced_at=now, mode=mode)
         except Exception as exc:  # noqa: BLE001
             self._handle_failure(SyncOperation.SYNC_USERS, exc)
             raise
 
+    def _fetch_dimission_enrichment(
+        self, userids: list[str]
+    ) -> tuple[list[Dict[str, Any]], dict[str, dict[str, Any]], list[Dict[str, Any]], str | None]:
+        """并发拉取离职信息、花名册与离职记录；三个接口各自使用独立的限流桶，互不等待."""
+
+        if not userids:
+            return [], {}, [], None
+        roster_fields = self.config.get_dimission_roster_fields()
+
+        def _run(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="dingtalk-dimission") as executor:
+            details_future = executor.submit(_run, self.client.list_dimission_infos, userids)
+            roster_future = executor.submit(_run, self.client.list_roster_infos, userids, field_codes=roster_fields)
+            records_future = executor.submit(_run, self.client.list_dimission_records)
+            details = details_future.result()
+            roster_map = roster_future.result()
+            try:
+                records, error = records_future.result(), None
+            except DingTalkAPIError as exc:
+                # 离职记录只用于补充离职时间与原因，缺少权限时不影响其余数据
+                records, error = [], str(exc)
+                logger.warning("获取离职人员离职记录失败 config=%s error=%s", self.config.id, error)
+        return details, roster_map, records, error
+
     def sync_dimission_users(self, *, mode: str = "full") -> dict:
         self.ensure_enabled()
         pre_sync.send(sender=self.__class__, config=self.config, operation=SyncOperation.SYNC_DIMISSION_USERS.value)
         try:
             userids = self.client.list_dimission_userids()
-            details = self.client.list_dimission_infos(userids)
+            details, roster_map, records, dimission_record_error = self._fetch_dimission_enrichment(userids)
+            self._report_progress("dimission_users", fetched=len(details))
             detail_map = {}
             for item in details:
                 if not isinstance(item, dict):
@@ -245,108 +305,21 @@ class SyncService:
                 userid = str(item.get("userid") or item.get("userId") or "")
                 if userid:
                     detail_map[userid] = item
-            roster_fields = self.config.get_dimission_roster_fields()
-            roster_map = self.client.list_roster_infos(userids, field_codes=roster_fields)
-            for userid, roster_fields in roster_map.items():
-                if not isinstance(roster_fields, dict):
-                    continue
-                info = detail_map.setdefault(userid, {"userid": userid})
-                employee_info = {}
-                base_employee_info = info.get("employeeInfo") or info.get("employee_info")
-                if isinstance(base_employee_info, dict):
-                    employee_info.update(base_employee_info)
-
-                def _extract(code: str, *, prefer_label: bool = False) -> Any:
-                    entry = roster_fields.get(code)
-                    if not isinstance(entry, dict):
-                        return entry
-                    value = entry.get("value")
-                    label = entry.get("label")
-                    if prefer_label and label not in (None, ""):
-                        return label
-                    return value if value not in (None, "") else label
-
-                def _extract_list(code: str) -> list[Any]:
-                    entry = roster_fields.get(code)
-                    if isinstance(entry, dict):
-                        values = entry.get("values")
-                        if isinstance(values, list):
-                            return [v for v in values if v not in (None, "")]
-                    return []
-
-                def _setdefault(target: dict[str, Any], key: str, value: Any) -> None:
-                    if value in (None, "", [], {}):
-                        return
-                    current = target.get(key)
-                    if current in (None, "", [], {}):
-                        target[key] = value
-
-                name_value = _extract("sys00-name", prefer_label=True)
-                mobile_value = _extract("sys00-mobile")
-                job_number_value = _extract("sys00-jobNumber") or _extract("sys00-employeeId")
-                email_value = _extract("sys00-email") or _extract("sys00-orgEmail")
-                position_value = _extract("sys00-position")
-                main_dept_entry = roster_fields.get("sys00-mainDept")
-                main_dept_id: Any = None
-                main_dept_name: Any = None
-                if isinstance(main_dept_entry, dict):
-                    main_dept_id = main_dept_entry.get("value")
-                    main_dept_name = main_dept_entry.get("label") or main_dept_entry.get("value")
-                if main_dept_id in (None, ""):
-                    main_dept_id = _extract("sys00-mainDeptId")
-
-                dept_list_values = _extract_list("sys00-dept")
-
-                for key, value in (
-                    ("name", name_value),
-                    ("mobile", mobile_value),
-                    ("jobNumber", job_number_value),
-                    ("job_number", job_number_value),
-                    ("email", email_value),
-                    ("title", position_value),
-                    ("mainDeptId", main_dept_id),
-                    ("main_dept_id", main_dept_id),
-                    ("mainDeptName", main_dept_name),
-                    ("main_dept_name", main_dept_name),
-                ):
-                    _setdefault(employee_info, key, value)
-                    _setdefault(info, key, value)
-
-                if dept_list_values:
-                    existing_dept_ids = info.get("dept_ids") or info.get("deptIdList") or []
-                    if not isinstance(existing_dept_ids, list):
-                        existing_dept_ids = [existing_dept_ids]
-                    combined = set()
-                    for candidate in list(existing_dept_ids) + dept_list_values:
-                        if candidate in (None, ""):
-                            continue
-                        combined.add(str(candidate))
-                    if combined:
-                        info["dept_ids"] = sorted(combined)
-                if employee_info:
-                    info["employeeInfo"] = employee_info
+            for userid, roster in roster_map.items():
+                if isinstance(roster, dict):
+                    merge_roster_info(detail_map.setdefault(userid, {"userid": userid}), roster)
             record_map: dict[str, dict[str, Any]] = {}
-            dimission_record_error: str | None = None
-            if userids:
-                try:
-                    records = self.client.list_dimission_records()
-                except DingTalkAPIError as exc:
-                    dimission_record_error = str(exc)
-                    logger.warning(
-                        "获取离职人员离职记录失败 config=%s error=%s",
-                        self.config.id,
-                        dimission_record_error,
-                    )
-                    records = []
-                for record in records:
-                    if not isinstance(record, dict):
-                        continue
-                    userid = str(record.get("userId") or record.get("userid") or "")
-                    if userid and userid not in record_map:
-                        record_map[userid] = record
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                userid = str(record.get("userId") or record.get("userid") or "")
+                if userid and userid not in record_map:
+                    record_map[userid] = record
             synced_ids: set[str] = set()
+            externals: list[tuple[str, str, dict[str, Any]]] = []
             now = timezone.now()
-            with transaction.atomic():
+            sync_run = new_sync_run()
+            with write_slot(), transaction.atomic():
                 for userid in userids:
                     if not userid:
                         continue
@@ -355,16 +328,18 @@ class SyncService:
                     defaults = map_dimission(self.config.id, info, leave_record)
                     defaults.setdefault("userid", userid)
                     defaults.pop("config_id", None)
+                    defaults["sync_run"] = sync_run
+                    defaults, external = encode_source_info(DingTalkDimissionUser, defaults)
+                    if external is not None:
+                        externals.append((self.config.id, userid, external))
                     DingTalkDimissionUser.objects.update_or_create(
                         config=self.config,
                         userid=userid,
                         defaults=defaults,
                     )
                     synced_ids.add(userid)
-            stale_queryset = DingTalkDimissionUser.objects.filter(config=self.config).exclude(userid__in=synced_ids)
-            stale_count = stale_queryset.count()
-            if stale_count:
-                stale_queryset.delete()
+                store_external_payloads(DingTalkDimissionUser, externals)
+            stale_count = self._delete_stale(DingTalkDimissionUser, sync_run)
 
             stats = {"dimission_count": len(synced_ids), "stale_count": stale_count, "mode": mode}
             if dimission_record_error:
@@ -393,15 +368,93 @@ class SyncService:
             self._handle_failure(SyncOperation.SYNC_DIMISSION_USERS, exc)
             raise
 
-    def sync_attendance(
+    def store_attendance_pages(
         self,
+        pages: Iterable[list[dict]],
+        progress: dict[str, int],
+        *,
+        checkpoint: Callable[[], None] | None = None,
+    ) -> None:
+        """按批映射并写入考勤记录，每批独立提交.
+
+        内存占用与时间窗口大小无关，失败时已提交的批次得以保留；checkpoint 与批次写入在同一事务中执行。
+        """
+
+        for chunk in _chunk_iterable(chain.from_iterable(pages), get_bulk_batch_size()):
+            rows = map_attendance_batch(self.config.id, chunk)
+            with transaction.atomic():
+                result = bulk_upsert(DingTalkAttendanceRecord, rows, key="record_id", hash_field="content_hash")
+                if checkpoint is not None:
+                    checkpoint()
+            progress["attendance_count"] = progress.get("attendance_count", 0) + len(result.keys)
+            progress["chunks"] = progress.get("chunks", 0) + 1
+            for name, value in result.as_stats().items():
+                progress[name] = progress.get(name, 0) + value
+            self._report_progress("attendance", **progress)
+
+    def _iter_attendance_group(
+        self,
+        userids: list[str],
+        group_start: int,
+        group_end: int,
         start_time: datetime,
         end_time: datetime,
+        position: dict[str, int],
+    ) -> Iterator[list[dict]]:
+        """按单次请求的用户数逐批拉取一组用户的考勤，position 记录之前的用户批均已读出的位置."""
+
+        for batch_start in range(group_start, group_end, ATTENDANCE_USERS_PER_REQUEST):
+            position["user_offset"] = batch_start
+            batch = userids[batch_start : min(batch_start + ATTENDANCE_USERS_PER_REQUEST, group_end)]
+            yield from self.client.iter_attendance_records(batch, start_time=start_time, end_time=end_time)
+        position["user_offset"] = group_end
+
+    def _attendance_window(
+        self,
+        cursor: SyncCursor,
+        start_time: datetime | None,
+        end_time: datetime | None,
+        fingerprint: str,
+    ) -> tuple[datetime, datetime, int]:
+        """计算增量同步窗口：优先续跑未完成的窗口，否则从水位线回退重叠时间开始."""
+
+        pending = (cursor.extra or {}).get("pending")
+        if pending and pending.get("fingerprint") == fingerprint:
+            return (
+                datetime.fromisoformat(pending["start"]),
+                datetime.fromisoformat(pending["end"]),
+                int(pending.get("user_offset", 0)),
+            )
+        end = end_time or timezone.now()
+        if cursor.value:
+            overlap = timezone.timedelta(minutes=_get_option("ATTENDANCE_OVERLAP_MINUTES", DEFAULT_ATTENDANCE_OVERLAP_MINUTES))
+            start = datetime.fromisoformat(cursor.value) - overlap
+        else:
+            window_days = (self.config.schedule or {}).get("attendance_window", 1)
+            start = start_time or end - timezone.timedelta(days=window_days)
+        return min(start, end), end, 0
+
+    def sync_attendance(
+        self,
+        start_time: datetime | None,
+        end_time: datetime | None,
         *,
         mode: str = "full",
         user_ids: Iterable[str] | None = None,
     ) -> dict:
-        if start_time > end_time:
+        """同步考勤记录.
+
+        ``mode="incremental"`` 时根据考勤游标从上次提交的水位线（减去重叠时间，以覆盖补卡/迟到上报）
+        同步到 end_time（默认当前时间），每个写入批次与游标检查点在同一事务提交，中断后从最近提交的
+        检查点续跑：只重拉提交时尚未完整读出的那一批用户（ATTENDANCE_USERS_PER_REQUEST 个），
+        水位线在整个窗口完成后推进。
+        指定 user_ids 的手动同步不读写游标。
+        """
+
+        incremental = mode == "incremental" and user_ids is None
+        if not incremental and (start_time is None or end_time is None):
+            raise DingTalkAPIError("请提供考勤同步的开始与结束时间")
+        if start_time and end_time and start_time > end_time:
             raise DingTalkAPIError("开始时间不能晚于结束时间")
 
         explicit_userids: list[str] | None = None
@@ -413,37 +466,58 @@ class SyncService:
             self.ensure_enabled()
 
         pre_sync.send(sender=self.__class__, config=self.config, operation=SyncOperation.SYNC_ATTENDANCE.value)
+        progress = {"attendance_count": 0, "chunks": 0, "created": 0, "updated": 0, "unchanged": 0}
         try:
             if explicit_userids is not None:
                 userids = explicit_userids
             else:
                 userids = list(
-                    DingTalkUser.objects.filter(config=self.config).values_list("userid", flat=True)
+                    DingTalkUser.objects.filter(config=self.config).order_by("userid").values_list("userid", flat=True)
                 )
                 if not userids:
                     self.sync_users()
                     userids = list(
-                        DingTalkUser.objects.filter(config=self.config).values_list("userid", flat=True)
+                        DingTalkUser.objects.filter(config=self.config).order_by("userid").values_list("userid", flat=True)
                     )
             if not userids:
                 return {"count": 0}
-            records = self.client.list_attendance_records(userids, start_time=start_time, end_time=end_time)
-            synced_ids: set[str] = set()
-            with transaction.atomic():
-                for record in records:
-                    defaults = map_attendance(self.config.id, record)
-                    record_id = defaults.get("record_id")
-                    if not record_id:
-                        continue
-                    DingTalkAttendanceRecord.objects.update_or_create(record_id=record_id, defaults=defaults)
-                    synced_ids.add(record_id)
+
+            cursor: SyncCursor | None = None
+            user_offset = 0
+            if incremental:
+                cursor = self.get_cursor("attendance")
+                fingerprint = hashlib.sha256("\n".join(userids).encode()).hexdigest()
+                start_time, end_time, user_offset = self._attendance_window(cursor, start_time, end_time, fingerprint)
+                window = {"start": start_time.isoformat(), "end": end_time.isoformat(), "fingerprint": fingerprint}
+
+            # 按用户分组拉取，组内逐批写入并提交（见 store_attendance_pages）
+            group_size = max(1, int(_get_option("ATTENDANCE_USER_GROUP", DEFAULT_ATTENDANCE_USER_GROUP)))
+            for group_start in range(user_offset, len(userids), group_size):
+                group_end = min(group_start + group_size, len(userids))
+                position = {"user_offset": group_start}
+                pages = self._iter_attendance_group(userids, group_start, group_end, start_time, end_time, position)
+                checkpoint = None
+                if cursor is not None:
+                    # 续跑位置取提交时已完整读出的用户批，写入批次提交后中断只需重拉当前这一批用户
+                    checkpoint = partial(self._checkpoint_cursor, cursor, pending=window, position=position)
+                self.store_attendance_pages(pages, progress, checkpoint=checkpoint)
+                if cursor is not None:
+                    if group_end < len(userids):
+                        self._checkpoint_cursor(cursor, pending={**window, "user_offset": group_end})
+                    else:
+                        # 整个窗口完成后才推进水位线
+                        self._checkpoint_cursor(cursor, value=end_time.isoformat())
+
+            synced_count = progress["attendance_count"]
             stats = {
-                "attendance_count": len(synced_ids),
                 "mode": mode,
                 "userIds": userids,
                 "manual": explicit_userids is not None,
+                **progress,
             }
-            message = f"同步考勤完成 ({len(synced_ids)} 条)"
+            if incremental:
+                stats["window"] = {"start": start_time.isoformat(), "end": end_time.isoformat(), "resumedFrom": user_offset}
+            message = f"同步考勤完成 ({synced_count} 条)"
             self._record_log(
                 SyncOperation.SYNC_ATTENDANCE,
                 SyncStatus.SUCCESS,
@@ -462,9 +536,9 @@ class SyncService:
                 operation=SyncOperation.SYNC_ATTENDANCE.value,
                 stats=stats,
             )
-            return {"count": len(synced_ids)}
+            return {"count": synced_count}
         except Exception as exc:  # noqa: BLE001
-            self._handle_failure(SyncOperation.SYNC_ATTENDANCE, exc)
+            self._handle_failure(SyncOperation.SYNC_ATTENDANCE, exc, stats=dict(progress))
             raise
 
     def preview_attendance(
@@ -499,16 +573,180 @@ class SyncService:
         records = self.client.list_attendance_records(userids, start_time=start_time, end_time=end_time)
         if limit is not None and limit > 0:
             records = records[:limit]
-        mapped_records = [map_attendance(self.config.id, record) for record in records]
+        mapped_records = map_attendance_batch(self.config.id, records)
         serializer = DingTalkAttendancePreviewSerializer(mapped_records, many=True)
         return serializer.data
 
+    def _pipeline_enabled(self) -> bool:
+        # 异步客户端没有逐批产出的接口，退回顺序执行
+        return bool(_get_option("FULL_SYNC_PIPELINE", True)) and all(
+            hasattr(self.client, name) for name in ("iter_department_levels", "iter_user_batches")
+        )
+
+    def _fetch_for_pipeline(self, access_token: str, out: queue.Queue, stop: threading.Event, timings: dict[str, float]) -> None:
+        """拉取线程：只请求钉钉接口，不访问数据库；部门和用户按批放入有界队列，每个流以 None 结束."""
+
+        def _put(item: tuple[str, Any]) -> bool:
+            # 写库线程失败退出后不再阻塞在满队列上
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            started = monotonic()
+            dept_ids: list[int] = []
+            with closing(self.client.iter_department_levels(access_token=access_token)) as levels:
+                for level in levels:
+                    dept_ids.extend(dept["dept_id"] for dept in level if dept.get("dept_id") is not None)
+                    if not _put(("departments", level)):
+                        return
+            timings["fetch_departments"] = round(monotonic() - started, 3)
+            if not _put(("departments", None)):
+                return
+
+            started = monotonic()
+            user_dept_ids = list(dict.fromkeys(dept_ids or [1]))
+            with closing(self.client.iter_user_batches(user_dept_ids, access_token=access_token)) as batches:
+                # iter_user_batches 按传入的部门顺序逐个产出，附带部门 ID 供写库线程判断用户的部门是否已拉取完
+                for dept_id, batch in zip(user_dept_ids, batches):
+                    if not _put(("users", (dept_id, batch))):
+                        return
+            timings["fetch_users"] = round(monotonic() - started, 3)
+            _put(("users", None))
+        except Exception as exc:  # noqa: BLE001 - 交给写库线程抛出
+            _put(("error", exc))
+
+    def _pipelined_sync(self, timings: dict[str, float]) -> tuple[dict, dict]:
+        """拉取与写库重叠执行：后台线程拉取部门和用户，当前线程边收边写库.
+
+        部门在用户拉取期间完成写库；用户按部门批次合并，所属部门全部拉取完后写入一次，
+        跨部门的用户不会因部门列表逐步补全而重复写入、刷新 update_time。
+        只有流完整结束后才软删除过期记录，拉取失败不会误删数据。
+        """
+
+        self.ensure_enabled()
+        # 令牌获取可能读写数据库，在当前线程完成后再交给拉取线程
+        access_token = self.client.get_access_token()
+        try:
+            queue_size = max(1, int(_get_option("FULL_SYNC_QUEUE_SIZE", DEFAULT_FULL_SYNC_QUEUE_SIZE)))
+        except (TypeError, ValueError):
+            queue_size = DEFAULT_FULL_SYNC_QUEUE_SIZE
+        channel: queue.Queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        fetcher = threading.Thread(
+            target=self._fetch_for_pipeline,
+            args=(access_token, channel, stop, timings),
+            name=f"dingtalk-fetch-{self.config.id}",
+            daemon=True,
+        )
+
+        streams = {
+            "departments": (SyncOperation.SYNC_DEPARTMENTS, DingTalkDepartment, "dept_id"),
+            "users": (SyncOperation.SYNC_USERS, DingTalkUser, "userid"),
+        }
+        results = {name: BulkUpsertResult() for name in streams}
+        sync_runs = {name: new_sync_run() for name in streams}
+        fetched = dict.fromkeys(streams, 0)
+        outcome: dict[str, dict] = {}
+        merger = UserMerger()
+        operation = SyncOperation.SYNC_DEPARTMENTS
+        for name in streams:
+            pre_sync.send(sender=self.__class__, config=self.config, operation=streams[name][0].value)
+
+        # 用户所属的部门（dept_id_list）尚未全部拉取完时，后续批次还可能补充部门，暂存到最后一个部门拉取后再写入
+        held: dict[str, dict[str, Any]] = {}
+        waiting: dict[int, set[str]] = {}
+        fetched_depts: set[int] = set()
+
+        def _write(kind: str, rows: list[dict[str, Any]]) -> None:
+            _, model, key = streams[kind]
+            total = results[kind]
+            # 正常情况下每条记录只写入一次；钉钉返回的部门列表不完整时已写入的用户才会再次写入，
+            # 再次写入的新增/更新计入统计，未变化的不重复计数
+            fresh = [row for row in rows if row[key] not in total.keys]
+            rewritten = [row for row in rows if row[key] in total.keys]
+            stamp = {"sync_run": sync_runs[kind], **LIVE_STAMP}
+            started = monotonic()
+            with transaction.atomic():
+                result = bulk_upsert(model, fresh, key=key, hash_field="content_hash", stamp=stamp)
+                repeat = bulk_upsert(model, rewritten, key=key, hash_field="content_hash", stamp=stamp)
+            timings[f"write_{kind}"] = round(timings.get(f"write_{kind}", 0.0) + monotonic() - started, 3)
+            total.created += result.created + repeat.created
+            total.updated += result.updated + repeat.updated
+            total.unchanged += result.unchanged
+            total.keys |= result.keys
+
+        fetcher.start()
+        try:
+            while len(outcome) < len(streams):
+                kind, payload = channel.get()
+                if kind == "error":
+                    raise payload
+                operation, model, key = streams[kind]
+                if payload is None:
+                    if kind == "users" and held:
+                        # 部门不在本次拉取范围内的用户在流结束时写入
+                        _write(kind, [map_user(self.config.id, user) for user in held.values()])
+                        held.clear()
+                    self._report_progress(kind, fetched=fetched[kind])
+                    outcome[kind] = self._complete_sync(
+                        operation, model, results[kind], sync_runs[kind], synced_at=timezone.now(), mode="full"
+                    )
+                    continue
+
+                if kind == "departments":
+                    fetched[kind] += len(payload)
+                    rows = [map_department(self.config.id, dept) for dept in payload if dept.get("dept_id") is not None]
+                else:
+                    dept_id, batch = payload
+                    fetched_depts.add(dept_id)
+                    candidates = {userid: held[userid] for userid in waiting.pop(dept_id, ()) if userid in held}
+                    candidates.update((user["userid"], user) for user in merger.add(batch))
+                    fetched[kind] = len(merger.users)
+                    rows = []
+                    for userid, user in candidates.items():
+                        pending = set(user.get("dept_id_list") or ()) - fetched_depts
+                        if pending:
+                            held[userid] = user
+                            for pending_id in pending:
+                                waiting.setdefault(pending_id, set()).add(userid)
+                        else:
+                            held.pop(userid, None)
+                            rows.append(map_user(self.config.id, user))
+                if rows:
+                    _write(kind, rows)
+        except Exception as exc:  # noqa: BLE001
+            self._handle_failure(operation, exc)
+            raise
+        finally:
+            stop.set()
+            fetcher.join()
+        return outcome["departments"], outcome["users"]
+
     def full_sync(self) -> dict:
         pre_sync.send(sender=self.__class__, config=self.config, operation=SyncOperation.FULL_SYNC.value)
+        started = monotonic()
+        timings: dict[str, float] = {}
         try:
-            dept_result = self.sync_departments()
-            user_result = self.sync_users()
-            stats = {"dept_count": dept_result.get("count", 0), "user_count": user_result.get("count", 0)}
+            pipeline = self._pipeline_enabled()
+            if pipeline:
+                dept_result, user_result = self._pipelined_sync(timings)
+            else:
+                dept_result = self.sync_departments()
+                timings["departments"] = round(monotonic() - started, 3)
+                user_result = self.sync_users()
+                timings["users"] = round(monotonic() - started - timings["departments"], 3)
+            timings["total"] = round(monotonic() - started, 3)
+            stats = {
+                "dept_count": dept_result.get("count", 0),
+                "user_count": user_result.get("count", 0),
+                "pipeline": pipeline,
+                "timings": timings,
+            }
             message = f"全量同步完成，部门 {stats['dept_count']} 个，用户 {stats['user_count']} 个"
             self._record_log(
                 SyncOperation.FULL_SYNC,
@@ -525,7 +763,8 @@ class SyncService:
             )
             return stats
         except Exception as exc:  # noqa: BLE001
-            self._handle_failure(SyncOperation.FULL_SYNC, exc)
+            timings["total"] = round(monotonic() - started, 3)
+            self._handle_failure(SyncOperation.FULL_SYNC, exc, stats={"timings": timings})
             raise
 
     # --------------------------- 游标管理 --------------------------- #
@@ -540,5 +779,20 @@ class SyncService:
             cursor.extra = extra
         cursor.save(update_fields=["value", "extra", "update_time"])
 
+    @staticmethod
+    def _checkpoint_cursor(
+        cursor: SyncCursor, *, value: str | None = None, pending: dict | None = None, position: dict | None = None
+    ) -> None:
+        """记录未完成窗口的续跑位置（position 在提交时读取）；传入 value 表示窗口完成，推进水位线并清除续跑信息."""
+
+        extra = dict(cursor.extra or {})
+        if value is not None:
+            cursor.value = value
+            extra.pop("pending", None)
+        else:
+            extra["pending"] = {**(pending or {}), **(position or {})}
+        cursor.extra = extra
+        cursor.save(update_fields=["value", "extra", "update_time"])
+
 
 __all__ = ["SyncService"]
@@ -8,7 +8,11 @@ from datetime import datetime
 from django.utils import timezone
 
 from ..models import DingTalkConfig
+from .attendance_archive import archive_attendance, ensure_attendance_partitions
+from .events import process_events
+from .orchestrator import sync_all_configs
 from .sync import SyncService
+from .tombstone import purge_tombstones
 
 logger = logging.getLogger(__name__)
 
@@ -34,11 +38,18 @@ def sync_dimission_users_task(config_id: str, *, mode: str = "full") -> dict:
     return result
 
 
-def sync_attendance_task(config_id: str, *, start: datetime | None = None, end: datetime | None = None) -> dict:
+def sync_attendance_task(
+    config_id: str,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    mode: str = "full",
+) -> dict:
     service = SyncService(DingTalkConfig.load(config_id))
-    end = end or timezone.now()
-    start = start or (end - timezone.timedelta(days=1))
-    result = service.sync_attendance(start, end)
+    if mode != "incremental":
+        end = end or timezone.now()
+        start = start or (end - timezone.timedelta(days=1))
+    result = service.sync_attendance(start, end, mode=mode)
     logger.info("钉钉考勤同步完成 config=%s start=%s end=%s result=%s", config_id, start, end, result)
     return result
 
@@ -48,3 +59,32 @@ def full_sync_task(config_id: str) -> dict:
     result = service.full_sync()
     logger.info("钉钉全量同步完成 config=%s result=%s", config_id, result)
     return result
+
+
+def purge_tombstones_task(config_id: str | None = None, *, days: int | None = None) -> dict:
+    config = DingTalkConfig.load(config_id) if config_id else None
+    older_than = timezone.timedelta(days=days) if days is not None else None
+    result = purge_tombstones(config, older_than=older_than)
+    logger.info("钉钉墓碑清理任务完成 config=%s result=%s", config_id or "*", result)
+    return result
+
+
+def archive_attendance_task(config_id: str | None = None, *, months: int | None = None) -> dict:
+    config = DingTalkConfig.load(config_id) if config_id else None
+    result = archive_attendance(config, months=months)
+    result["partition_statements"] = len(ensure_attendance_partitions())
+    logger.info("钉钉考勤归档任务完成 config=%s result=%s", config_id or "*", result)
+    return result
+
+
+def process_events_task(config_id: str | None = None, *, limit: int | None = None) -> dict:
+    config = DingTalkConfig.load(config_id) if config_id else None
+    result = process_events(config, limit=limit)
+    logger.info("钉钉回调事件处理完成 config=%s result=%s", config_id or "*", result)
+    return result
+
+
+def sync_all_configs_task(*, max_workers: int | None = None) -> dict:
+    result = sync_all_configs(max_workers=max_workers)
+    logger.info("钉钉多配置同步任务完成 configs=%s failed=%s", result["configs"], result["failed"])
+    return result
@@ -0,0 +1,219 @@
+"""钉钉 access_token 多级缓存
+
+查找顺序：进程内 → Django cache → 数据库，均未命中时才调用 /gettoken。
+刷新过程采用单飞锁（进程内锁 + cache.add 分布式锁），同一时刻只有一个 worker 请求新令牌；
+令牌临近过期时在后台线程提前刷新，请求路径上不再出现令牌获取。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from ..constants import DEFAULT_TOKEN_LOCAL_TTL, DEFAULT_TOKEN_REFRESH_AHEAD
+from ..models import DingTalkConfig
+
+logger = logging.getLogger(__name__)
+
+# 与原实现一致：剩余有效期不足 2 分钟视为过期
+TOKEN_SAFETY_MARGIN = timedelta(minutes=2)
+_LOCK_TIMEOUT = 30
+_PEER_WAIT_INTERVAL = 0.2
+
+TokenFetcher = Callable[[], "tuple[str, int]"]
+
+
+@dataclass(slots=True)
+class CachedToken:
+    value: str
+    expires_at: datetime
+    checked_at: float = 0.0
+
+    def remaining(self) -> timedelta:
+        return self.expires_at - timezone.now()
+
+
+def _cache_key(config_id: str) -> str:
+    return f"dingtalk:access_token:{config_id}"
+
+
+def _lock_key(config_id: str) -> str:
+    return f"dingtalk:access_token:{config_id}:lock"
+
+
+class AccessTokenProvider:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local: dict[str, CachedToken] = {}
+        self._refresh_locks: dict[str, threading.Lock] = {}
+        self._background: set[str] = set()
+
+    # --------------------------- 配置 --------------------------- #
+    @staticmethod
+    def _options() -> dict:
+        return getattr(settings, "DINGTALK", {})
+
+    @property
+    def refresh_ahead(self) -> timedelta:
+        return timedelta(seconds=float(self._options().get("TOKEN_REFRESH_AHEAD", DEFAULT_TOKEN_REFRESH_AHEAD)))
+
+    @property
+    def local_ttl(self) -> float:
+        return float(self._options().get("TOKEN_LOCAL_TTL", DEFAULT_TOKEN_LOCAL_TTL))
+
+    # --------------------------- 对外接口 --------------------------- #
+    def get(self, config: DingTalkConfig, fetch: TokenFetcher, *, force_refresh: bool = False) -> str:
+        if not force_refresh:
+            token = self._lookup(config, min_valid=TOKEN_SAFETY_MARGIN)
+            if token is not None:
+                if token.remaining() <= TOKEN_SAFETY_MARGIN + self.refresh_ahead:
+                    self._schedule_refresh(config, fetch)
+                return token.value
+        return self._refresh(config, fetch, min_valid=None if force_refresh else TOKEN_SAFETY_MARGIN)
+
+    def invalidate(self, config_id: str) -> None:
+        with self._lock:
+            self._local.pop(config_id, None)
+        cache.delete(_cache_key(config_id))
+
+    def reset(self) -> None:
+        """清空进程内缓存（测试或配置批量变更时使用）."""
+
+        with self._lock:
+            self._local.clear()
+            self._background.clear()
+
+    # --------------------------- 多级查找 --------------------------- #
+    def _lookup(self, config: DingTalkConfig, *, min_valid: timedelta, use_local: bool = True) -> CachedToken | None:
+        if use_local:
+            local = self._local.get(config.id)
+            if local is not None and monotonic() - local.checked_at < self.local_ttl and local.remaining() > min_valid:
+                return local
+
+        cached = cache.get(_cache_key(config.id))
+        if isinstance(cached, dict) and cached.get("token") and cached.get("expires_at"):
+            token = CachedToken(cached["token"], cached["expires_at"])
+            if token.remaining() > min_valid:
+                self._remember(config, token)
+                return token
+
+        token = self._read_db(config)
+        if token is not None and token.remaining() > min_valid:
+            self._remember(config, token, write_cache=True)
+            return token
+        return None
+
+    def _remember(self, config: DingTalkConfig, token: CachedToken, *, write_cache: bool = False) -> None:
+        token.checked_at = monotonic()
+        with self._lock:
+            self._local[config.id] = token
+        config.access_token = token.value
+        config.access_token_expires_at = token.expires_at
+        if write_cache:
+            timeout = max(1, int(token.remaining().total_seconds()))
+            cache.set(_cache_key(config.id), {"token": token.value, "expires_at": token.expires_at}, timeout=timeout)
+
+    def _read_db(self, config: DingTalkConfig) -> CachedToken | None:
+        row = DingTalkConfig.objects.filter(pk=config.pk).values_list("access_token", "access_token_expires_at").first()
+        if not row or not row[0] or not row[1]:
+            return None
+        return CachedToken(row[0], row[1])
+
+    def _write_db(self, config: DingTalkConfig, token: CachedToken) -> None:
+        DingTalkConfig.objects.filter(pk=config.pk).update(
+            access_token=token.value,
+            access_token_expires_at=token.expires_at,
+            update_time=timezone.now(),
+        )
+
+    # --------------------------- 单飞刷新 --------------------------- #
+    def _refresh_lock(self, config_id: str) -> threading.Lock:
+        with self._lock:
+            return self._refresh_locks.setdefault(config_id, threading.Lock())
+
+    def _refresh(self, config: DingTalkConfig, fetch: TokenFetcher, *, min_valid: timedelta | None) -> str:
+        with self._refresh_lock(config.id):
+            if min_valid is not None:
+                # 等锁期间可能已被其他线程刷新
+                token = self._lookup(config, min_valid=min_valid, use_local=False)
+                if token is not None:
+                    return token.value
+
+            acquired = cache.add(_lock_key(config.id), "1", timeout=_LOCK_TIMEOUT)
+            if not acquired:
+                token = self._wait_for_peer(config, min_valid=min_valid or TOKEN_SAFETY_MARGIN)
+                if token is not None:
+                    return token.value
+                logger.warning("等待其他进程刷新钉钉令牌超时，改为自行刷新 config=%s", config.id)
+            try:
+                value, expires_in = fetch()
+                expires_at = timezone.now() + timedelta(seconds=max(expires_in - 60, 60))
+                token = CachedToken(value, expires_at)
+                self._write_db(config, token)
+                self._remember(config, token, write_cache=True)
+                return value
+            finally:
+                if acquired:
+                    cache.delete(_lock_key(config.id))
+
+    def _wait_for_peer(self, config: DingTalkConfig, *, min_valid: timedelta) -> CachedToken | None:
+        deadline = monotonic() + _LOCK_TIMEOUT
+        while monotonic() < deadline:
+            sleep(_PEER_WAIT_INTERVAL)
+            token = self._lookup(config, min_valid=min_valid, use_local=False)
+            if token is not None:
+                return token
+            if cache.get(_lock_key(config.id)) is None:
+                break
+        return None
+
+    # --------------------------- 后台预刷新 --------------------------- #
+    def _schedule_refresh(self, config: DingTalkConfig, fetch: TokenFetcher) -> None:
+        if not self._options().get("TOKEN_BACKGROUND_REFRESH", True):
+            return
+        with self._lock:
+            if config.id in self._background:
+                return
+            self._background.add(config.id)
+
+        def _run() -> None:
+            try:
+                self._refresh(config, fetch, min_valid=TOKEN_SAFETY_MARGIN + self.refresh_ahead)
+            except Exception:  # noqa: BLE001 - 后台刷新失败时由请求路径兜底
+                logger.exception("后台刷新钉钉令牌失败 config=%s", config.id)
+            finally:
+                with self._lock:
+                    self._background.discard(config.id)
+                connection.close()
+
+        self._start_background(_run)
+
+    def _start_background(self, target: Callable[[], None]) -> None:
+        threading.Thread(target=target, name="dingtalk-token-refresh", daemon=True).start()
+
+
+_provider = AccessTokenProvider()
+
+
+def get_token_provider() -> AccessTokenProvider:
+    return _provider
+
+
+def invalidate_access_token(config_id: str) -> None:
+    _provider.invalidate(config_id)
+
+
+def reset_token_cache() -> None:
+    _provider.reset()
+
+
+__all__ = ["AccessTokenProvider", "CachedToken", "get_token_provider", "invalidate_access_token", "reset_token_cache"]
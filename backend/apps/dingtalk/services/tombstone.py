@@ -0,0 +1,73 @@
+"""钉钉部门/用户的软删除（墓碑）维护
+
+同步时远端缺失的部门和用户只打上 is_deleted 标记，不在同步事务内触发级联删除；
+接口偶发漏返回的记录在下次同步时会被恢复，HR 侧的关联也不会被清空。
+超过保留期的墓碑由 purge_tombstones 在后台按主键分批物理删除，
+每批单独提交，避免长事务与大范围锁。
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+from django.utils import timezone
+
+from ..constants import DEFAULT_TOMBSTONE_RETENTION_DAYS
+from ..models import DingTalkConfig, DingTalkDepartment, DingTalkUser
+from .bulk import get_bulk_batch_size
+
+logger = logging.getLogger(__name__)
+
+# 同步写入时附加的字段：重新出现在接口返回中的记录自动恢复
+LIVE_STAMP: dict[str, object] = {"is_deleted": False, "deleted_at": None}
+
+TOMBSTONE_MODELS: tuple[type[Model], ...] = (DingTalkUser, DingTalkDepartment)
+
+
+def get_retention_days() -> int:
+    value = getattr(settings, "DINGTALK", {}).get("TOMBSTONE_RETENTION_DAYS", DEFAULT_TOMBSTONE_RETENTION_DAYS)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_TOMBSTONE_RETENTION_DAYS
+
+
+def _purge_model(model: type[Model], config: DingTalkConfig | None, cutoff, batch_size: int) -> int:
+    queryset = model.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+    if config is not None:
+        queryset = queryset.filter(config=config)
+    purged = 0
+    while True:
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            # 级联删除（绑定关系等）只涉及当前批次
+            _, per_model = model.all_objects.filter(pk__in=pks, is_deleted=True).delete()
+        purged += per_model.get(model._meta.label, 0)
+        if len(pks) < batch_size:
+            break
+    return purged
+
+
+def purge_tombstones(
+    config: DingTalkConfig | None = None,
+    *,
+    older_than: timedelta | None = None,
+    batch_size: int | None = None,
+) -> dict[str, int]:
+    """物理删除超过保留期的墓碑记录，返回各模型删除的数量；不指定 config 时处理全部配置."""
+
+    retention = older_than if older_than is not None else timedelta(days=get_retention_days())
+    cutoff = timezone.now() - retention
+    batch_size = max(1, batch_size or get_bulk_batch_size())
+    result = {model._meta.model_name: _purge_model(model, config, cutoff, batch_size) for model in TOMBSTONE_MODELS}
+    logger.info("钉钉墓碑清理完成 config=%s cutoff=%s result=%s", config.id if config else "*", cutoff.isoformat(), result)
+    return result
+
+
+__all__ = ["LIVE_STAMP", "TOMBSTONE_MODELS", "get_retention_days", "purge_tombstones"]
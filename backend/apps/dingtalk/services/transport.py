@@ -0,0 +1,203 @@
+"""钉钉 HTTP 传输层
+
+按配置维护进程级共享的会话，复用 keep-alive 连接，避免每个 DingTalkClient 重新握手。
+默认使用 requests + 可调连接池；安装 httpx[http2] 后可通过 ``DINGTALK["TRANSPORT"] = "httpx"`` 启用 HTTP/2。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..constants import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .exceptions import DingTalkConfigurationError
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """httpx 的 HTTP/2 依赖 h2 包（httpx[http2]），未安装时回退到 HTTP/1.1."""
+
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpxSession:
+    """以 requests.Session 的调用方式包装 httpx.Client，安装 h2 时使用 HTTP/2.
+
+    网络异常被转换为 requests 对应的异常类型，客户端的重试逻辑无需区分传输实现。
+    """
+
+    def __init__(self, *, pool_maxsize: int, connect_retries: int, proxies: dict | None = None) -> None:
+        try:
+            import httpx
+        except ImportError as exc:  # pragma: no cover - 取决于部署环境
+            raise DingTalkConfigurationError("启用 httpx 传输需要安装 httpx[http2]") from exc
+
+        self._httpx = httpx
+        proxy = None
+        if proxies:
+            proxy = proxies.get("https") or proxies.get("http")
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        self.http2 = _http2_available()
+        if not self.http2:
+            logger.warning("未安装 h2，httpx 传输回退到 HTTP/1.1，如需 HTTP/2 请安装 httpx[http2]")
+        self.client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=self.http2, retries=connect_retries, proxy=proxy, limits=limits),
+        )
+        self.proxies: dict[str, Any] = dict(proxies or {})
+        self.request_count = 0
+
+    def request(self, method: str, url: str, *, params=None, json=None, headers=None, timeout=None):
+        self.request_count += 1
+        try:
+            return self.client.request(method, url, params=params, json=json, headers=headers, timeout=timeout)
+        except self._httpx.TimeoutException as exc:
+            raise requests.Timeout(str(exc)) from exc
+        except self._httpx.TransportError as exc:
+            raise requests.ConnectionError(str(exc)) from exc
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class AsyncHttpxSession:
+    """httpx.AsyncClient 的异步会话包装，异常转换规则与 HttpxSession 一致."""
+
+    def __init__(self, *, pool_maxsize: int, connect_retries: int, proxies: dict | None = None) -> None:
+        try:
+            import httpx
+        except ImportError as exc:  # pragma: no cover - 取决于部署环境
+            raise DingTalkConfigurationError("异步钉钉客户端需要安装 httpx") from exc
+
+        self._httpx = httpx
+        proxy = None
+        if proxies:
+            proxy = proxies.get("https") or proxies.get("http")
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        self.http2 = _http2_available()
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=self.http2, retries=connect_retries, proxy=proxy, limits=limits),
+        )
+        self.request_count = 0
+
+    async def request(self, method: str, url: str, *, params=None, json=None, headers=None, timeout=None):
+        self.request_count += 1
+        try:
+            return await self.client.request(method, url, params=params, json=json, headers=headers, timeout=timeout)
+        except self._httpx.TimeoutException as exc:
+            raise requests.Timeout(str(exc)) from exc
+        except self._httpx.TransportError as exc:
+            raise requests.ConnectionError(str(exc)) from exc
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _options() -> dict[str, Any]:
+    return getattr(settings, "DINGTALK", {})
+
+
+def build_session() -> requests.Session | HttpxSession:
+    options = _options()
+    pool_connections = int(options.get("POOL_CONNECTIONS", DEFAULT_POOL_CONNECTIONS))
+    pool_maxsize = int(options.get("POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE))
+    # 仅重试建立连接阶段的失败，读超时/5xx 由客户端的重试策略统一处理，避免重复提交 POST
+    connect_retries = int(options.get("POOL_CONNECT_RETRIES", 1))
+    proxies = options.get("PROXY")
+
+    if str(options.get("TRANSPORT", "requests")).lower() == "httpx":
+        return HttpxSession(pool_maxsize=pool_maxsize, connect_retries=connect_retries, proxies=proxies)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=connect_retries, connect=connect_retries, read=0, status=0, other=0, redirect=0, raise_on_status=False),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if proxies:
+        session.proxies.update(proxies)
+    return session
+
+
+def build_async_session() -> AsyncHttpxSession:
+    """创建异步会话；httpx.AsyncClient 绑定事件循环，因此不做进程级共享."""
+
+    options = _options()
+    return AsyncHttpxSession(
+        pool_maxsize=int(options.get("POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE)),
+        connect_retries=int(options.get("POOL_CONNECT_RETRIES", 1)),
+        proxies=options.get("PROXY"),
+    )
+
+
+_sessions: dict[str, requests.Session | HttpxSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(config_id: str) -> requests.Session | HttpxSession:
+    """获取指定配置共享的会话（进程内单例）"""
+
+    session = _sessions.get(config_id)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(config_id)
+        if session is None:
+            session = build_session()
+            _sessions[config_id] = session
+    return session
+
+
+def reset_sessions() -> None:
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def get_connection_stats(session: Any) -> dict[str, int]:
+    """统计会话已建立的连接数与请求数，两者之差即为复用 keep-alive 连接的次数."""
+
+    if isinstance(session, (HttpxSession, AsyncHttpxSession)):
+        return {"requests": session.request_count}
+    if not isinstance(session, requests.Session):
+        return {}
+    opened = 0
+    sent = 0
+    seen: set[int] = set()
+    for adapter in session.adapters.values():
+        manager = getattr(adapter, "poolmanager", None)
+        if manager is None or id(manager) in seen:
+            continue
+        seen.add(id(manager))
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            sent += pool.num_requests
+    return {"connections_opened": opened, "requests": sent, "connections_reused": max(0, sent - opened)}
+
+
+__all__ = [
+    "HttpxSession",
+    "AsyncHttpxSession",
+    "build_session",
+    "build_async_session",
+    "get_session",
+    "reset_sessions",
+    "get_connection_stats",
+]
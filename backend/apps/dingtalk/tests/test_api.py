@@ -13,7 +13,9 @@ from apps.dingtalk.models import (
     DingTalkDepartment,
     DingTalkSyncLog,
     DingTalkUser,
+    SyncJob,
 )
+from apps.dingtalk.services.jobs import run_pending_jobs
 
 
 class DingTalkAPITestCase(APITestCase):
@@ -169,10 +171,15 @@ class DingTalkAPITestCase(APITestCase):
             "end": "2025-09-01T23:59:59",
         }
         response = self.client.post(url, payload, format="json")
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         payload = response.json()
         self.assertTrue(payload["success"])  # type: ignore[index]
-        self.assertEqual(payload["data"]["count"], 5)  # type: ignore[index]
+        mock_sync_attendance.assert_not_called()
+
+        run_pending_jobs()
+        job = self.client.get(reverse("dingtalk-jobs-detail", args=[payload["data"]["jobId"]])).json()["data"]
+        self.assertEqual(job["status"], "success")
+        self.assertEqual(job["result"]["count"], 5)
         mock_sync_attendance.assert_called_once()
 
     @patch("apps.dingtalk.services.sync.SyncService.preview_attendance")
@@ -224,7 +231,9 @@ class DingTalkAPITestCase(APITestCase):
                 },
                 format="json",
             )
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+            run_pending_jobs()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(SyncJob.objects.get().status, "success")
         self.assertEqual(DingTalkAttendanceRecord.objects.count(), 0)
 
     def test_user_list_returns_department_names(self):
@@ -288,11 +297,11 @@ class DingTalkAPITestCase(APITestCase):
         self.assertEqual(record.get("check_type_label"), "上班打卡")
         self.assertEqual(record.get("time_result_label"), "迟到")
 
-    @patch("apps.dingtalk.services.client.DingTalkClient.list_attendance_records")
+    @patch("apps.dingtalk.services.client.DingTalkClient.iter_attendance_records")
     @patch("apps.dingtalk.services.client.DingTalkClient.get_access_token")
     def test_partial_attendance_sync_allowed_when_disabled(self, mock_get_token, mock_list_records):
         mock_get_token.return_value = "token"
-        mock_list_records.return_value = [
+        mock_list_records.return_value = [[
             {
                 "record_id": "rec-1",
                 "userid": "user-a",
@@ -302,7 +311,7 @@ class DingTalkAPITestCase(APITestCase):
                 "work_date": "2025-09-01",
                 "source_type": "test",
             }
-        ]
+        ]]
 
         config = DingTalkConfig.load()
         config.enabled = False
@@ -321,9 +330,10 @@ class DingTalkAPITestCase(APITestCase):
             },
             format="json",
         )
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        payload = response.json()
-        self.assertTrue(payload["success"])  # type: ignore[index]
-        self.assertEqual(payload["data"]["count"], 1)  # type: ignore[index]
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.json()["success"])  # type: ignore[index]
+
+        run_pending_jobs()
+        self.assertEqual(SyncJob.objects.get().result, {"count": 1})
         self.assertEqual(DingTalkAttendanceRecord.objects.count(), 1)
         mock_list_records.assert_called_once()
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.dingtalk.models import DingTalkConfig, DingTalkUser
+from apps.dingtalk.services.async_client import AsyncDingTalkClient, BlockingAsyncClient
+from apps.dingtalk.services.retry import RetryPolicy, reset_circuit_breakers
+from apps.dingtalk.services.sync import SyncService
+
+
+def _fake_response(status_code=200, payload=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = {}
+    response.json.return_value = payload if payload is not None else {}
+    response.text = ""
+    return response
+
+
+class _FakeAsyncSession:
+    """记录在途请求数的异步会话，handler 根据请求返回响应."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self.handler(method, url, kwargs)
+        finally:
+            self.in_flight -= 1
+
+    async def close(self):
+        pass
+
+
+@patch("apps.dingtalk.services.client.DingTalkClient.get_access_token", return_value="token")
+class AsyncDingTalkClientTests(TestCase):
+    def setUp(self):
+        reset_circuit_breakers()
+        self.config = DingTalkConfig.load()
+        self.config.enabled = True
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.save()
+
+    def _run(self, session, method, *args, max_concurrency=4, **kwargs):
+        async def _main():
+            client = AsyncDingTalkClient(
+                self.config,
+                session=session,
+                max_concurrency=max_concurrency,
+                retry_policy=RetryPolicy(max_retries=2, backoff_base=0, backoff_max=0),
+            )
+            async with client:
+                return await getattr(client, method)(*args, **kwargs)
+
+        return async_to_sync(_main)()
+
+    def test_attendance_batches_run_concurrently_within_bound(self, _mock_token):
+        def handler(method, url, kwargs):
+            batch = kwargs["json"]["userIdList"]
+            return _fake_response(payload={"errcode": 0, "result": {"recordresult": [{"userId": batch[0]}]}})
+
+        session = _FakeAsyncSession(handler)
+        users = [f"u{i}" for i in range(200)]
+        start = timezone.make_aware(datetime(2025, 9, 1))
+        end = timezone.make_aware(datetime(2025, 9, 1, 23, 59, 59))
+
+        records = self._run(session, "list_attendance_records", users, start_time=start, end_time=end, max_concurrency=2)
+
+        self.assertEqual([record["userId"] for record in records], ["u0", "u50", "u100", "u150"])
+        self.assertEqual(len(session.calls), 4)
+        self.assertEqual(session.max_in_flight, 2)
+
+    def test_list_all_users_merges_departments(self, _mock_token):
+        def handler(method, url, kwargs):
+            dept_id = kwargs["json"]["dept_id"]
+            users = [{"userid": "shared", "name": "张三", "dept_id_list": [dept_id]}, {"userid": f"only-{dept_id}"}]
+            return _fake_response(payload={"errcode": 0, "result": {"list": users}})
+
+        users = self._run(_FakeAsyncSession(handler), "list_all_users", [1, 2, 2])
+
+        self.assertEqual([user["userid"] for user in users], ["shared", "only-1", "only-2"])
+        self.assertEqual(users[0]["dept_id_list"], [1, 2])
+
+    def test_transient_errors_are_retried(self, _mock_token):
+        responses = iter(
+            [
+                _fake_response(status_code=503),
+                _fake_response(payload={"errcode": 90018, "errmsg": "请求频率过快"}),
+                _fake_response(payload={"errcode": 0, "result": {"dept_id": 1, "name": "总部"}}),
+            ]
+        )
+        session = _FakeAsyncSession(lambda *args: next(responses))
+
+        result = self._run(session, "get_department", 1)
+
+        self.assertEqual(result["name"], "总部")
+        self.assertEqual(len(session.calls), 3)
+
+
+class SyncServiceAsyncClientTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+
+    @override_settings(DINGTALK={"CLIENT": "async"})
+    @patch("apps.dingtalk.services.async_client.AsyncDingTalkClient.list_all_users")
+    @patch("apps.dingtalk.services.async_client.build_async_session")
+    def test_sync_service_opts_into_async_client(self, mock_build_session, mock_list_users):
+        mock_build_session.return_value = _FakeAsyncSession(lambda *args: _fake_response())
+
+        async def fake_list_all_users(dept_ids):
+            return [{"userid": "u1", "name": "张三"}]
+
+        mock_list_users.side_effect = fake_list_all_users
+        service = SyncService(self.config)
+
+        result = service.sync_users()
+
+        self.assertIsInstance(service.client, BlockingAsyncClient)
+        self.assertEqual(result["count"], 1)
+        self.assertTrue(DingTalkUser.objects.filter(userid="u1").exists())
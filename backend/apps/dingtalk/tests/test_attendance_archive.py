@@ -0,0 +1,159 @@
+from datetime import date, datetime
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.dingtalk.models import DingTalkAttendanceArchive, DingTalkAttendanceRecord, DingTalkConfig, DingTalkSourcePayload
+from apps.dingtalk.services.attendance_archive import (
+    archive_attendance,
+    archive_cutoff,
+    ensure_attendance_partitions,
+    fetch_attendance_records,
+    partition_bounds,
+    partition_definitions,
+)
+from apps.dingtalk.services.bulk import bulk_upsert
+from apps.dingtalk.services.mappers import map_attendance
+
+NOW = timezone.make_aware(datetime(2026, 3, 15, 12, 0))
+
+
+def _aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+def _create_records(config, times, userid="u1"):
+    rows = []
+    for index, check_time in enumerate(times):
+        payload = {
+            "record_id": f"{userid}-{index}",
+            "userid": userid,
+            "checkType": "OnDuty",
+            "timeResult": "Normal",
+            "userCheckTime": int(check_time.timestamp() * 1000),
+            "workDate": timezone.localdate(check_time).isoformat(),
+        }
+        rows.append(map_attendance(config.id, payload))
+    bulk_upsert(DingTalkAttendanceRecord, rows, key="record_id", hash_field="content_hash")
+
+
+class ArchiveAttendanceTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.times = [_aware(2025, 1, 10, 9), _aware(2025, 2, 27, 18), _aware(2026, 2, 3, 9), _aware(2026, 3, 2, 9)]
+        _create_records(self.config, self.times)
+
+    def test_cutoff_is_start_of_local_month(self):
+        self.assertEqual(archive_cutoff(12, now=NOW), _aware(2025, 3, 1))
+        self.assertEqual(archive_cutoff(0, now=NOW), _aware(2026, 3, 1))
+
+    def test_moves_old_records_and_keeps_payloads(self):
+        expected = {record.record_id: record.get_source_info() for record in DingTalkAttendanceRecord.objects.all()}
+        create_time = DingTalkAttendanceRecord.objects.get(record_id="u1-0").create_time
+
+        result = archive_attendance(months=12, batch_size=1, now=NOW)
+
+        self.assertEqual(result["archived"], 2)
+        self.assertEqual(sorted(DingTalkAttendanceRecord.objects.values_list("record_id", flat=True)), ["u1-2", "u1-3"])
+        archived = {record.record_id: record for record in DingTalkAttendanceArchive.objects.all()}
+        self.assertEqual(sorted(archived), ["u1-0", "u1-1"])
+        self.assertEqual(archived["u1-0"].source_storage, "compressed")
+        self.assertEqual(archived["u1-0"].get_source_info(), expected["u1-0"])
+        self.assertEqual(archived["u1-0"].create_time, create_time)
+        self.assertEqual(archive_attendance(months=12, now=NOW)["archived"], 0)
+
+    def test_external_payloads_are_folded_into_archive(self):
+        DingTalkAttendanceRecord.objects.all().delete()
+        with override_settings(DINGTALK={"SOURCE_INFO_POLICY": {"attendance": "external"}}):
+            _create_records(self.config, self.times)
+        payload = DingTalkAttendanceRecord.objects.get(record_id="u1-0").get_source_info()
+
+        archive_attendance(months=12, now=NOW)
+
+        self.assertEqual(DingTalkSourcePayload.objects.count(), 2)
+        self.assertEqual(DingTalkAttendanceArchive.objects.get(record_id="u1-0").get_source_info(), payload)
+
+    def test_fetch_records_reads_through_archive(self):
+        archive_attendance(months=12, now=NOW)
+
+        recent = fetch_attendance_records("u1", date(2026, 2, 1), date(2026, 3, 31), config_id=self.config.id)
+        spanning = fetch_attendance_records("u1", date(2025, 1, 1), date(2026, 12, 31), config_id=self.config.id)
+
+        self.assertEqual([record.record_id for record in recent], ["u1-2", "u1-3"])
+        self.assertEqual([record.record_id for record in spanning], ["u1-0", "u1-1", "u1-2", "u1-3"])
+        self.assertEqual([record.user_check_time for record in spanning], self.times)
+
+
+class AttendancePartitionTests(TestCase):
+    def test_partition_definitions_cover_each_month(self):
+        bounds = partition_bounds(date(2025, 11, 20), date(2026, 1, 1))
+
+        self.assertEqual([name for name, _ in bounds], ["p202511", "p202512", "p202601"])
+        self.assertEqual(bounds[-1][1], date(2026, 2, 1))
+        self.assertTrue(partition_definitions(bounds).endswith("PARTITION pmax VALUES LESS THAN MAXVALUE"))
+
+    def test_partitioning_is_skipped_unless_enabled_on_mysql(self):
+        self.assertEqual(ensure_attendance_partitions(), [])
+        with override_settings(DINGTALK={"ATTENDANCE_PARTITIONING": True}):
+            self.assertEqual(ensure_attendance_partitions(), [])
+
+    def test_convert_requires_mysql(self):
+        with self.assertRaisesMessage(CommandError, "仅支持 MySQL"):
+            call_command("partition_dingtalk_attendance", "--convert", stdout=StringIO())
+
+    @patch("apps.dingtalk.services.attendance_archive.attendance_table_partitioned", return_value=True)
+    def test_partitioned_upsert_replaces_record_with_changed_check_time(self, _partitioned):
+        config = DingTalkConfig.load()
+        _create_records(config, [_aware(2026, 3, 2, 9)])
+        create_time = DingTalkAttendanceRecord.objects.get(record_id="u1-0").create_time
+
+        with patch("apps.dingtalk.services.bulk._conflict_options") as conflict_options:
+            _create_records(config, [_aware(2026, 3, 2, 8, 55)])
+
+        conflict_options.assert_not_called()
+        record = DingTalkAttendanceRecord.objects.get(record_id="u1-0")
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 1)
+        self.assertEqual(record.user_check_time, _aware(2026, 3, 2, 8, 55))
+        self.assertEqual(record.create_time, create_time)
+
+
+class ArchivedAttendanceAPITests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="tester@example.com", username="tester", password="StrongPass!123", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.config = DingTalkConfig.load()
+        self.now = timezone.now()
+        _create_records(self.config, [self.now - timezone.timedelta(days=800), self.now - timezone.timedelta(days=1)])
+        call_command("archive_dingtalk_attendance", "--months", "12", stdout=StringIO())
+        self.url = reverse("dingtalk-attendances-list")
+
+    def _record_ids(self, query=""):
+        response = self.client.get(f"{self.url}?config_id={self.config.id}&page=1&size=20{query}")
+        self.assertEqual(response.status_code, 200)
+        return [item["record_id"] for item in response.json()["data"]], response.json()
+
+    def test_list_without_range_reads_hot_table_only(self):
+        record_ids, _ = self._record_ids()
+
+        self.assertEqual(record_ids, ["u1-1"])
+
+    def test_historical_range_includes_archived_records(self):
+        start = (self.now - timezone.timedelta(days=900)).isoformat()
+        record_ids, payload = self._record_ids(f"&start={start.replace('+', '%2B')}")
+
+        self.assertEqual(record_ids, ["u1-1", "u1-0"])
+        self.assertEqual(payload["data"][1]["source_info"]["record_id"], "u1-0")
+
+    def test_retrieve_falls_back_to_archive(self):
+        response = self.client.get(reverse("dingtalk-attendances-detail", args=["u1-0"]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["record_id"], "u1-0")
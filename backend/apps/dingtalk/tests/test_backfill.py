@@ -0,0 +1,94 @@
+from datetime import datetime
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.dingtalk.models import AttendanceBackfillShard, DingTalkAttendanceRecord, DingTalkConfig, DingTalkUser
+from apps.dingtalk.services.backfill import iter_date_shards, plan_backfill, run_backfill
+from apps.dingtalk.services.exceptions import DingTalkAPIError
+
+
+def _pages(userids, *, start_time, end_time):
+    return iter([[{"record_id": f"{uid}-{start_time:%m%d}", "userid": uid} for uid in userids]])
+
+
+class AttendanceBackfillTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+        for userid in ("u1", "u2", "u3"):
+            DingTalkUser.objects.create(userid=userid, config=self.config, name=userid)
+        self.start = timezone.make_aware(datetime(2025, 9, 1))
+        self.end = timezone.make_aware(datetime(2025, 9, 4))
+
+    def test_iter_date_shards_splits_range(self):
+        shards = list(iter_date_shards(self.start, self.end, "day"))
+
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(shards[0], (self.start, timezone.make_aware(datetime(2025, 9, 2))))
+        self.assertEqual(shards[-1][1], self.end)
+        self.assertEqual(list(iter_date_shards(self.start, self.end, "week")), [(self.start, self.end)])
+
+    def test_plan_creates_date_by_user_shards_once(self):
+        backfill_id = plan_backfill(self.config, self.start, self.end, user_batch_size=2)
+        self.assertEqual(plan_backfill(self.config, self.start, self.end, user_batch_size=2), backfill_id)
+
+        shards = AttendanceBackfillShard.objects.filter(backfill_id=backfill_id)
+        self.assertEqual(shards.count(), 6)
+        self.assertEqual(shards.first().userids, ["u1", "u2"])
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_interrupted_backfill_resumes_failed_shards(self, mock_iter_records):
+        failing_day = timezone.make_aware(datetime(2025, 9, 2))
+
+        def flaky(userids, *, start_time, end_time):
+            if start_time == failing_day:
+                raise DingTalkAPIError("网络中断")
+            return _pages(userids, start_time=start_time, end_time=end_time)
+
+        mock_iter_records.side_effect = flaky
+        backfill_id = plan_backfill(self.config, self.start, self.end, user_batch_size=2)
+
+        first = run_backfill(self.config, backfill_id, max_workers=1)
+
+        self.assertEqual(first["executed"], 4)
+        self.assertEqual(first["failed"], 2)
+        self.assertEqual(first["remaining"], 2)
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 6)
+
+        mock_iter_records.side_effect = _pages
+        mock_iter_records.reset_mock()
+        second = run_backfill(self.config, backfill_id, max_workers=1)
+
+        # 只重跑失败的分片
+        self.assertEqual(mock_iter_records.call_count, 2)
+        self.assertEqual(second["remaining"], 0)
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 9)
+        self.assertFalse(AttendanceBackfillShard.objects.exclude(status="success").exists())
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records", side_effect=_pages)
+    def test_management_command_runs_backfill(self, _mock_iter_records):
+        out = StringIO()
+        call_command(
+            "sync_dingtalk",
+            "sync_attendance",
+            "--backfill",
+            "--start",
+            "2025-09-01T00:00:00",
+            "--end",
+            "2025-09-04T00:00:00",
+            "--granularity",
+            "week",
+            "--workers",
+            "1",
+            stdout=out,
+        )
+
+        self.assertIn("同步完成", out.getvalue())
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 3)
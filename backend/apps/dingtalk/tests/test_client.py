@@ -1,12 +1,16 @@
+import sys
+import time
 from datetime import datetime
 
-from django.test import TestCase
+import requests
+from django.test import TestCase, override_settings
 from django.utils import timezone
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 from apps.dingtalk.models import DingTalkConfig
 from apps.dingtalk.services.client import DingTalkClient
-from apps.dingtalk.services.exceptions import DingTalkAPIError
+from apps.dingtalk.services.exceptions import DingTalkAPIError, DingTalkCircuitOpenError, DingTalkTransientError
+from apps.dingtalk.services.retry import RetryPolicy, get_circuit_breaker, reset_circuit_breakers
 
 
 class DingTalkClientAttendanceTests(TestCase):
@@ -42,6 +46,7 @@ class DingTalkClientAttendanceTests(TestCase):
                 "limit": 50,
             },
             access_token="token",
+            bucket="attendance",
         )
 
     @patch("apps.dingtalk.services.client.DingTalkClient._request")
@@ -207,3 +212,221 @@ class DingTalkClientDimissionTests(TestCase):
         self.assertEqual(result["u2"]["sys00-mobile"]["value"], "13800001234")
         self.assertEqual(mock_open_api.call_count, 1)
         self.assertEqual(mock_legacy.call_count, 1)
+
+
+class DingTalkClientDepartmentTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.enabled = True
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.save()
+
+    @staticmethod
+    def _fake_listsub(tree):
+        def _request(method, path, *, data=None, **kwargs):  # noqa: ARG001
+            children = tree.get(data["dept_id"], [])
+            return {"result": [{"dept_id": child, "parent_id": data["dept_id"]} for child in children]}
+
+        return _request
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_department")
+    @patch("apps.dingtalk.services.client.DingTalkClient._request")
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_access_token")
+    def test_list_departments_walks_tree_level_by_level(self, mock_get_token, mock_request, mock_get_department):
+        mock_get_token.return_value = "token"
+        mock_get_department.return_value = {"dept_id": 1, "name": "总部"}
+        mock_request.side_effect = self._fake_listsub({1: [2, 3], 2: [4], 3: [5, 2]})
+
+        client = DingTalkClient(self.config, max_workers=2)
+        result = client.list_departments()
+
+        self.assertEqual([item["dept_id"] for item in result], [1, 2, 3, 4, 5])
+        self.assertEqual([call.kwargs["bucket"] for call in mock_request.call_args_list], ["department"] * 5)
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_department")
+    @patch("apps.dingtalk.services.client.DingTalkClient._request")
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_access_token")
+    def test_list_departments_handles_trees_deeper_than_recursion_limit(self, mock_get_token, mock_request, mock_get_department):
+        depth = sys.getrecursionlimit() + 100
+        mock_get_token.return_value = "token"
+        mock_get_department.return_value = {"dept_id": 1}
+        mock_request.side_effect = self._fake_listsub({index: [index + 1] for index in range(1, depth)})
+
+        result = DingTalkClient(self.config).list_departments()
+
+        self.assertEqual(len(result), depth)
+
+
+class DingTalkClientUserTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.enabled = True
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.save()
+
+    @patch("apps.dingtalk.services.client.DingTalkClient._request")
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_access_token")
+    def test_list_all_users_merges_duplicates_across_departments(self, mock_get_token, mock_request):
+        pages = {
+            (1, 0): {"list": [{"userid": "u1", "name": "张三", "dept_id_list": [1]}], "next_cursor": 1},
+            (1, 1): {"list": [{"userid": "u2", "name": "李四", "dept_id_list": [1]}]},
+            (2, 0): {"list": [{"userid": "u1", "name": "", "title": "工程师", "dept_id_list": [2]}]},
+        }
+
+        def _request(method, path, *, data=None, **kwargs):  # noqa: ARG001
+            return {"result": pages[(data["dept_id"], data["cursor"])]}
+
+        mock_get_token.return_value = "token"
+        mock_request.side_effect = _request
+
+        users = DingTalkClient(self.config, max_workers=2).list_all_users([1, 2, 2])
+
+        by_id = {user["userid"]: user for user in users}
+        self.assertEqual(set(by_id), {"u1", "u2"})
+        self.assertEqual(by_id["u1"]["dept_id_list"], [1, 2])
+        self.assertEqual(by_id["u1"]["name"], "张三")
+        self.assertEqual(by_id["u1"]["title"], "工程师")
+        self.assertEqual([call.kwargs["bucket"] for call in mock_request.call_args_list], ["user"] * 3)
+        mock_get_token.assert_called_once()
+
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.list_users_by_dept")
+    def test_iter_user_batches_limits_departments_in_flight(self, mock_list_users):
+        started = []
+        mock_list_users.side_effect = lambda dept_id, access_token=None: started.append(dept_id) or [{"userid": f"u{dept_id}"}]
+
+        batches = DingTalkClient(self.config, max_workers=2).iter_user_batches(range(1, 21), access_token="token")
+        first = next(batches)
+        # 调用方暂不消费时，线程池只会执行已提交的部门
+        time.sleep(0.2)
+        submitted = len(started)
+        rest = list(batches)
+
+        self.assertEqual(first, [{"userid": "u1"}])
+        # 窗口为 max_workers * 2，取走第一个结果后再补充一个部门
+        self.assertLessEqual(submitted, 5)
+        self.assertEqual([batch[0]["userid"] for batch in rest], [f"u{index}" for index in range(2, 21)])
+
+
+def _fake_response(status_code=200, payload=None, headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = payload if payload is not None else {}
+    response.text = ""
+    return response
+
+
+@override_settings(DINGTALK={"DEFAULT_RETRIES": 3, "CIRCUIT_BREAKER_THRESHOLD": 2, "CIRCUIT_BREAKER_COOLDOWN": 60})
+class DingTalkClientRetryTests(TestCase):
+    def setUp(self):
+        reset_circuit_breakers()
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.save()
+        self.session = Mock()
+
+    def tearDown(self):
+        reset_circuit_breakers()
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_retries_throttle_errcode_and_server_errors(self, mock_sleep):
+        self.session.request.side_effect = [
+            _fake_response(payload={"errcode": 90018, "errmsg": "请求频率过快"}),
+            _fake_response(status_code=502),
+            requests.ConnectionError("reset"),
+            _fake_response(payload={"errcode": 0, "result": {"dept_id": 1}}),
+        ]
+        client = DingTalkClient(self.config, session=self.session)
+
+        result = client.get_department(1, access_token="token")
+
+        self.assertEqual(result, {"dept_id": 1})
+        self.assertEqual(self.session.request.call_count, 4)
+        self.assertEqual(mock_sleep.call_count, 3)
+        self.assertEqual(client.get_metrics()["retries"], 3)
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_honors_retry_after_header(self, mock_sleep):
+        self.session.request.side_effect = [
+            _fake_response(status_code=429, headers={"Retry-After": "7"}),
+            _fake_response(payload={"errcode": 0, "result": {}}),
+        ]
+        client = DingTalkClient(self.config, session=self.session)
+
+        client.get_department(1, access_token="token")
+
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_retry_after_is_capped_at_backoff_max(self, mock_sleep):
+        self.session.request.side_effect = [
+            _fake_response(status_code=429, headers={"Retry-After": "3600"}),
+            _fake_response(payload={"errcode": 0, "result": {}}),
+        ]
+        client = DingTalkClient(self.config, session=self.session, retry_policy=RetryPolicy(max_retries=1, backoff_max=5))
+
+        client.get_department(1, access_token="token")
+
+        mock_sleep.assert_called_once_with(5)
+
+    @patch("apps.dingtalk.services.client.sleep")
+    @patch("apps.dingtalk.services.client._respect_rate_limit")
+    def test_each_attempt_acquires_a_rate_limit_token(self, mock_rate_limit, mock_sleep):  # noqa: ARG002
+        self.session.request.side_effect = [
+            _fake_response(status_code=502),
+            _fake_response(payload={"errcode": 90018, "errmsg": "请求频率过快"}),
+            _fake_response(payload={"errcode": 0, "result": {"userid": "u1"}}),
+        ]
+        client = DingTalkClient(self.config, session=self.session)
+
+        client.get_user("u1", access_token="token")
+
+        self.assertEqual(self.session.request.call_count, 3)
+        self.assertEqual(mock_rate_limit.call_count, 3)
+        mock_rate_limit.assert_called_with("user", self.config.id, limit=15)
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_retries_stop_when_circuit_opens_between_attempts(self, mock_sleep):
+        client = DingTalkClient(self.config, session=self.session)
+        breaker = get_circuit_breaker(f"{self.config.id}:/topapi/v2/department/get")
+
+        def _open_circuit(_delay):
+            # 其他线程在本请求等待重试期间触发熔断
+            breaker.record_failure()
+            breaker.record_failure()
+
+        mock_sleep.side_effect = _open_circuit
+        self.session.request.return_value = _fake_response(status_code=503)
+
+        with self.assertRaises(DingTalkCircuitOpenError):
+            client.get_department(1, access_token="token")
+        self.assertEqual(self.session.request.call_count, 1)
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_business_errors_are_not_retried(self, mock_sleep):
+        self.session.request.return_value = _fake_response(payload={"errcode": 60011, "errmsg": "no permission"})
+        client = DingTalkClient(self.config, session=self.session)
+
+        with self.assertRaises(DingTalkAPIError):
+            client.get_department(1, access_token="token")
+
+        self.assertEqual(self.session.request.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch("apps.dingtalk.services.client.sleep")
+    def test_circuit_opens_after_consecutive_failures(self, mock_sleep):  # noqa: ARG002
+        self.session.request.return_value = _fake_response(status_code=503)
+        client = DingTalkClient(self.config, session=self.session)
+
+        for _ in range(2):
+            with self.assertRaises(DingTalkTransientError):
+                client.get_department(1, access_token="token")
+        calls = self.session.request.call_count
+
+        with self.assertRaises(DingTalkCircuitOpenError):
+            client.get_department(1, access_token="token")
+        self.assertEqual(self.session.request.call_count, calls)
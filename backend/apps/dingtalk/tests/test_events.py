@@ -0,0 +1,156 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.dingtalk.models import DingTalkAttendanceRecord, DingTalkConfig, DingTalkDepartment, DingTalkEvent, DingTalkUser
+from apps.dingtalk.services.callback import DingTalkCallbackCrypto
+from apps.dingtalk.services.events import enqueue_event, process_events
+from apps.dingtalk.services.exceptions import DingTalkAPIError, DingTalkCallbackError
+
+AES_KEY = "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFG"
+
+
+def _fake_token(self, force_refresh=False):  # noqa: ARG001 - 符合签名
+    return "token"
+
+
+class CallbackCryptoTests(TestCase):
+    def setUp(self):
+        self.crypto = DingTalkCallbackCrypto("callback-token", AES_KEY, ["app-key"])
+
+    def test_encrypt_then_decrypt_round_trip(self):
+        envelope = self.crypto.encrypt('{"EventType":"check_url"}', timestamp="1700000000000", nonce="n1")
+
+        plaintext = self.crypto.decrypt(envelope["msg_signature"], envelope["timeStamp"], envelope["nonce"], envelope["encrypt"])
+
+        self.assertEqual(json.loads(plaintext), {"EventType": "check_url"})
+
+    def test_rejects_bad_signature_and_foreign_receiver(self):
+        envelope = self.crypto.encrypt("{}", timestamp="1", nonce="n")
+        with self.assertRaises(DingTalkCallbackError):
+            self.crypto.decrypt("bad", envelope["timeStamp"], envelope["nonce"], envelope["encrypt"])
+
+        other = DingTalkCallbackCrypto("callback-token", AES_KEY, ["other-app"])
+        with self.assertRaises(DingTalkCallbackError):
+            other.decrypt(envelope["msg_signature"], envelope["timeStamp"], envelope["nonce"], envelope["encrypt"])
+
+
+class CallbackViewTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "app-key"
+        self.config.callback_token = "callback-token"
+        self.config.callback_aes_key = AES_KEY
+        self.config.save()
+        self.crypto = DingTalkCallbackCrypto.for_config(self.config)
+        self.client = APIClient()
+        self.url = reverse("dingtalk-callback", args=[self.config.id])
+
+    def _post(self, message: dict, *, signature: str | None = None):
+        envelope = self.crypto.encrypt(json.dumps(message), timestamp="1700000000000", nonce="abc")
+        query = f"?msg_signature={signature or envelope['msg_signature']}&timestamp=1700000000000&nonce=abc"
+        return self.client.post(self.url + query, {"encrypt": envelope["encrypt"]}, format="json")
+
+    def test_valid_callback_is_queued_once_and_answered_with_encrypted_success(self):
+        message = {"EventType": "user_add_org", "UserId": ["u1"], "TimeStamp": "1700000000000"}
+
+        response = self._post(message)
+        self._post(message)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        plaintext = self.crypto.decrypt(body["msg_signature"], body["timeStamp"], body["nonce"], body["encrypt"])
+        self.assertEqual(plaintext, "success")
+        self.assertEqual(DingTalkEvent.objects.count(), 1)
+        self.assertEqual(DingTalkEvent.objects.get().event_type, "user_add_org")
+
+    def test_invalid_signature_is_rejected(self):
+        response = self._post({"EventType": "user_add_org", "UserId": ["u1"]}, signature="forged")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(DingTalkEvent.objects.exists())
+
+    def test_unsupported_event_is_acknowledged_but_not_queued(self):
+        response = self._post({"EventType": "check_url"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(DingTalkEvent.objects.exists())
+
+
+@patch("apps.dingtalk.services.client.DingTalkClient.get_access_token", new=_fake_token)
+class EventWorkerTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "app-key"
+        self.config.app_secret = "secret"
+        self.config.enabled = True
+        self.config.save()
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_user")
+    def test_user_events_upsert_and_tombstone_single_users(self, mock_get_user):
+        DingTalkUser.objects.create(userid="leaver", config=self.config, name="离职者")
+        mock_get_user.return_value = {"userid": "u1", "name": "张三", "dept_id_list": [1]}
+        enqueue_event(self.config, {"EventType": "user_add_org", "UserId": ["u1"]})
+        enqueue_event(self.config, {"EventType": "user_leave_org", "UserId": ["leaver"]})
+
+        result = process_events(self.config)
+
+        self.assertEqual(result["processed"], 2)
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").dept_ids, [1])
+        self.assertTrue(DingTalkUser.all_objects.get(userid="leaver").is_deleted)
+        self.assertFalse(DingTalkEvent.objects.exclude(status="done").exists())
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_department")
+    def test_modified_department_missing_upstream_is_tombstoned(self, mock_get_department):
+        DingTalkDepartment.objects.create(dept_id=7, config=self.config, name="旧部门")
+        mock_get_department.side_effect = DingTalkAPIError("部门不存在", payload={"errcode": 60003})
+        enqueue_event(self.config, {"EventType": "org_dept_modify", "DeptId": [7]})
+
+        process_events(self.config)
+
+        self.assertTrue(DingTalkDepartment.all_objects.get(dept_id=7).is_deleted)
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.iter_attendance_records")
+    def test_attendance_event_fetches_narrow_window(self, mock_iter_records):
+        mock_iter_records.return_value = iter([[{"record_id": "r1", "userid": "u1", "user_check_time": 1700000000000}]])
+        enqueue_event(
+            self.config,
+            {"EventType": "attendance_check_record", "DataList": [{"userId": "u1", "checkTime": 1700000000000}]},
+        )
+
+        process_events(self.config)
+
+        _, kwargs = mock_iter_records.call_args
+        self.assertEqual(mock_iter_records.call_args[0][0], ["u1"])
+        self.assertEqual((kwargs["end_time"] - kwargs["start_time"]).total_seconds(), 120)
+        self.assertTrue(DingTalkAttendanceRecord.objects.filter(record_id="r1").exists())
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_user", side_effect=DingTalkAPIError("系统繁忙"))
+    def test_failed_event_is_retried_then_marked_failed(self, _mock_get_user):
+        event = enqueue_event(self.config, {"EventType": "user_modify_org", "UserId": ["u1"]})
+
+        with self.settings(DINGTALK={"EVENT_MAX_ATTEMPTS": 2}):
+            first = process_events(self.config)
+            event.refresh_from_db()
+            self.assertEqual((first["retried"], event.status, event.attempts), (1, "pending", 1))
+
+            DingTalkEvent.objects.filter(pk=event.pk).update(available_at=event.create_time)
+            second = process_events(self.config)
+            event.refresh_from_db()
+
+        self.assertEqual((second["failed"], event.status), (1, "failed"))
+
+    @patch("apps.dingtalk.services.client.DingTalkClient.get_user", return_value={"userid": "u1", "name": "张三"})
+    def test_management_command_drains_queue(self, _mock_get_user):
+        enqueue_event(self.config, {"EventType": "user_add_org", "UserId": ["u1"]})
+        out = StringIO()
+
+        call_command("process_dingtalk_events", stdout=out)
+
+        self.assertIn("处理完成", out.getvalue())
+        self.assertTrue(DingTalkUser.objects.filter(userid="u1").exists())
@@ -0,0 +1,152 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.dingtalk.models import DingTalkConfig, DingTalkUser, SyncJob
+from apps.dingtalk.services.jobs import (
+    JOB_LEASE,
+    _recover_stale_jobs,
+    claim_next_job,
+    enqueue_job,
+    run_job,
+    run_pending_jobs,
+)
+
+
+class SyncJobQueueTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "key"
+        self.config.app_secret = "secret"
+        self.config.enabled = True
+        self.config.save()
+
+    def test_identical_pending_jobs_are_deduplicated(self):
+        first, created = enqueue_job(self.config, "sync_users", {"mode": "full"})
+        second, created_again = enqueue_job(self.config, "sync_users", {"mode": "full"})
+        other, _ = enqueue_job(self.config, "sync_users", {"mode": "incremental"})
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+
+        SyncJob.objects.filter(pk=first.pk).update(status="success")
+        third, created_after_finish = enqueue_job(self.config, "sync_users", {"mode": "full"})
+        self.assertTrue(created_after_finish)
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_test_connection_is_not_queueable(self):
+        with self.assertRaises(ValueError):
+            enqueue_job(self.config, "test_connection")
+
+    def test_concurrency_limit_per_config(self):
+        other_config = DingTalkConfig.load("other")
+        enqueue_job(self.config, "sync_users")
+        enqueue_job(self.config, "sync_departments")
+        enqueue_job(other_config, "sync_users")
+
+        first = claim_next_job()
+        second = claim_next_job()
+
+        self.assertEqual(first.config_id, self.config.id)
+        # 同一配置已有执行中的任务，下一个领取的是另一个配置的任务
+        self.assertEqual(second.config_id, "other")
+        self.assertIsNone(claim_next_job())
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_all_users")
+    def test_run_job_records_result_and_progress(self, mock_list_users):
+        mock_list_users.return_value = [{"userid": "u1", "name": "张三"}, {"userid": "u2", "name": "李四"}]
+        enqueue_job(self.config, "sync_users")
+
+        summary = run_pending_jobs()
+
+        job = SyncJob.objects.get()
+        self.assertEqual(summary, {"success": 1, "failed": 0})
+        self.assertEqual(job.status, "success")
+        self.assertEqual(job.result["count"], 2)
+        self.assertEqual(job.progress["stage"], "users")
+        self.assertEqual(job.progress["users"], {"fetched": 2})
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(DingTalkUser.objects.count(), 2)
+
+    def test_failed_job_keeps_error(self):
+        enqueue_job(self.config, "sync_users")
+        self.config.enabled = False
+        self.config.save()
+
+        job = run_job(claim_next_job())
+
+        self.assertEqual(job.status, "failed")
+        self.assertIn("未启用", job.error)
+
+    def test_stale_running_job_is_requeued(self):
+        job, _ = enqueue_job(self.config, "sync_users")
+        SyncJob.objects.filter(pk=job.pk).update(status="running", attempts=1)
+        SyncJob.objects.filter(pk=job.pk).update(update_time=timezone.now() - JOB_LEASE - timedelta(minutes=1))
+
+        claimed = claim_next_job()
+
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_departments", return_value=[{"dept_id": 1, "name": "总部"}])
+    def test_management_command_drains_queue(self, _mock_list_departments):
+        enqueue_job(self.config, "sync_departments")
+        out = StringIO()
+
+        call_command("run_dingtalk_jobs", stdout=out)
+
+        self.assertIn("success", out.getvalue())
+        self.assertFalse(SyncJob.objects.exclude(status="success").exists())
+
+
+@patch("apps.dingtalk.services.jobs.JOB_HEARTBEAT_INTERVAL", timedelta(seconds=0.1))
+@patch("apps.dingtalk.services.jobs.JOB_LEASE", timedelta(seconds=0.5))
+class SyncJobLeaseTests(TransactionTestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "key"
+        self.config.app_secret = "secret"
+        self.config.enabled = True
+        self.config.save()
+
+    def test_long_stage_without_progress_keeps_lease(self):
+        enqueue_job(self.config, "sync_users")
+        job = claim_next_job()
+        competing = []
+
+        def _silent_sync(service, job):
+            # 超过租约时长没有任何进度回调，期间其他 worker 尝试领取
+            time.sleep(1.2)
+            competing.append(claim_next_job())
+            return {"count": 0}
+
+        with patch("apps.dingtalk.services.jobs._dispatch", side_effect=_silent_sync):
+            job = run_job(job)
+
+        self.assertEqual(competing, [None])
+        self.assertEqual(job.status, "success")
+        self.assertEqual(job.attempts, 1)
+
+    def test_expired_worker_cannot_overwrite_requeued_job(self):
+        enqueue_job(self.config, "sync_users")
+        job = claim_next_job()
+
+        def _stalled_sync(service, job):
+            SyncJob.objects.filter(pk=job.pk).update(update_time=timezone.now() - timedelta(minutes=1))
+            _recover_stale_jobs()
+            return {"count": 0}
+
+        with patch("apps.dingtalk.services.jobs.JOB_HEARTBEAT_INTERVAL", timedelta(seconds=10)), patch(
+            "apps.dingtalk.services.jobs._dispatch", side_effect=_stalled_sync
+        ):
+            job = run_job(job)
+
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.result, {})
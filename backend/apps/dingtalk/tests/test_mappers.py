@@ -1,9 +1,13 @@
+import json
+import random
 from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
 
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 from django.utils import timezone
 
-from apps.dingtalk.services.mappers import map_attendance, map_dimission
+from apps.dingtalk.services import mappers
+from apps.dingtalk.services.mappers import map_attendance, map_attendance_batch, map_dimission
 
 
 class MapAttendanceTests(SimpleTestCase):
@@ -37,6 +41,61 @@ class MapAttendanceTests(SimpleTestCase):
         self.assertEqual(result["user_check_time"], expected)
 
 
+class MapAttendanceBatchTests(SimpleTestCase):
+    fixed_now = datetime(2025, 10, 1, tzinfo=dt_timezone.utc)
+
+    def _assert_identical(self, payloads):
+        with patch("apps.dingtalk.services.mappers.timezone.now", return_value=self.fixed_now):
+            expected = [map_attendance("default", payload) for payload in payloads]
+            actual = map_attendance_batch("default", payloads)
+        self.assertEqual(actual, expected)
+        # 序列化结果逐字节一致（含时区偏移与微秒）
+        self.assertEqual(
+            json.dumps(actual, ensure_ascii=False, default=str), json.dumps(expected, ensure_ascii=False, default=str)
+        )
+        for row, reference in zip(actual, expected):
+            self.assertEqual(row["user_check_time"].tzinfo, reference["user_check_time"].tzinfo)
+
+    def _epoch_payloads(self, count=2000):
+        rng = random.Random(20251001)
+        payloads = []
+        for index in range(count):
+            milliseconds = rng.randint(1_500_000_000_000, 8_000_000_000_000)
+            payload = {"userId": f"user-{index % 37}", "userCheckTime": milliseconds, "workDate": "2025-10-01"}
+            if index % 3 == 0:
+                payload = {"userid": f"user-{index}", "user_check_time": milliseconds // 1000, "record_id": f"r{index}"}
+            payloads.append(payload)
+        return payloads
+
+    def test_epoch_columns_match_map_attendance(self):
+        self._assert_identical(self._epoch_payloads())
+
+    def test_epoch_columns_match_without_numpy(self):
+        with patch.object(mappers, "np", None):
+            self._assert_identical(self._epoch_payloads(500))
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_epoch_columns_respect_dst_timezone(self):
+        self._assert_identical(self._epoch_payloads(500))
+
+    def test_mixed_batches_fall_back_per_record(self):
+        payloads = [
+            {"userid": "u1", "user_check_time": 1759352400000, "work_date": "2025-10-01T00:00:00"},
+            {"userid": "u2", "user_check_time": "2025-10-01T15:30:00", "work_date": "2025/10/01"},
+            {"userid": "u3", "user_check_time": "2025-10-01T07:30:00Z", "workDate": datetime(2025, 10, 1, 8)},
+            {"userid": "u4", "user_check_time": "2025-10-01 08:00:00", "check_type": "OnDuty", "checkType": "OffDuty"},
+            {"userid": "u5", "user_check_time": 1759352400123.5},
+            {"userid": "u6", "user_check_time": True},
+            {"userid": "u7", "user_check_time": "not-a-time"},
+            {"userid": "u8", "user_check_time": 99_999_999_999_999_999},
+            {"userid": "u9", "timeResult": "Late", "sourceType": "ATM", "recordId": "r9"},
+        ]
+        self._assert_identical(payloads)
+
+    def test_empty_batch(self):
+        self.assertEqual(map_attendance_batch("default", []), [])
+
+
 class MapDimissionTests(SimpleTestCase):
     def test_map_dimission_extracts_common_field_variants(self):
         info = {
@@ -83,3 +142,18 @@ class MapDimissionTests(SimpleTestCase):
         self.assertEqual(result["leave_reason"], "个人原因")
         self.assertEqual(result["voluntary_reasons"], ["工作内容调整"])
         self.assertEqual(result["dept_ids"], [10])
+
+    def test_map_dimission_plan_is_reused_across_payload_styles(self):
+        camel = {"userId": "user-3", "employeeName": " 王五 ", "mobilePhone": "", "phone": "13700001234"}
+        snake = {"userid": "user-4", "name": "赵六", "employee_info": {"name": "忽略", "mainDeptId": "20"}}
+
+        first = map_dimission("default", camel)
+        second = map_dimission("default", snake)
+        repeated = map_dimission("default", {**camel, "userId": "user-5", "phone": ""})
+
+        self.assertEqual((first["userid"], first["name"], first["mobile"]), ("user-3", "王五", "13700001234"))
+        self.assertEqual((second["userid"], second["name"], second["main_dept_id"]), ("user-4", "赵六", 20))
+        self.assertEqual((repeated["userid"], repeated["mobile"]), ("user-5", ""))
+        resolved = mappers._DIMISSION_PLAN.resolve(camel)
+        self.assertEqual(resolved["userid"], (("userId",),))
+        self.assertEqual(resolved["mobile"], (("mobilePhone",), ("phone",)))
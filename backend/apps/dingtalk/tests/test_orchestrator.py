@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.bulk import set_write_concurrency, write_slot
+from apps.dingtalk.services.exceptions import DingTalkAPIError
+from apps.dingtalk.services.orchestrator import sync_all_configs
+from apps.dingtalk.services.sync import SyncService
+
+
+def _fail_for_tenant_b(self, **kwargs):
+    if self.config.id == "tenant-b":
+        raise DingTalkAPIError("接口无权限")
+    return {"count": 3, "staleCount": 1}
+
+
+@patch.object(SyncService, "sync_attendance", return_value={"count": 7})
+@patch.object(SyncService, "sync_dimission_users", return_value={"count": 1, "staleCount": 0})
+@patch.object(SyncService, "sync_users", autospec=True, side_effect=_fail_for_tenant_b)
+@patch.object(SyncService, "sync_departments", return_value={"count": 2, "staleCount": 0})
+class OrchestratorTests(TestCase):
+    def setUp(self):
+        for config_id, attendance in (("tenant-a", True), ("tenant-b", True), ("tenant-c", False)):
+            config = DingTalkConfig.load(config_id)
+            config.enabled = True
+            config.sync_attendance = attendance
+            config.save()
+        DingTalkConfig.load().delete()
+
+    def test_runs_stages_per_config_and_summarizes(self, mock_depts, mock_users, mock_dimission, mock_attendance):
+        summary = sync_all_configs(max_workers=1)
+
+        self.assertEqual(summary["configs"], 3)
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(summary["failed"], ["tenant-b"])
+        reports = {report["config_id"]: report for report in summary["reports"]}
+        self.assertEqual(list(reports["tenant-a"]["stages"]), ["departments", "users", "dimission_users", "attendance"])
+        # 用户阶段失败后不再执行依赖它的后续阶段
+        self.assertEqual(list(reports["tenant-b"]["stages"]), ["departments", "users"])
+        self.assertEqual(reports["tenant-b"]["stages"]["users"]["error"], "接口无权限")
+        # 未开启考勤同步的配置跳过考勤阶段
+        self.assertNotIn("attendance", reports["tenant-c"]["stages"])
+        self.assertEqual(summary["totals"]["departments"], {"count": 6, "staleCount": 0})
+        self.assertEqual(summary["totals"]["users"], {"count": 6, "staleCount": 2})
+        self.assertEqual(summary["totals"]["attendance"], {"count": 7})
+        mock_attendance.assert_called_once_with(None, None, mode="incremental")
+
+    def test_management_command_prints_report(self, *_mocks):
+        out = StringIO()
+
+        call_command("sync_dingtalk_all", "--config", "tenant-a", "--stages", "departments", "users", "--workers", "1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("[tenant-a] success", output)
+        self.assertIn("配置 1 个", output)
+
+
+class WriteSlotTests(SimpleTestCase):
+    def tearDown(self):
+        set_write_concurrency(None)
+
+    def test_write_slot_caps_concurrent_writers(self):
+        set_write_concurrency(threading.BoundedSemaphore(2))
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def _write(_):
+            with write_slot():
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                time.sleep(0.02)
+                with lock:
+                    state["active"] -= 1
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(_write, range(12)))
+
+        self.assertEqual(state["peak"], 2)
@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from apps.dingtalk.constants import SyncOperation
+from apps.dingtalk.models import DingTalkConfig, DingTalkDepartment, DingTalkSyncLog, DingTalkUser
+from apps.dingtalk.services.bulk import bulk_upsert
+from apps.dingtalk.services.client import UserMerger, _merge_users
+from apps.dingtalk.services.exceptions import DingTalkAPIError
+from apps.dingtalk.services.sync import SyncService
+
+DEPARTMENT_LEVELS = [
+    [{"dept_id": 1, "name": "总部"}],
+    [{"dept_id": 2, "name": "研发部", "parent_id": 1}, {"dept_id": 3, "name": "市场部", "parent_id": 1}],
+]
+# 与钉钉接口一致：部门成员列表中的 dept_id_list 为用户所属的全部部门，leader 等字段按所在部门返回
+USER_BATCHES = {
+    1: [{"userid": "u1", "name": "张三", "dept_id_list": [1, 2]}],
+    2: [
+        {"userid": "u1", "name": "张三", "dept_id_list": [1, 2], "leader": True},
+        {"userid": "u2", "name": "李四", "dept_id_list": [2]},
+    ],
+    3: [{"userid": "u3", "name": "王五", "dept_id_list": [3]}],
+}
+
+
+def _iter_levels(root_dept_id=1, *, access_token=None):
+    yield from DEPARTMENT_LEVELS
+
+
+def _iter_users(dept_ids, *, access_token=None):
+    for dept_id in dept_ids:
+        yield USER_BATCHES.get(dept_id, [])
+
+
+class UserMergerTests(TestCase):
+    def test_add_returns_new_and_changed_users_only(self):
+        merger = UserMerger()
+
+        first = merger.add([{"userid": "u1", "name": "张三", "dept_id_list": [1]}])
+        repeated = merger.add([{"userid": "u1", "name": "张三", "dept_id_list": [1]}])
+        moved = merger.add([{"userid": "u1", "name": "", "dept_id_list": [2]}, {"name": "缺少 userid"}])
+
+        self.assertEqual([user["userid"] for user in first], ["u1"])
+        self.assertEqual(repeated, [])
+        self.assertEqual(moved[0]["dept_id_list"], [1, 2])
+        self.assertEqual(moved[0]["name"], "张三")
+
+    def test_merge_users_matches_incremental_result(self):
+        merged = _merge_users(USER_BATCHES.values())
+
+        self.assertEqual([user["userid"] for user in merged], ["u1", "u2", "u3"])
+        self.assertEqual(merged[0]["dept_id_list"], [1, 2])
+
+
+@patch("apps.dingtalk.services.sync.DingTalkClient.get_access_token", return_value="token")
+@patch("apps.dingtalk.services.sync.DingTalkClient.iter_user_batches", side_effect=_iter_users)
+@patch("apps.dingtalk.services.sync.DingTalkClient.iter_department_levels", side_effect=_iter_levels)
+class PipelinedFullSyncTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+
+    def test_full_sync_streams_departments_and_users(self, mock_levels, mock_users, mock_token):
+        DingTalkUser.objects.create(userid="stale", config=self.config, name="离开的人")
+
+        stats = SyncService(self.config).full_sync()
+
+        self.assertTrue(stats["pipeline"])
+        self.assertEqual((stats["dept_count"], stats["user_count"]), (3, 3))
+        self.assertEqual(mock_users.call_args.args[0], [1, 2, 3])
+        self.assertEqual(mock_users.call_args.kwargs, {"access_token": "token"})
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").dept_ids, [1, 2])
+        self.assertEqual(DingTalkDepartment.objects.filter(config=self.config).count(), 3)
+        self.assertFalse(DingTalkUser.objects.filter(userid="stale").exists())
+        self.assertTrue(DingTalkUser.all_objects.get(userid="stale").is_deleted)
+
+        log = DingTalkSyncLog.objects.get(operation=SyncOperation.FULL_SYNC.value)
+        for stage in ("fetch_departments", "fetch_users", "write_departments", "write_users", "total"):
+            self.assertIn(stage, log.stats["timings"])
+        user_log = DingTalkSyncLog.objects.get(operation=SyncOperation.SYNC_USERS.value)
+        self.assertEqual(user_log.stats["user_count"], 3)
+        self.assertEqual(user_log.stats["created"] + user_log.stats["updated"] + user_log.stats["unchanged"], 3)
+
+    def test_multi_department_user_is_written_once(self, mock_levels, mock_users, mock_token):
+        with patch("apps.dingtalk.services.sync.bulk_upsert", wraps=bulk_upsert) as mock_upsert:
+            SyncService(self.config).full_sync()
+
+        written = [row["userid"] for call in mock_upsert.call_args_list if call.args[0] is DingTalkUser for row in call.args[1]]
+        self.assertEqual(sorted(written), ["u1", "u2", "u3"])
+        stored = DingTalkUser.objects.get(userid="u1")
+        self.assertEqual(stored.dept_ids, [1, 2])
+
+        SyncService(self.config).full_sync()
+
+        user_log = DingTalkSyncLog.objects.filter(operation=SyncOperation.SYNC_USERS.value).latest("create_time")
+        self.assertEqual(
+            {name: user_log.stats[name] for name in ("created", "updated", "unchanged")},
+            {"created": 0, "updated": 0, "unchanged": 3},
+        )
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").update_time, stored.update_time)
+
+    @override_settings(DINGTALK={"FULL_SYNC_QUEUE_SIZE": 1})
+    def test_full_sync_with_minimal_queue_matches_sequential_result(self, mock_levels, mock_users, mock_token):
+        SyncService(self.config).full_sync()
+        pipelined = list(DingTalkUser.objects.order_by("userid").values_list("userid", "dept_ids", "content_hash"))
+
+        with override_settings(DINGTALK={"FULL_SYNC_PIPELINE": False}):
+            with patch("apps.dingtalk.services.sync.DingTalkClient.list_departments") as mock_list_departments, patch(
+                "apps.dingtalk.services.sync.DingTalkClient.list_all_users"
+            ) as mock_list_users:
+                mock_list_departments.return_value = [dept for level in DEPARTMENT_LEVELS for dept in level]
+                mock_list_users.return_value = _merge_users(_iter_users([1, 2, 3]))
+                stats = SyncService(self.config).full_sync()
+
+        self.assertFalse(stats["pipeline"])
+        self.assertIn("departments", stats["timings"])
+        sequential = list(DingTalkUser.objects.order_by("userid").values_list("userid", "dept_ids", "content_hash"))
+        self.assertEqual(pipelined, sequential)
+
+    def test_fetch_failure_does_not_tombstone_existing_rows(self, mock_levels, mock_users, mock_token):
+        DingTalkUser.objects.create(userid="kept", config=self.config, name="保留")
+
+        def _failing_users(dept_ids, *, access_token=None):
+            yield USER_BATCHES[1]
+            raise DingTalkAPIError("接口无权限")
+
+        mock_users.side_effect = _failing_users
+
+        with self.assertRaises(DingTalkAPIError):
+            SyncService(self.config).full_sync()
+
+        self.assertTrue(DingTalkUser.objects.filter(userid="kept").exists())
+        self.assertEqual(DingTalkDepartment.objects.filter(config=self.config).count(), 3)
+        failed = DingTalkSyncLog.objects.filter(status="failed").values_list("operation", flat=True)
+        self.assertCountEqual(failed, [SyncOperation.SYNC_USERS.value, SyncOperation.FULL_SYNC.value])
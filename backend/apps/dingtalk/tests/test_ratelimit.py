@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.dingtalk.services.ratelimit import (
+    RedisRateLimiter,
+    TokenBucketRateLimiter,
+    get_rate_limiter,
+    reset_rate_limiter,
+)
+
+
+class TokenBucketRateLimiterTests(SimpleTestCase):
+    @patch("apps.dingtalk.services.ratelimit.sleep")
+    @patch("apps.dingtalk.services.ratelimit.monotonic", return_value=100.0)
+    def test_burst_then_wait_for_refill(self, mock_monotonic, mock_sleep):  # noqa: ARG002
+        limiter = TokenBucketRateLimiter()
+
+        waits = [limiter.acquire("cfg:user", rate=10, capacity=2) for _ in range(4)]
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.2)
+        self.assertEqual(mock_sleep.call_count, 2)
+        metrics = limiter.get_metrics()["cfg:user"]
+        self.assertEqual(metrics["calls"], 4)
+        self.assertEqual(metrics["throttled"], 2)
+        self.assertAlmostEqual(metrics["wait_seconds"], 0.3)
+        self.assertAlmostEqual(metrics["max_wait_seconds"], 0.2)
+        self.assertEqual(metrics["backend"], "local")
+
+    @patch("apps.dingtalk.services.ratelimit.sleep")
+    def test_buckets_are_independent(self, mock_sleep):
+        limiter = TokenBucketRateLimiter()
+
+        limiter.acquire("a:user", rate=1, capacity=1)
+        wait = limiter.acquire("b:user", rate=1, capacity=1)
+
+        self.assertEqual(wait, 0.0)
+        mock_sleep.assert_not_called()
+
+
+class RedisRateLimiterTests(SimpleTestCase):
+    @patch("apps.dingtalk.services.ratelimit.sleep")
+    def test_falls_back_to_local_bucket_when_redis_unavailable(self, mock_sleep):  # noqa: ARG002
+        limiter = RedisRateLimiter()
+        with patch.object(limiter, "_get_script", side_effect=ConnectionError("down")):
+            waits = [limiter.acquire("cfg:user", rate=1, capacity=1) for _ in range(2)]
+
+        self.assertEqual(waits[0], 0.0)
+        self.assertGreater(waits[1], 0.0)
+        self.assertEqual(limiter.get_metrics()["cfg:user"]["throttled"], 1)
+
+    @patch("apps.dingtalk.services.ratelimit.sleep")
+    def test_logs_outage_once_and_recovery(self, mock_sleep):  # noqa: ARG002
+        limiter = RedisRateLimiter()
+        with self.assertLogs("apps.dingtalk.services.ratelimit", level="INFO") as logs:
+            with patch.object(limiter, "_get_script", side_effect=ConnectionError("down")):
+                for _ in range(3):
+                    limiter.acquire("cfg:user", rate=100, capacity=100)
+            with patch.object(limiter, "_get_script", return_value=lambda keys, args: b"0"):
+                for _ in range(2):
+                    limiter.acquire("cfg:user", rate=100, capacity=100)
+
+        self.assertEqual([record.levelname for record in logs.records], ["WARNING", "INFO"])
+
+    def test_uses_script_result_as_wait(self):
+        limiter = RedisRateLimiter()
+        with patch.object(limiter, "_get_script", return_value=lambda keys, args: b"0"):
+            self.assertEqual(limiter.acquire("cfg:user", rate=15, capacity=15), 0.0)
+
+
+class GetRateLimiterTests(SimpleTestCase):
+    def tearDown(self):
+        reset_rate_limiter()
+
+    @override_settings(DINGTALK={"RATE_LIMITER": "auto"}, CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_auto_uses_local_bucket_without_redis_cache(self):
+        reset_rate_limiter()
+        self.assertIsInstance(get_rate_limiter(), TokenBucketRateLimiter)
+
+    @override_settings(DINGTALK={"RATE_LIMITER": "auto"}, CACHES={"default": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://localhost:6379/1"}})
+    def test_auto_uses_redis_when_cache_is_redis(self):
+        reset_rate_limiter()
+        self.assertIsInstance(get_rate_limiter(), RedisRateLimiter)
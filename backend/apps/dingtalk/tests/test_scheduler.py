@@ -0,0 +1,162 @@
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.dingtalk.models import DingTalkConfig, ScheduleState
+from apps.dingtalk.services.cron import CronExpression
+from apps.dingtalk.services.scheduler import get_schedule_operations, jitter_offset, run_due_schedules
+
+
+def _local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class CronExpressionTests(TestCase):
+    def test_next_after_handles_steps_ranges_and_weekdays(self):
+        base = _local(2025, 9, 1, 10, 30)  # 周一
+
+        self.assertEqual(CronExpression.parse("*/15 * * * *").next_after(base), _local(2025, 9, 1, 10, 45))
+        self.assertEqual(CronExpression.parse("30 9 * * 1-5").next_after(base), _local(2025, 9, 2, 9, 30))
+        self.assertEqual(CronExpression.parse("0 8 * * 7").next_after(base), _local(2025, 9, 7, 8, 0))
+        self.assertEqual(CronExpression.parse("@monthly").next_after(base), _local(2025, 10, 1, 0, 0))
+
+    def test_invalid_expressions_raise(self):
+        for expression in ("* * *", "61 * * * *", "*/0 * * * *", "0 0 30 2 *"):
+            with self.assertRaises(ValueError):
+                CronExpression.parse(expression).next_after(_local(2025, 1, 1))
+
+
+@override_settings(DINGTALK={"SCHEDULER_JITTER": 0})
+@patch("apps.dingtalk.services.scheduler.run_scheduled_sync")
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.enabled = True
+        self.config.sync_attendance = True
+        self.config.schedule = {"cron": "0 2 * * *"}
+        self.config.save()
+
+    def test_due_schedule_runs_once_and_advances(self, mock_run):
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+        state = ScheduleState.objects.get()
+        self.assertEqual(state.next_run_at, _local(2025, 9, 1, 2, 0))
+        mock_run.assert_not_called()
+
+        with patch("apps.dingtalk.services.scheduler.timezone.now", return_value=_local(2025, 9, 1, 2, 1)):
+            result = run_due_schedules(now=_local(2025, 9, 1, 2, 1))
+
+        self.assertEqual(result["success"], 1)
+        mock_run.assert_called_once_with(self.config.id, ["departments", "users", "attendance"])
+        state.refresh_from_db()
+        self.assertEqual(state.next_run_at, _local(2025, 9, 2, 2, 0))
+        self.assertEqual((state.last_status, state.lease_owner, state.lease_until), ("success", "", None))
+
+    def test_leased_schedule_is_not_run_again(self, mock_run):
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+        ScheduleState.objects.update(lease_owner="other-host:1", lease_until=_local(2025, 9, 1, 4, 0))
+
+        result = run_due_schedules(now=_local(2025, 9, 1, 2, 1), owner="me")
+
+        self.assertEqual(result["due"], 0)
+        mock_run.assert_not_called()
+
+    def test_missed_runs_are_caught_up_once_after_restart(self, mock_run):
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+        restart = _local(2025, 9, 4, 12, 0)
+
+        with patch("apps.dingtalk.services.scheduler.timezone.now", return_value=restart):
+            result = run_due_schedules(now=restart)
+
+        self.assertEqual(result["success"], 1)
+        mock_run.assert_called_once()
+        self.assertEqual(ScheduleState.objects.get().next_run_at, _local(2025, 9, 5, 2, 0))
+
+    def test_catch_up_can_be_disabled(self, mock_run):
+        self.config.schedule = {"cron": "0 2 * * *", "catch_up": False}
+        self.config.save()
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+
+        result = run_due_schedules(now=_local(2025, 9, 4, 12, 0))
+
+        self.assertEqual(result["skipped"], 1)
+        mock_run.assert_not_called()
+
+    def test_cron_change_reschedules(self, mock_run):
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+        self.config.schedule = {"cron": "30 1 * * *", "operations": ["users"]}
+        self.config.save()
+
+        run_due_schedules(now=_local(2025, 9, 1, 1, 10))
+
+        self.assertEqual(ScheduleState.objects.get().next_run_at, _local(2025, 9, 1, 1, 30))
+        self.assertEqual(get_schedule_operations(self.config), ["users"])
+
+    def test_removed_or_invalid_cron_stops_firing(self, mock_run):
+        for schedule in ({}, {"cron": "61 * * * *"}):
+            with self.subTest(schedule=schedule):
+                self.config.schedule = {"cron": "0 2 * * *"}
+                self.config.save()
+                run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+                self.config.schedule = schedule
+                self.config.save()
+
+                result = run_due_schedules(now=_local(2025, 9, 1, 2, 1))
+
+                self.assertEqual(result["due"], 0)
+                self.assertIsNone(ScheduleState.objects.get().next_run_at)
+        mock_run.assert_not_called()
+
+    def test_stale_state_is_not_run_with_old_cron(self, mock_run):
+        run_due_schedules(now=_local(2025, 9, 1, 1, 0))
+        self.config.schedule = {}
+        self.config.save()
+
+        with patch("apps.dingtalk.services.scheduler.refresh_schedule_states"):
+            result = run_due_schedules(now=_local(2025, 9, 1, 2, 1))
+
+        self.assertEqual(result["due"], 0)
+        mock_run.assert_not_called()
+
+    def test_jitter_is_stable_and_spreads_configs(self, _mock_run):
+        self.config.schedule = {"cron": "0 2 * * *", "jitter": 600}
+        other = DingTalkConfig(id="tenant-b", schedule={"cron": "0 2 * * *", "jitter": 600})
+
+        offset = jitter_offset(self.config)
+
+        self.assertEqual(offset, jitter_offset(self.config))
+        self.assertLess(offset, timedelta(seconds=600))
+        self.assertNotEqual(offset, jitter_offset(other))
+
+
+@override_settings(DINGTALK={"SCHEDULER_JITTER": 0, "SCHEDULER_LEASE": 1})
+class SchedulerLeaseTests(TransactionTestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.enabled = True
+        self.config.schedule = {"cron": "* * * * *", "operations": ["users"]}
+        self.config.save()
+        ScheduleState.objects.create(config=self.config, cron="* * * * *", next_run_at=timezone.now() - timedelta(seconds=1))
+
+    def test_long_running_sync_keeps_lease(self):
+        calls, competing = [], []
+
+        def _slow_sync(config_id, operations):
+            # 执行时间超过租约，期间另一个调度进程尝试领取
+            calls.append(config_id)
+            if len(calls) > 1:
+                return
+            time.sleep(1.6)
+            competing.append(run_due_schedules(owner="other-host:1"))
+
+        with patch("apps.dingtalk.services.scheduler.run_scheduled_sync", side_effect=_slow_sync):
+            result = run_due_schedules(owner="me")
+
+        self.assertEqual(result["success"], 1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(competing[0]["due"], 0)
+        state = ScheduleState.objects.get()
+        self.assertEqual((state.last_status, state.lease_owner), ("success", ""))
+        self.assertGreater(state.next_run_at, timezone.now() - timedelta(minutes=1))
@@ -0,0 +1,132 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.dingtalk.models import (
+    DingTalkAttendanceRecord,
+    DingTalkConfig,
+    DingTalkDepartment,
+    DingTalkSourcePayload,
+    DingTalkUser,
+)
+from apps.dingtalk.serializers import DingTalkAttendanceSerializer, DingTalkDepartmentSerializer
+from apps.dingtalk.services.bulk import bulk_upsert
+from apps.dingtalk.services.exceptions import DingTalkConfigurationError
+from apps.dingtalk.services.mappers import map_attendance, map_department, map_user
+from apps.dingtalk.services.source_storage import get_source_policy
+from apps.dingtalk.services.sync import SyncService
+
+
+def _policy(**policies):
+    return override_settings(DINGTALK={"SOURCE_INFO_POLICY": policies})
+
+
+class SourceInfoPolicyTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.payloads = [
+            {"record_id": f"r{i}", "userid": "u1", "user_check_time": 1759352400000 + i, "checkType": "OnDuty", "extra": "x" * 50}
+            for i in range(3)
+        ]
+
+    def _upsert_attendance(self):
+        rows = [map_attendance(self.config.id, payload) for payload in self.payloads]
+        return bulk_upsert(DingTalkAttendanceRecord, rows, key="record_id", hash_field="content_hash")
+
+    def test_compressed_policy_moves_payload_to_blob(self):
+        with _policy(attendance={"mode": "compressed", "codec": "zlib"}):
+            self._upsert_attendance()
+
+        record = DingTalkAttendanceRecord.objects.get(record_id="r1")
+        self.assertEqual(record.source_storage, "compressed")
+        self.assertEqual(record.source_info, {})
+        self.assertEqual(record.get_source_info(), self.payloads[1])
+        data = DingTalkAttendanceSerializer(DingTalkAttendanceRecord.objects.order_by("record_id"), many=True).data
+        self.assertEqual(data[0]["source_info"], self.payloads[0])
+
+    def test_policy_change_keeps_content_hash(self):
+        self._upsert_attendance()
+        with _policy(attendance="compressed"):
+            result = self._upsert_attendance()
+
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 3))
+        self.assertEqual(DingTalkAttendanceRecord.objects.get(record_id="r0").source_storage, "full")
+
+    def test_allowlist_policy_keeps_listed_fields(self):
+        payload = {"userid": "u1", "name": "张三", "mobile": "138", "extension": {"big": "x" * 100}}
+        with _policy(user={"mode": "allowlist", "fields": ["userid", "name"]}):
+            bulk_upsert(DingTalkUser, [map_user(self.config.id, payload)], key="userid", hash_field="content_hash")
+
+        user = DingTalkUser.objects.get(userid="u1")
+        self.assertEqual(user.get_source_info(), {"userid": "u1", "name": "张三"})
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_departments")
+    def test_external_policy_loads_payloads_in_one_query(self, mock_list_departments):
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+        departments = [{"dept_id": dept_id, "name": f"部门{dept_id}", "brief": "简介"} for dept_id in (1, 2, 3)]
+        mock_list_departments.return_value = departments
+        with _policy(department="external"):
+            SyncService(self.config).sync_departments()
+
+        self.assertEqual(DingTalkSourcePayload.objects.filter(source_model="dingtalk.dingtalkdepartment").count(), 3)
+        self.assertEqual(DingTalkDepartment.objects.get(dept_id=2).source_info, {})
+        queryset = DingTalkDepartment.objects.order_by("dept_id")
+        with self.assertNumQueries(2):
+            data = DingTalkDepartmentSerializer(queryset, many=True).data
+        self.assertEqual([item["source_info"] for item in data], departments)
+
+    def test_invalid_policy_is_rejected(self):
+        with _policy(default="gzip"), self.assertRaises(DingTalkConfigurationError):
+            get_source_policy(DingTalkUser)
+        with _policy(user={"mode": "allowlist"}), self.assertRaises(DingTalkConfigurationError):
+            get_source_policy(DingTalkUser)
+
+
+class RewriteSourceInfoCommandTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.payloads = {dept_id: {"dept_id": dept_id, "name": f"部门{dept_id}", "order": dept_id} for dept_id in range(1, 6)}
+        rows = [map_department(self.config.id, payload) for payload in self.payloads.values()]
+        bulk_upsert(DingTalkDepartment, rows, key="dept_id", hash_field="content_hash")
+
+    def _rewrite(self, **policies):
+        with _policy(**policies):
+            call_command("rewrite_dingtalk_source_info", "--model", "department", "--batch-size", "2", stdout=StringIO())
+
+    def _assert_payloads_intact(self):
+        for dept in DingTalkDepartment.all_objects.all():
+            self.assertEqual(dept.get_source_info(), self.payloads[dept.dept_id])
+
+    def test_rewrites_existing_rows_between_policies(self):
+        update_time = DingTalkDepartment.objects.get(dept_id=1).update_time
+
+        self._rewrite(department="compressed")
+        self.assertEqual(set(DingTalkDepartment.objects.values_list("source_storage", flat=True)), {"compressed"})
+        self._assert_payloads_intact()
+
+        self._rewrite(department="external")
+        self.assertEqual(DingTalkSourcePayload.objects.count(), 5)
+        self.assertFalse(DingTalkDepartment.objects.filter(source_blob__isnull=False).exists())
+        self._assert_payloads_intact()
+
+        self._rewrite(department="full")
+        self.assertEqual(DingTalkSourcePayload.objects.count(), 0)
+        self._assert_payloads_intact()
+        self.assertEqual(DingTalkDepartment.objects.get(dept_id=1).update_time, update_time)
+
+    def test_prunes_payloads_of_deleted_rows(self):
+        self._rewrite(department="external")
+        DingTalkDepartment.all_objects.filter(dept_id=5).update(is_deleted=True, deleted_at=timezone.now())
+        DingTalkDepartment.all_objects.filter(dept_id=5).delete()
+
+        self._rewrite(department="external")
+
+        self.assertEqual(
+            sorted(DingTalkSourcePayload.objects.values_list("object_key", flat=True)), ["1", "2", "3", "4"]
+        )
@@ -0,0 +1,313 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.dingtalk.models import (
+    DingTalkAttendanceRecord,
+    DingTalkConfig,
+    DingTalkDepartment,
+    DingTalkSyncLog,
+    DingTalkUser,
+    SyncCursor,
+)
+from apps.dingtalk.services.bulk import bulk_upsert
+from apps.dingtalk.services.exceptions import DingTalkAPIError
+from apps.dingtalk.services.mappers import compute_content_hash, map_user
+from apps.dingtalk.services.sync import SyncService
+
+
+class BulkUpsertTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+
+    def test_bulk_upsert_creates_updates_and_skips_unchanged(self):
+        unchanged_payload = {"userid": "u1", "name": "张三"}
+        DingTalkUser.objects.create(**map_user(self.config.id, unchanged_payload))
+        DingTalkUser.objects.create(**map_user(self.config.id, {"userid": "u2", "name": "旧名字"}))
+
+        rows = [
+            map_user(self.config.id, unchanged_payload),
+            map_user(self.config.id, {"userid": "u2", "name": "新名字"}),
+            map_user(self.config.id, {"userid": "u3", "name": "王五"}),
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            result = bulk_upsert(DingTalkUser, rows, key="userid", batch_size=2)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(result.keys, {"u1", "u2", "u3"})
+        self.assertEqual(DingTalkUser.objects.get(userid="u2").name, "新名字")
+        self.assertEqual(DingTalkUser.objects.get(userid="u3").name, "王五")
+        # 2 批 SELECT + 1 INSERT + 1 UPDATE，外加事务保存点
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+
+    def test_bulk_upsert_last_row_wins_for_duplicate_keys(self):
+        rows = [
+            map_user(self.config.id, {"userid": "u1", "name": "first"}),
+            map_user(self.config.id, {"userid": "u1", "name": "second"}),
+        ]
+        result = bulk_upsert(DingTalkUser, rows, key="userid")
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").name, "second")
+
+    def test_bulk_upsert_with_hash_skips_unchanged_rows(self):
+        row = map_user(self.config.id, {"userid": "u1", "name": "张三"})
+        first = bulk_upsert(DingTalkUser, [row], key="userid", hash_field="content_hash")
+        stored = DingTalkUser.objects.get(userid="u1")
+        self.assertEqual(first.created, 1)
+        self.assertEqual(stored.content_hash, compute_content_hash(row))
+
+        second = bulk_upsert(DingTalkUser, [row], key="userid", hash_field="content_hash")
+        self.assertEqual(second.as_stats(), {"created": 0, "updated": 0, "unchanged": 1})
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").update_time, stored.update_time)
+
+        changed = map_user(self.config.id, {"userid": "u1", "name": "张三丰"})
+        third = bulk_upsert(DingTalkUser, [changed], key="userid", hash_field="content_hash")
+        self.assertEqual(third.updated, 1)
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").name, "张三丰")
+
+
+    def test_bulk_upsert_stamp_marks_unchanged_rows_without_touching_them(self):
+        row = map_user(self.config.id, {"userid": "u1", "name": "张三"})
+        bulk_upsert(DingTalkUser, [row], key="userid", hash_field="content_hash", stamp={"sync_run": 1})
+        stored = DingTalkUser.objects.get(userid="u1")
+
+        result = bulk_upsert(DingTalkUser, [row], key="userid", hash_field="content_hash", stamp={"sync_run": 2})
+
+        self.assertEqual(result.unchanged, 1)
+        refreshed = DingTalkUser.objects.get(userid="u1")
+        self.assertEqual(refreshed.sync_run, 2)
+        self.assertEqual(refreshed.content_hash, stored.content_hash)
+        self.assertEqual(refreshed.update_time, stored.update_time)
+
+    def test_bulk_upsert_writes_union_of_row_fields(self):
+        DingTalkUser.objects.create(**map_user(self.config.id, {"userid": "u1", "name": "张三", "title": "工程师"}))
+        DingTalkUser.objects.create(**map_user(self.config.id, {"userid": "u2", "name": "李四"}))
+        rows = [
+            {"userid": "u1", "config_id": self.config.id, "name": "张三丰"},
+            {"userid": "u2", "config_id": self.config.id, "name": "李四", "title": "经理"},
+        ]
+
+        result = bulk_upsert(DingTalkUser, rows, key="userid")
+
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(
+            list(DingTalkUser.objects.order_by("userid").values_list("name", "title")),
+            [("张三丰", "工程师"), ("李四", "经理")],
+        )
+
+        rows[1]["title"] = "总监"
+        result = bulk_upsert(DingTalkUser, rows, key="userid", hash_field="content_hash")
+
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(
+            list(DingTalkUser.objects.order_by("userid").values_list("name", "title")),
+            [("张三丰", "工程师"), ("李四", "总监")],
+        )
+
+
+class SyncServiceBulkTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_all_users")
+    def test_sync_users_upserts_and_removes_stale(self, mock_list_users):
+        DingTalkUser.objects.create(userid="stale", config=self.config, name="离开的人")
+        DingTalkUser.objects.create(userid="u1", config=self.config, name="旧名字")
+        mock_list_users.return_value = [
+            {"userid": "u1", "name": "张三", "dept_id_list": [1]},
+            {"userid": "u2", "name": "李四", "dept_id_list": [1, 2]},
+            {"name": "缺少 userid"},
+        ]
+
+        result = SyncService(self.config).sync_users()
+
+        self.assertEqual(result, {"count": 2, "staleCount": 1})
+        self.assertEqual(DingTalkUser.objects.get(userid="u1").name, "张三")
+        self.assertEqual(DingTalkUser.objects.get(userid="u2").dept_ids, [1, 2])
+        self.assertFalse(DingTalkUser.objects.filter(userid="stale").exists())
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_all_users")
+    def test_stale_cleanup_uses_sync_run_instead_of_not_in(self, mock_list_users):
+        DingTalkUser.objects.create(userid="stale", config=self.config, name="离开的人")
+        mock_list_users.return_value = [{"userid": f"u{i}", "name": str(i)} for i in range(50)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = SyncService(self.config).sync_users()
+
+        self.assertEqual(result, {"count": 50, "staleCount": 1})
+        self.assertFalse(any("NOT" in query["sql"] and "IN" in query["sql"] for query in ctx.captured_queries))
+        self.assertEqual(len(set(DingTalkUser.objects.values_list("sync_run", flat=True))), 1)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_departments")
+    def test_sync_departments_upserts(self, mock_list_departments):
+        DingTalkDepartment.objects.create(dept_id=1, config=self.config, name="旧总部")
+        mock_list_departments.return_value = [
+            {"dept_id": 1, "name": "总部"},
+            {"dept_id": 2, "name": "研发", "parent_id": 1},
+        ]
+
+        result = SyncService(self.config).sync_departments()
+
+        self.assertEqual(result, {"count": 2, "staleCount": 0})
+        self.assertEqual(DingTalkDepartment.objects.get(dept_id=1).name, "总部")
+        self.assertEqual(DingTalkDepartment.objects.get(dept_id=2).parent_id, 1)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_all_users")
+    def test_sync_users_reports_unchanged_rows(self, mock_list_users):
+        mock_list_users.return_value = [{"userid": "u1", "name": "张三"}]
+        service = SyncService(self.config)
+        service.sync_users()
+        service.sync_users()
+
+        log = DingTalkSyncLog.objects.filter(operation="sync_users").order_by("-create_time").first()
+        self.assertEqual(log.stats["unchanged"], 1)
+        self.assertEqual(log.stats["updated"], 0)
+        self.assertEqual(log.stats["created"], 0)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_sync_attendance_skips_unchanged_records(self, mock_iter_records):
+        mock_iter_records.side_effect = lambda *args, **kwargs: iter(
+            [[{"record_id": "r1", "userid": "u1", "user_check_time": "2025-09-01T09:00:00", "work_date": "2025-09-01"}]]
+        )
+        service = SyncService(self.config)
+        start = timezone.make_aware(datetime(2025, 9, 1))
+        end = timezone.make_aware(datetime(2025, 9, 1, 23, 59, 59))
+        service.sync_attendance(start, end, user_ids=["u1"])
+        update_time = DingTalkAttendanceRecord.objects.get(record_id="r1").update_time
+        service.sync_attendance(start, end, user_ids=["u1"])
+
+        self.assertEqual(DingTalkAttendanceRecord.objects.get(record_id="r1").update_time, update_time)
+        log = DingTalkSyncLog.objects.filter(operation="sync_attendance").order_by("-create_time").first()
+        self.assertEqual(log.stats["unchanged"], 1)
+
+    @patch("apps.dingtalk.services.sync.get_bulk_batch_size", return_value=2)
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_sync_attendance_commits_each_chunk(self, mock_iter_records, _mock_batch_size):
+        def pages(*args, **kwargs):
+            yield [
+                {"record_id": f"r{i}", "userid": "u1", "user_check_time": "2025-09-01T09:00:00", "work_date": "2025-09-01"}
+                for i in range(3)
+            ]
+            yield [{"record_id": "r3", "userid": "u1", "user_check_time": "2025-09-01T18:00:00", "work_date": "2025-09-01"}]
+            raise DingTalkAPIError("网络中断")
+
+        mock_iter_records.side_effect = pages
+        start = timezone.make_aware(datetime(2025, 9, 1))
+        end = timezone.make_aware(datetime(2025, 9, 1, 23, 59, 59))
+
+        with self.assertRaises(DingTalkAPIError):
+            SyncService(self.config).sync_attendance(start, end, user_ids=["u1"])
+
+        # 失败前已提交的两批（4 条）保留，日志记录进度
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 4)
+        log = DingTalkSyncLog.objects.filter(operation="sync_attendance").order_by("-create_time").first()
+        self.assertEqual(log.stats["chunks"], 2)
+        self.assertEqual(log.stats["created"], 4)
+
+
+@override_settings(DINGTALK={"ATTENDANCE_OVERLAP_MINUTES": 30, "ATTENDANCE_USER_GROUP": 1, "BULK_BATCH_SIZE": 500})
+class IncrementalAttendanceSyncTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+        DingTalkUser.objects.create(userid="u1", config=self.config, name="张三")
+        DingTalkUser.objects.create(userid="u2", config=self.config, name="李四")
+
+    @staticmethod
+    def _pages(userids, **kwargs):
+        return iter([[{"record_id": f"{uid}-{kwargs['start_time']:%H%M}", "userid": uid} for uid in userids]])
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_incremental_resumes_from_watermark_with_overlap(self, mock_iter_records):
+        mock_iter_records.side_effect = self._pages
+        service = SyncService(self.config)
+        first_end = timezone.make_aware(datetime(2025, 9, 1, 12, 0))
+
+        service.sync_attendance(None, first_end, mode="incremental")
+
+        cursor = SyncCursor.objects.get(config=self.config, cursor_type="attendance")
+        self.assertEqual(datetime.fromisoformat(cursor.value), first_end)
+        self.assertNotIn("pending", cursor.extra)
+
+        second_end = timezone.make_aware(datetime(2025, 9, 1, 13, 0))
+        service.sync_attendance(None, second_end, mode="incremental")
+
+        kwargs = mock_iter_records.call_args.kwargs
+        self.assertEqual(kwargs["start_time"], first_end - timezone.timedelta(minutes=30))
+        self.assertEqual(kwargs["end_time"], second_end)
+        cursor.refresh_from_db()
+        self.assertEqual(datetime.fromisoformat(cursor.value), second_end)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_incremental_failure_keeps_checkpoint_and_resumes(self, mock_iter_records):
+        end = timezone.make_aware(datetime(2025, 9, 1, 12, 0))
+
+        def flaky(userids, **kwargs):
+            if userids == ["u2"]:
+                raise DingTalkAPIError("网络中断")
+            return self._pages(userids, **kwargs)
+
+        mock_iter_records.side_effect = flaky
+        service = SyncService(self.config)
+        with self.assertRaises(DingTalkAPIError):
+            service.sync_attendance(None, end, mode="incremental")
+
+        cursor = SyncCursor.objects.get(config=self.config, cursor_type="attendance")
+        self.assertEqual(cursor.value, "")
+        self.assertEqual(cursor.extra["pending"]["user_offset"], 1)
+
+        mock_iter_records.side_effect = self._pages
+        mock_iter_records.reset_mock()
+        service.sync_attendance(None, None, mode="incremental")
+
+        # 续跑同一窗口，只拉取尚未完成的用户
+        self.assertEqual(mock_iter_records.call_count, 1)
+        self.assertEqual(mock_iter_records.call_args.args[0], ["u2"])
+        self.assertEqual(mock_iter_records.call_args.kwargs["end_time"], end)
+        cursor.refresh_from_db()
+        self.assertEqual(datetime.fromisoformat(cursor.value), end)
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 2)
+
+    @override_settings(DINGTALK={"ATTENDANCE_OVERLAP_MINUTES": 30, "ATTENDANCE_USER_GROUP": 500, "BULK_BATCH_SIZE": 1})
+    @patch("apps.dingtalk.services.sync.ATTENDANCE_USERS_PER_REQUEST", 1)
+    @patch("apps.dingtalk.services.sync.DingTalkClient.iter_attendance_records")
+    def test_incremental_failure_inside_group_resumes_from_committed_chunk(self, mock_iter_records):
+        DingTalkUser.objects.create(userid="u3", config=self.config, name="王五")
+        end = timezone.make_aware(datetime(2025, 9, 1, 12, 0))
+
+        def flaky(userids, **kwargs):
+            if userids == ["u3"]:
+                raise DingTalkAPIError("网络中断")
+            return self._pages(userids, **kwargs)
+
+        mock_iter_records.side_effect = flaky
+        service = SyncService(self.config)
+        with self.assertRaises(DingTalkAPIError):
+            service.sync_attendance(None, end, mode="incremental")
+
+        # u2 的记录提交时 u1 已完整读出，续跑位置落在同一用户组内
+        cursor = SyncCursor.objects.get(config=self.config, cursor_type="attendance")
+        self.assertEqual(cursor.extra["pending"]["user_offset"], 1)
+
+        mock_iter_records.side_effect = self._pages
+        mock_iter_records.reset_mock()
+        service.sync_attendance(None, None, mode="incremental")
+
+        self.assertEqual([call.args[0] for call in mock_iter_records.call_args_list], [["u2"], ["u3"]])
+        cursor.refresh_from_db()
+        self.assertEqual(datetime.fromisoformat(cursor.value), end)
+        self.assertEqual(DingTalkAttendanceRecord.objects.count(), 3)
@@ -1,3 +1,4 @@
+import threading
 from datetime import datetime, timezone as dt_timezone
 from unittest.mock import patch
 
@@ -6,6 +7,8 @@ from django.utils import timezone
 
 from apps.dingtalk.constants import DEFAULT_DIMISSION_ROSTER_FIELDS
 from apps.dingtalk.models import DingTalkConfig, DingTalkDimissionUser
+from apps.dingtalk.services.exceptions import DingTalkAPIError
+from apps.dingtalk.services.mappers import merge_roster_info
 from apps.dingtalk.services.sync import SyncService
 
 
@@ -114,6 +117,57 @@ class SyncDimissionUsersTests(TestCase):
         self.assertTrue(mock_roster.called)
         mock_records.assert_called_once()
 
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_dimission_records")
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_roster_infos")
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_dimission_infos")
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_dimission_userids", return_value=["user-3"])
+    def test_enrichment_fetches_run_concurrently(self, mock_userids, mock_infos, mock_roster, mock_records):
+        # 三个接口必须同时处于调用中才能通过栅栏，串行执行会超时
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _infos(userids):
+            barrier.wait()
+            return [{"userid": "user-3", "name": "王离职"}]
+
+        def _roster(userids, field_codes=None):
+            barrier.wait()
+            return {"user-3": {"sys00-mobile": {"value": "13800000000"}}}
+
+        def _records(**kwargs):
+            barrier.wait()
+            raise DingTalkAPIError("缺少权限")
+
+        mock_infos.side_effect = _infos
+        mock_roster.side_effect = _roster
+        mock_records.side_effect = _records
+
+        result = SyncService(self.config).sync_dimission_users()
+
+        self.assertEqual(result["count"], 1)
+        dimission = DingTalkDimissionUser.objects.get(userid="user-3")
+        self.assertEqual(dimission.name, "王离职")
+        self.assertEqual(dimission.mobile, "13800000000")
+
+    def test_merge_roster_info_keeps_existing_values(self):
+        info = {"userid": "user-4", "name": "接口姓名", "deptIdList": [1]}
+        roster = {
+            "sys00-name": {"value": "花名册姓名", "label": "花名册标签"},
+            "sys00-jobNumber": {"value": ""},
+            "sys00-employeeId": {"value": "E004"},
+            "sys00-mainDeptId": "300",
+            "sys00-dept": {"values": [2, "", None]},
+        }
+
+        merged = merge_roster_info(info, roster)
+
+        self.assertIs(merged, info)
+        self.assertEqual(info["name"], "接口姓名")
+        self.assertEqual(info["employeeInfo"]["name"], "花名册标签")
+        self.assertEqual(info["job_number"], "E004")
+        self.assertEqual(info["main_dept_id"], "300")
+        self.assertNotIn("main_dept_name", info)
+        self.assertEqual(info["dept_ids"], ["1", "2"])
+
     def test_get_dimission_roster_fields_default(self):
         self.config.schedule = {}
         self.config.save(update_fields=["schedule"])
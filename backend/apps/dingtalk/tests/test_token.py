@@ -0,0 +1,134 @@
+import threading
+from datetime import timedelta
+from time import sleep
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.dingtalk.models import DingTalkConfig
+from apps.dingtalk.services.client import DingTalkClient
+from apps.dingtalk.services.token import AccessTokenProvider, CachedToken, reset_token_cache
+
+
+class AccessTokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_token_cache()
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "key"
+        self.config.app_secret = "secret"
+        self.config.save()
+
+    def tearDown(self):
+        cache.clear()
+        reset_token_cache()
+
+    @patch("apps.dingtalk.services.client.DingTalkClient._fetch_access_token")
+    def test_token_fetched_once_and_persisted(self, mock_fetch):
+        mock_fetch.return_value = ("fresh", 7200)
+
+        self.assertEqual(DingTalkClient(self.config).get_access_token(), "fresh")
+        # 新的客户端实例（持有过期的配置对象）也应命中缓存
+        self.assertEqual(DingTalkClient(DingTalkConfig.objects.get(pk=self.config.pk)).get_access_token(), "fresh")
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.access_token, "fresh")
+        self.assertIsNotNone(self.config.access_token_expires_at)
+
+    @patch("apps.dingtalk.services.client.DingTalkClient._fetch_access_token")
+    def test_token_saved_by_other_worker_is_read_from_db(self, mock_fetch):
+        stale = DingTalkConfig.objects.get(pk=self.config.pk)
+        DingTalkConfig.objects.filter(pk=self.config.pk).update(
+            access_token="from-db",
+            access_token_expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(DingTalkClient(stale).get_access_token(), "from-db")
+        self.assertEqual(stale.access_token, "from-db")
+        mock_fetch.assert_not_called()
+
+    @patch("apps.dingtalk.services.client.DingTalkClient._fetch_access_token")
+    def test_force_refresh_and_reset_bypass_cache(self, mock_fetch):
+        mock_fetch.side_effect = [("first", 7200), ("second", 7200), ("third", 7200)]
+        client = DingTalkClient(self.config)
+
+        self.assertEqual(client.get_access_token(), "first")
+        self.assertEqual(client.get_access_token(force_refresh=True), "second")
+        self.config.reset_access_token()
+        self.assertEqual(client.get_access_token(), "third")
+
+    @patch("apps.dingtalk.services.client.DingTalkClient._fetch_access_token")
+    def test_expiring_token_triggers_background_refresh(self, mock_fetch):
+        mock_fetch.return_value = ("renewed", 7200)
+        DingTalkConfig.objects.filter(pk=self.config.pk).update(
+            access_token="expiring",
+            access_token_expires_at=timezone.now() + timedelta(minutes=4),
+        )
+        provider = AccessTokenProvider()
+        client = DingTalkClient(self.config)
+
+        with patch.object(AccessTokenProvider, "_start_background", lambda self, target: target()), patch(
+            "apps.dingtalk.services.token.connection.close"
+        ):
+            token = provider.get(self.config, client._fetch_access_token)
+
+        # 请求路径直接返回仍然有效的旧令牌，新令牌由后台刷新写入
+        self.assertEqual(token, "expiring")
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(provider.get(self.config, client._fetch_access_token), "renewed")
+
+
+class AccessTokenSingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = DingTalkConfig.load()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_refresh_calls_fetch_once(self):
+        provider = AccessTokenProvider()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            sleep(0.05)
+            return "shared", 7200
+
+        results = []
+        with patch.object(AccessTokenProvider, "_read_db", return_value=None), patch.object(
+            AccessTokenProvider, "_write_db"
+        ):
+            threads = [
+                threading.Thread(target=lambda: results.append(provider.get(self.config, fetch))) for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["shared"] * 8)
+
+    def test_waits_for_peer_holding_distributed_lock(self):
+        provider = AccessTokenProvider()
+        cache.add(f"dingtalk:access_token:{self.config.id}:lock", "1", timeout=30)
+
+        def peer_finishes():
+            sleep(0.1)
+            cache.set(
+                f"dingtalk:access_token:{self.config.id}",
+                {"token": "peer", "expires_at": timezone.now() + timedelta(hours=1)},
+            )
+
+        peer = threading.Thread(target=peer_finishes)
+        with patch.object(AccessTokenProvider, "_read_db", return_value=None):
+            peer.start()
+            token = provider.get(self.config, lambda: ("own", 7200))
+        peer.join()
+
+        self.assertEqual(token, "peer")
+        self.assertIsInstance(provider._local[self.config.id], CachedToken)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.dingtalk.models import DingTalkConfig, DingTalkDepartment, DingTalkUser, UserBinding
+from apps.dingtalk.services.sync import SyncService
+from apps.dingtalk.services.tombstone import purge_tombstones
+from apps.hr.models import Employee
+
+
+class TombstoneSyncTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        self.config.app_key = "test-key"
+        self.config.app_secret = "test-secret"
+        self.config.enabled = True
+        self.config.save()
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_all_users")
+    def test_missing_user_is_tombstoned_and_revived_with_links(self, mock_list_users):
+        mock_list_users.return_value = [{"userid": "u1", "name": "张三"}, {"userid": "u2", "name": "李四"}]
+        service = SyncService(self.config)
+        service.sync_users()
+        employee = Employee.objects.create(name="张三", ding_user_id="u1")
+        UserBinding.objects.create(config=self.config, dingtalk_user_id="u1", local_user_id="local-1")
+
+        # 接口偶发漏返回 u1
+        mock_list_users.return_value = [{"userid": "u2", "name": "李四"}]
+        result = service.sync_users()
+
+        self.assertEqual(result["staleCount"], 1)
+        self.assertFalse(DingTalkUser.objects.filter(userid="u1").exists())
+        tombstone = DingTalkUser.all_objects.get(userid="u1")
+        self.assertTrue(tombstone.is_deleted)
+        self.assertIsNotNone(tombstone.deleted_at)
+        employee.refresh_from_db()
+        self.assertEqual(employee.ding_user_id, "u1")
+        self.assertTrue(UserBinding.objects.filter(dingtalk_user_id="u1").exists())
+
+        mock_list_users.return_value = [{"userid": "u1", "name": "张三"}, {"userid": "u2", "name": "李四"}]
+        result = service.sync_users()
+
+        self.assertEqual(result["staleCount"], 0)
+        revived = DingTalkUser.objects.get(userid="u1")
+        self.assertFalse(revived.is_deleted)
+        self.assertIsNone(revived.deleted_at)
+
+    @patch("apps.dingtalk.services.sync.DingTalkClient.list_departments")
+    def test_missing_department_is_tombstoned(self, mock_list_departments):
+        mock_list_departments.return_value = [{"dept_id": 1, "name": "总部"}, {"dept_id": 2, "name": "研发"}]
+        service = SyncService(self.config)
+        service.sync_departments()
+
+        mock_list_departments.return_value = [{"dept_id": 1, "name": "总部"}]
+        result = service.sync_departments()
+
+        self.assertEqual(result, {"count": 1, "staleCount": 1})
+        self.assertEqual(list(DingTalkDepartment.objects.values_list("dept_id", flat=True)), [1])
+        self.assertTrue(DingTalkDepartment.all_objects.get(dept_id=2).is_deleted)
+
+
+class PurgeTombstonesTests(TestCase):
+    def setUp(self):
+        self.config = DingTalkConfig.load()
+        old = timezone.now() - timedelta(days=40)
+        for index in range(5):
+            DingTalkUser.objects.create(userid=f"old{index}", config=self.config, is_deleted=True, deleted_at=old)
+        DingTalkUser.objects.create(userid="recent", config=self.config, is_deleted=True, deleted_at=timezone.now())
+        DingTalkUser.objects.create(userid="live", config=self.config)
+        DingTalkDepartment.objects.create(dept_id=9, config=self.config, name="撤销部门", is_deleted=True, deleted_at=old)
+        UserBinding.objects.create(config=self.config, dingtalk_user_id="old0", local_user_id="local-1")
+
+    def test_purge_deletes_expired_tombstones_in_batches(self):
+        result = purge_tombstones(self.config, older_than=timedelta(days=30), batch_size=2)
+
+        self.assertEqual(result, {"dingtalkuser": 5, "dingtalkdepartment": 1})
+        self.assertEqual(sorted(DingTalkUser.all_objects.values_list("userid", flat=True)), ["live", "recent"])
+        self.assertFalse(UserBinding.objects.exists())
+
+    def test_management_command_uses_retention_days(self):
+        out = StringIO()
+        call_command("purge_dingtalk_tombstones", "--days", "60", stdout=out)
+
+        self.assertIn("清理完成", out.getvalue())
+        self.assertEqual(DingTalkUser.all_objects.count(), 7)
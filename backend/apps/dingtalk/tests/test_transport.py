@@ -0,0 +1,74 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.dingtalk.services.transport import HttpxSession, get_connection_stats, get_session, reset_sessions
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802 - http.server 约定
+        body = b'{"errcode": 0}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002 - 静默测试输出
+        pass
+
+
+@override_settings(DINGTALK={"POOL_CONNECTIONS": 4, "POOL_MAXSIZE": 16, "PROXY": None})
+class SessionRegistryTests(SimpleTestCase):
+    def setUp(self):
+        reset_sessions()
+
+    def tearDown(self):
+        reset_sessions()
+
+    def test_sessions_are_shared_per_config(self):
+        first = get_session("default")
+
+        self.assertIs(get_session("default"), first)
+        self.assertIsNot(get_session("tenant-b"), first)
+
+    def test_adapter_uses_configured_pool_size(self):
+        adapter = get_session("default").get_adapter("https://oapi.dingtalk.com")
+
+        self.assertEqual(adapter._pool_maxsize, 16)  # noqa: SLF001
+        self.assertEqual(adapter._pool_connections, 4)  # noqa: SLF001
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    def test_connection_stats_report_keep_alive_reuse(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            session = get_session("default")
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            for _ in range(3):
+                session.get(url, timeout=5).json()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        stats = get_connection_stats(session)
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connections_reused"], 2)
+
+
+class HttpxSessionTests(SimpleTestCase):
+    def test_falls_back_to_http1_without_h2(self):
+        httpx = MagicMock()
+
+        with patch.dict(sys.modules, {"httpx": httpx, "h2": None}):
+            session = HttpxSession(pool_maxsize=4, connect_retries=1)
+
+        self.assertFalse(session.http2)
+        self.assertIs(httpx.HTTPTransport.call_args.kwargs["http2"], False)
@@ -12,6 +12,7 @@ from .views import (
     DingTalkUserViewSet,
     SyncCommandView,
     SyncCursorViewSet,
+    SyncJobViewSet,
     UserBindingViewSet,
 )
 
@@ -23,6 +24,7 @@ router.register("users", DingTalkUserViewSet, basename="dingtalk-users")
 router.register("dimission-users", DingTalkDimissionUserViewSet, basename="dingtalk-dimission-users")
 router.register("attendances", DingTalkAttendanceViewSet, basename="dingtalk-attendances")
 router.register("cursors", SyncCursorViewSet, basename="dingtalk-cursors")
+router.register("jobs", SyncJobViewSet, basename="dingtalk-jobs")
 router.register("dept-bindings", DeptBindingViewSet, basename="dingtalk-dept-bindings")
 router.register("user-bindings", UserBindingViewSet, basename="dingtalk-user-bindings")
 
@@ -6,6 +6,8 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any
 
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
@@ -28,6 +30,7 @@ from .filters import (
 )
 from .models import (
     DeptBinding,
+    DingTalkAttendanceArchive,
     DingTalkAttendanceRecord,
     DingTalkConfig,
     DingTalkDepartment,
@@ -35,6 +38,7 @@ from .models import (
     DingTalkSyncLog,
     DingTalkUser,
     SyncCursor,
+    SyncJob,
     UserBinding,
 )
 from .permissions import CanManageDingTalk, CanViewDingTalk
@@ -49,14 +53,20 @@ from .serializers import (
     DingTalkUserSerializer,
     SyncCommandSerializer,
     SyncCursorSerializer,
+    SyncJobSerializer,
     UserBindingSerializer,
 )
 from .services import (
     DingTalkAPIError,
+    DingTalkCallbackError,
     DingTalkConfigurationError,
     DingTalkDisabledError,
     SyncService,
 )
+from .services.attendance_archive import with_archived_records
+from .services.callback import DingTalkCallbackCrypto
+from .services.events import enqueue_event
+from .services.jobs import enqueue_job
 
 
 def _handle_exception(service: SyncService, operation: SyncOperation, exc: Exception):
@@ -114,6 +124,8 @@ class DingTalkConfigViewSet(CustomModelViewSet):
 
 
 class SyncCommandView(APIView):
+    """连接测试在请求内执行；同步操作写入后台任务队列后立即返回任务 ID，通过任务接口查询进度"""
+
     permission_classes = [IsAuthenticated, CanManageDingTalk]
 
     def post(self, request, config_id: str | None = None):
@@ -131,30 +143,45 @@ class SyncCommandView(APIView):
             if operation == SyncOperation.TEST_CONNECTION:
                 data = service.test_connection()
                 return CustomResponse(success=True, data=data, msg="钉钉连接正常")
-            if operation == SyncOperation.SYNC_DEPARTMENTS:
-                data = service.sync_departments(mode=mode)
-                return CustomResponse(success=True, data=data, msg="部门同步完成")
-            if operation == SyncOperation.SYNC_USERS:
-                data = service.sync_users(mode=mode)
-                return CustomResponse(success=True, data=data, msg="用户同步完成")
-            if operation == SyncOperation.SYNC_DIMISSION_USERS:
-                data = service.sync_dimission_users(mode=mode)
-                return CustomResponse(success=True, data=data, msg="离职人员同步完成")
-            if operation == SyncOperation.SYNC_ATTENDANCE:
-                if not start or not end:
-                    return CustomResponse(success=False, data=None, msg="请提供 start 与 end 时间", status=status.HTTP_400_BAD_REQUEST)
-                if start.tzinfo is None:
-                    start = timezone.make_aware(start, timezone.get_current_timezone())
-                if end.tzinfo is None:
-                    end = timezone.make_aware(end, timezone.get_current_timezone())
-                data = service.sync_attendance(start, end, mode=mode, user_ids=user_ids)
-                return CustomResponse(success=True, data=data, msg="考勤同步完成")
-            if operation == SyncOperation.FULL_SYNC:
-                data = service.full_sync()
-                return CustomResponse(success=True, data=data, msg="全量同步完成")
+            # 提前校验启用状态，避免无效任务进入队列；指定人员的考勤补同步不要求启用
+            if not (operation == SyncOperation.SYNC_ATTENDANCE and user_ids):
+                service.ensure_enabled()
         except (DingTalkAPIError, DingTalkConfigurationError, DingTalkDisabledError) as exc:
             return _handle_exception(service, operation, exc)
-        return CustomResponse(success=False, data=None, msg="暂不支持的操作", status=status.HTTP_400_BAD_REQUEST)
+
+        params: dict[str, Any] = {"mode": mode}
+        if operation == SyncOperation.SYNC_ATTENDANCE:
+            if mode != "incremental" and (not start or not end):
+                return CustomResponse(success=False, data=None, msg="请提供 start 与 end 时间", status=status.HTTP_400_BAD_REQUEST)
+            if start and start.tzinfo is None:
+                start = timezone.make_aware(start, timezone.get_current_timezone())
+            if end and end.tzinfo is None:
+                end = timezone.make_aware(end, timezone.get_current_timezone())
+            params.update({"start": start, "end": end, "userIds": user_ids})
+        elif operation == SyncOperation.FULL_SYNC:
+            params = {}
+        job, created = enqueue_job(config, operation, params, created_by=getattr(request.user, "username", "") or "")
+        data = {"jobId": str(job.pk), "status": job.status, "deduplicated": not created}
+        return CustomResponse(success=True, data=data, msg="同步任务已提交", status=status.HTTP_202_ACCEPTED)
+
+
+class SyncJobViewSet(CustomModelViewSet):
+    """后台同步任务状态查询（只读）"""
+
+    queryset = SyncJob.objects.select_related("config").all()
+    serializer_class = SyncJobSerializer
+    permission_classes = [IsAuthenticated, CanViewDingTalk]
+    http_method_names = ["get", "head", "options"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        config_id = self.request.query_params.get("config_id")
+        job_status = self.request.query_params.get("status")
+        if config_id:
+            queryset = queryset.filter(config_id=config_id)
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        return queryset
 
 
 class DingTalkSyncLogViewSet(CustomModelViewSet):
@@ -265,6 +292,34 @@ class DingTalkAttendanceViewSet(CustomModelViewSet):
     filterset_class = DingTalkAttendanceFilter
     permission_classes = [IsAuthenticated, CanViewDingTalk]
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != "list":
+            return queryset
+        # 查询范围早于热表保留期时合并冷表中的归档记录
+        archive_filter = self.filterset_class(
+            self.request.query_params, queryset=DingTalkAttendanceArchive.objects.all(), request=self.request
+        )
+        if not archive_filter.is_valid():
+            return queryset
+        cleaned = archive_filter.form.cleaned_data
+        return with_archived_records(
+            queryset,
+            archive_filter.qs,
+            start=cleaned.get("start"),
+            end=cleaned.get("end"),
+            config_id=cleaned.get("config_id") or None,
+        )
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action != "retrieve":
+                raise
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return get_object_or_404(DingTalkAttendanceArchive.objects.all(), pk=lookup)
+
     @action(detail=False, methods=["get"], url_path="remote")
     def preview_remote(self, request, *args, **kwargs):
         config_id = request.query_params.get("config_id") or DingTalkConfig.DEFAULT_ID
@@ -336,13 +391,30 @@ class UserBindingViewSet(CustomModelViewSet):
 
 
 class DingTalkCallbackView(APIView):
+    """钉钉事件回调：验签解密后写入事件队列立即应答，由 process_dingtalk_events worker 异步处理"""
+
     permission_classes = []
+    authentication_classes = []
 
     def post(self, request, config_id: str | None = None):
         config = DingTalkConfig.load(config_id)
         if not config.callback_token or not config.callback_aes_key:
             return CustomResponse(success=False, data=None, msg="未配置回调 Token/AES Key", status=status.HTTP_400_BAD_REQUEST)
-        # 简单验签留空实现：项目可在此处加入实际验签逻辑
         logger = logging.getLogger(__name__)
-        logger.info("收到钉钉回调 config=%s payload=%s", config.id, request.data)
-        return CustomResponse(success=True, data=None, msg="回调已接收")
+        params = request.query_params
+        try:
+            crypto = DingTalkCallbackCrypto.for_config(config)
+            plaintext = crypto.decrypt(
+                params.get("msg_signature") or params.get("signature", ""),
+                params.get("timestamp", ""),
+                params.get("nonce", ""),
+                (request.data or {}).get("encrypt", ""),
+            )
+            message = json.loads(plaintext)
+        except (DingTalkCallbackError, DingTalkConfigurationError, ValueError) as exc:
+            logger.warning("钉钉回调验签失败 config=%s error=%s", config.id, exc)
+            return CustomResponse(success=False, data=None, msg=str(exc), status=status.HTTP_403_FORBIDDEN)
+        event = enqueue_event(config, message)
+        logger.info("收到钉钉回调 config=%s type=%s queued=%s", config.id, message.get("EventType"), event.pk if event else None)
+        # 钉钉要求以加密后的 success 应答，否则会重复推送
+        return Response(crypto.encrypt("success"))
@@ -6,13 +6,27 @@ from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from typing import Iterable
 
+from django.db import connections, router, transaction
 from django.utils import timezone
 
-from apps.dingtalk.models import DingTalkAttendanceRecord
+from apps.dingtalk.models import DingTalkAttendanceRecord, DingTalkUser
+from apps.dingtalk.services.attendance_archive import fetch_attendance_records, iter_attendance_by_user
+from apps.dingtalk.services.bulk import get_bulk_batch_size
 
 from ..models import AttendanceRule, AttendanceSummary, Employee
 
 
+SUMMARY_FIELDS = (
+    "work_days",
+    "present_days",
+    "late_minutes",
+    "early_leave_minutes",
+    "absence_days",
+    "overtime_hours",
+    "detail",
+)
+
+
 @dataclass(slots=True)
 class AttendanceMetrics:
     work_days: int = 0
@@ -29,6 +43,7 @@ class AttendanceCalculator:
 
     def __init__(self, rule: AttendanceRule) -> None:
         self.rule = rule
+        self._day_times: dict[tuple[date, time], datetime] = {}
 
     def calculate(self, employee: Employee, start: date, end: date) -> AttendanceSummary:
         metrics = self._aggregate(employee, start, end)
@@ -36,27 +51,75 @@ class AttendanceCalculator:
             employee=employee,
             period_start=start,
             period_end=end,
-            defaults={
-                "rule": self.rule,
-                "work_days": metrics.work_days,
-                "present_days": metrics.present_days,
-                "late_minutes": metrics.late_minutes,
-                "early_leave_minutes": metrics.early_leave_minutes,
-                "absence_days": metrics.absence_days,
-                "overtime_hours": metrics.overtime_hours,
-                "detail": metrics.detail,
-            },
+            defaults={"rule": self.rule, **self._summary_values(metrics)},
         )
         return summary
 
+    def calculate_many(self, employees: Iterable[Employee], start: date, end: date) -> list[AttendanceSummary]:
+        """批量生成考勤统计：打卡记录按配置、分批用户流式读取，工作日历只计算一次，统计结果批量写入.
+
+        返回的统计与传入员工顺序一致（重复的员工只计算一次），已存在的统计保留确认状态。
+        """
+
+        employees = list({employee.pk: employee for employee in employees}.values())
+        if not employees:
+            return []
+        workdays = self._workdays(start, end)
+        employees_by_userid = {employee.ding_user_id: employee for employee in employees if employee.ding_user_id}
+        userids_by_config: dict[str, list[str]] = defaultdict(list)
+        users = DingTalkUser._base_manager.filter(pk__in=list(employees_by_userid)).values_list("userid", "config_id")
+        for userid, config_id in users:
+            userids_by_config[config_id].append(userid)
+
+        summaries: dict[object, AttendanceSummary] = {}
+        for config_id, userids in userids_by_config.items():
+            for groups in iter_attendance_by_user(userids, start, end, config_id=config_id):
+                for userid, records in groups.items():
+                    employee = employees_by_userid[userid]
+                    summaries[employee.pk] = self._build_summary(employee, start, end, self._metrics(records, workdays))
+        for employee in employees:
+            if employee.pk not in summaries:
+                summaries[employee.pk] = self._build_summary(employee, start, end, self._metrics([], workdays))
+
+        database = router.db_for_write(AttendanceSummary)
+        features = connections[database].features
+        options: dict[str, object] = {
+            "update_conflicts": True,
+            "update_fields": ["rule", *SUMMARY_FIELDS, "update_time"],
+        }
+        if features.supports_update_conflicts_with_target:
+            options["unique_fields"] = ["employee", "period_start", "period_end"]
+        with transaction.atomic(using=database):
+            AttendanceSummary.objects.bulk_create(list(summaries.values()), batch_size=get_bulk_batch_size(), **options)
+        # 冲突更新时数据库保留原有主键，重新读取以返回实际保存的记录
+        saved = AttendanceSummary.objects.select_related("employee", "employee__department", "rule").filter(
+            employee_id__in=list(summaries), period_start=start, period_end=end
+        )
+        by_employee = {summary.employee_id: summary for summary in saved}
+        return [by_employee[employee.pk] for employee in employees]
+
+    def _build_summary(self, employee: Employee, start: date, end: date, metrics: AttendanceMetrics) -> AttendanceSummary:
+        return AttendanceSummary(
+            employee=employee,
+            rule=self.rule,
+            period_start=start,
+            period_end=end,
+            **self._summary_values(metrics),
+        )
+
+    @staticmethod
+    def _summary_values(metrics: AttendanceMetrics) -> dict[str, object]:
+        return {name: getattr(metrics, name) for name in SUMMARY_FIELDS}
+
     def _aggregate(self, employee: Employee, start: date, end: date) -> AttendanceMetrics:
-        records = self._fetch_records(employee, start, end)
+        return self._metrics(self._fetch_records(employee, start, end), self._workdays(start, end))
+
+    def _metrics(self, records: Iterable[DingTalkAttendanceRecord], workdays: list[date]) -> AttendanceMetrics:
         buckets: dict[date, list[DingTalkAttendanceRecord]] = defaultdict(list)
         for record in records:
             if record.work_date:
                 buckets[record.work_date].append(record)
         metrics = AttendanceMetrics()
-        workdays = self._workdays(start, end)
         metrics.work_days = len(workdays)
         for workday in workdays:
             day_records = sorted(buckets.get(workday, []), key=lambda item: item.user_check_time)
@@ -102,11 +165,10 @@ class AttendanceCalculator:
     def _fetch_records(self, employee: Employee, start: date, end: date) -> Iterable[DingTalkAttendanceRecord]:
         if not employee.ding_user:
             return []
-        qs = DingTalkAttendanceRecord.objects.filter(
-            userid=employee.ding_user.userid,
-            work_date__range=(start, end),
-        ).order_by("user_check_time")
-        return list(qs)
+        # 按配置过滤以命中 (config, userid, work_date) 索引，历史区间会读取已归档的记录
+        return fetch_attendance_records(
+            employee.ding_user.userid, start, end, config_id=employee.ding_user.config_id
+        )
 
     def _workdays(self, start: date, end: date) -> list[date]:
         current = start
@@ -146,9 +208,11 @@ class AttendanceCalculator:
             return Decimal("0")
         return Decimal(delta_minutes - self.rule.overtime_start_minutes) / Decimal("60")
 
-    @staticmethod
-    def _combine_time(day: date, at: time) -> datetime:
-        naive = datetime.combine(day, at)
-        if timezone.is_naive(naive):
-            return timezone.make_aware(naive, timezone.get_current_timezone())
-        return naive
+    def _combine_time(self, day: date, at: time) -> datetime:
+        key = (day, at)
+        if key not in self._day_times:
+            value = datetime.combine(day, at)
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value, timezone.get_current_timezone())
+            self._day_times[key] = value
+        return self._day_times[key]
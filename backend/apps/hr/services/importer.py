@@ -6,6 +6,7 @@ from typing import Iterable, Sequence
 from django.db import transaction
 
 from apps.dingtalk.models import DingTalkDepartment, DingTalkUser
+from apps.dingtalk.models.source import prefetch_source_info
 
 from ..models import Department, Employee
 
@@ -32,12 +33,13 @@ class DepartmentImporter:
     def sync(self, departments: Iterable[DingTalkDepartment] | None = None) -> ImportResult:
         result = ImportResult()
         items = list(departments) if departments is not None else self.fetch()
+        prefetch_source_info(items)
         indexed: dict[int, Department] = {
             int(item.ding_department.dept_id): item
             for item in Department.objects.filter(ding_department__isnull=False)
         }
         for dept in items:
-            source_info = dept.source_info if isinstance(dept.source_info, dict) else {}
+            source_info = dept.get_source_info()
             description = ""
             if source_info:
                 description = str(source_info.get("brief", source_info.get("name", "")))
@@ -82,6 +84,7 @@ class EmployeeImporter:
     def sync(self, users: Iterable[DingTalkUser] | None = None) -> ImportResult:
         result = ImportResult()
         items = list(users) if users is not None else self.fetch()
+        prefetch_source_info(items)
         dept_map = {
             str(dept.ding_department.dept_id): dept
             for dept in Department.objects.filter(ding_department__isnull=False)
@@ -89,7 +92,7 @@ class EmployeeImporter:
         for user in items:
             dept_id = str(user.dept_ids[0]) if user.dept_ids else None
             department = dept_map.get(dept_id)
-            source_info = user.source_info if isinstance(user.source_info, dict) else {}
+            source_info = user.get_source_info()
             defaults = {
                 "name": user.name or user.userid,
                 "job_number": user.job_number or user.userid,
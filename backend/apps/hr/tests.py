@@ -3,7 +3,9 @@ from __future__ import annotations
 from datetime import date, datetime, time
 from decimal import Decimal
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from apps.dingtalk.models import DingTalkAttendanceRecord, DingTalkConfig, DingTalkDepartment, DingTalkUser
@@ -128,6 +130,63 @@ class AttendanceCalculatorTests(TestCase):
         self.assertEqual(summary.absence_days, Decimal("1"))
         self.assertIn(work_day.isoformat(), summary.detail)
 
+    def _punch(self, userid: str, record_id: str, day: date, at: time) -> None:
+        DingTalkAttendanceRecord.objects.create(
+            record_id=record_id,
+            config=self.config,
+            userid=userid,
+            check_type="OnDuty",
+            time_result="Normal",
+            user_check_time=timezone.make_aware(datetime.combine(day, at), timezone.get_current_timezone()),
+            work_date=day,
+        )
+
+    def test_calculate_many_matches_single_calculation(self) -> None:
+        other_user = DingTalkUser.objects.create(userid="u002", config=self.config, name="赵六", dept_ids=[3001])
+        other = Employee.objects.create(name="赵六", job_number="DEV002", department=self.department, ding_user=other_user)
+        unbound = Employee.objects.create(name="孙七", job_number="DEV003", department=self.department)
+        for userid, prefix in (("u001", "a"), ("u002", "b")):
+            self._punch(userid, f"{prefix}1", date(2025, 9, 1), time(9, 40))
+            self._punch(userid, f"{prefix}2", date(2025, 9, 1), time(19, 30))
+            self._punch(userid, f"{prefix}3", date(2025, 9, 2), time(8, 55))
+        self._punch("u002", "b4", date(2025, 9, 3), time(17, 0))
+        start, end = date(2025, 9, 1), date(2025, 9, 5)
+        employees = [self.employee, other, unbound]
+        fields = ("work_days", "present_days", "late_minutes", "early_leave_minutes", "absence_days", "overtime_hours", "detail")
+
+        calculator = AttendanceCalculator(self.rule)
+        for employee in employees:
+            calculator.calculate(employee, start=start, end=end)
+        expected = {item.employee_id: [getattr(item, name) for name in fields] for item in AttendanceSummary.objects.all()}
+        confirmed = AttendanceSummary.objects.get(employee=other)
+        AttendanceSummary.objects.filter(pk=confirmed.pk).update(status=AttendanceSummary.Status.CONFIRMED, work_days=0)
+
+        summaries = AttendanceCalculator(self.rule).calculate_many(employees, start=start, end=end)
+
+        self.assertEqual([summary.employee_id for summary in summaries], [employee.pk for employee in employees])
+        self.assertEqual(AttendanceSummary.objects.count(), 3)
+        for summary in summaries:
+            self.assertEqual([getattr(summary, name) for name in fields], expected[summary.employee_id])
+        self.assertEqual(summaries[1].pk, confirmed.pk)
+        self.assertEqual(summaries[1].status, AttendanceSummary.Status.CONFIRMED)
+
+    def test_calculate_many_query_count_does_not_grow_with_employees(self) -> None:
+        employees = [self.employee]
+        for index in range(2, 6):
+            ding_user = DingTalkUser.objects.create(userid=f"u00{index}", config=self.config, name=f"员工{index}")
+            employees.append(
+                Employee.objects.create(name=f"员工{index}", job_number=f"DEV00{index}", department=self.department, ding_user=ding_user)
+            )
+            self._punch(ding_user.userid, f"r{index}", date(2025, 9, 1), time(9, 0))
+        calculator = AttendanceCalculator(self.rule)
+
+        with CaptureQueriesContext(connection) as single:
+            calculator.calculate_many(employees[:1], start=date(2025, 9, 1), end=date(2025, 9, 30))
+        with CaptureQueriesContext(connection) as many:
+            calculator.calculate_many(employees, start=date(2025, 9, 1), end=date(2025, 9, 30))
+
+        self.assertEqual(len(many), len(single))
+
 
 class PayrollCalculatorTests(TestCase):
     def setUp(self) -> None:
@@ -86,12 +86,8 @@ class AttendanceSummaryViewSet(CustomModelViewSet):
         )
         if not employees:
             return CustomResponse(success=False, data=None, msg="未找到员工")
-        calculator = AttendanceCalculator(rule)
-        summaries = []
-        for employee in employees:
-            summary = calculator.calculate(employee, start=data["start"], end=data["end"])
-            summaries.append(AttendanceSummarySerializer(summary).data)
-        return CustomResponse(success=True, data=summaries, msg="考勤统计完成")
+        summaries = AttendanceCalculator(rule).calculate_many(employees, start=data["start"], end=data["end"])
+        return CustomResponse(success=True, data=AttendanceSummarySerializer(summaries, many=True).data, msg="考勤统计完成")
 
     @action(methods=["post"], detail=False, url_path="status")
     def bulk_status(self, request):
@@ -201,7 +201,57 @@ SESSION_ENGINE = "django.contrib.sessions.backends.db"
 DINGTALK = {
     "DEFAULT_TIMEOUT": 10,
     "DEFAULT_RETRIES": 3,
+    "RETRY_BACKOFF_BASE": 0.5,
+    "RETRY_BACKOFF_MAX": 8.0,
+    "CIRCUIT_BREAKER_THRESHOLD": 5,
+    "CIRCUIT_BREAKER_COOLDOWN": 30,
     "PROXY": None,
+    "BULK_BATCH_SIZE": 500,
+    "MAX_WORKERS": 4,
+    # 限流后端：auto（CACHES 为 django_redis 时使用 Redis 共享额度）/ redis / local
+    "RATE_LIMITER": "auto",
+    # HTTP 传输：requests（默认）/ httpx（需安装 httpx[http2]，启用 HTTP/2）
+    "TRANSPORT": "requests",
+    "POOL_CONNECTIONS": 10,
+    "POOL_MAXSIZE": 32,
+    "POOL_CONNECT_RETRIES": 1,
+    # 同步服务使用的客户端：sync（默认，requests + 线程池）/ async（需安装 httpx，协程并发）
+    "CLIENT": "sync",
+    "ASYNC_MAX_CONCURRENCY": 16,
+    "ATTENDANCE_OVERLAP_MINUTES": 30,
+    "ATTENDANCE_USER_GROUP": 500,
+    "TOKEN_REFRESH_AHEAD": 300,
+    "TOKEN_LOCAL_TTL": 60,
+    "TOKEN_BACKGROUND_REFRESH": True,
+    # 软删除的部门/用户保留天数，超过后由清理任务物理删除
+    "TOMBSTONE_RETENTION_DAYS": 30,
+    # 回调事件 worker 每轮领取的事件数与单个事件的最大重试次数
+    "EVENT_BATCH_SIZE": 100,
+    "EVENT_MAX_ATTEMPTS": 5,
+    # 后台同步任务：同一配置同时执行的任务数，worker 中断后任务最多重新执行的次数
+    "JOB_CONCURRENCY_PER_CONFIG": 1,
+    "JOB_MAX_ATTEMPTS": 3,
+    # 内置调度器（run_dingtalk_scheduler）：轮询间隔、触发抖动上限、租约时长（秒）与并发数
+    "SCHEDULER_INTERVAL": 30,
+    "SCHEDULER_JITTER": 60,
+    "SCHEDULER_LEASE": 7200,
+    "SCHEDULER_WORKERS": 4,
+    # 多配置并行同步（sync_dingtalk_all）：并行配置数、执行方式（process/thread）与全局写库并发上限
+    "ORCHESTRATOR_WORKERS": 4,
+    "ORCHESTRATOR_EXECUTOR": "process",
+    "DB_WRITE_CONCURRENCY": 2,
+    # 全量同步流水线：拉取与写库重叠执行，队列容量（批次数）限制内存占用；关闭后按部门、用户顺序执行
+    "FULL_SYNC_PIPELINE": True,
+    "FULL_SYNC_QUEUE_SIZE": 8,
+    # 原始数据（source_info）存储策略：full / allowlist / compressed / external，可按 department/user/attendance/dimission 单独配置，
+    # 修改后执行 rewrite_dingtalk_source_info 转换已有数据（见 services/source_storage.py）
+    "SOURCE_INFO_POLICY": {"default": "full"},
+    # 考勤冷热分层：热表保留的自然月数（archive_dingtalk_attendance 将更早的记录归档到冷表）；
+    # MySQL 热表先执行 partition_dingtalk_attendance --convert 改为按月分区，开启 ATTENDANCE_PARTITIONING 后
+    # 归档时顺带预建后续月份的分区（见 services/attendance_archive.py）
+    "ATTENDANCE_HOT_MONTHS": 12,
+    "ATTENDANCE_PARTITIONING": False,
+    "ATTENDANCE_PARTITION_MONTHS_AHEAD": 3,
 }
 
 # ================================================= #
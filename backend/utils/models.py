@@ -28,3 +28,23 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True  # 抽象模型类, 用于继承使用
+
+
+class SoftDeleteManager(models.Manager):
+    """默认管理器，过滤已软删除的记录"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteModel(models.Model):
+    """软删除模型, objects 只返回未删除的记录, all_objects 包含已删除记录"""
+
+    is_deleted = models.BooleanField(default=False, verbose_name="是否已删除")
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="删除时间")
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True